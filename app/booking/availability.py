@@ -0,0 +1,113 @@
+import base64
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.booking.models import Ticket, TicketStatus
+from app.cinema.models import Seat, SeatHallLink
+from app.config import settings
+
+
+class SeatIndex:
+    """Maps a hall's seat ids to dense ordinals ordered by (row, column)."""
+
+    def __init__(self, seat_ids: list[uuid.UUID]):
+        self.seat_ids = seat_ids
+        self.ordinals = {seat_id: i for i, seat_id in enumerate(seat_ids)}
+
+    def __len__(self):
+        return len(self.seat_ids)
+
+
+class Availability:
+    """One bit per seat ordinal; a set bit means the seat is held or sold."""
+
+    def __init__(self, index: SeatIndex, taken: list[int]):
+        self.index = index
+        self.bits = bytearray((len(index) + 7) // 8)
+        self.loaded_at = time.monotonic()
+        for ordinal in taken:
+            self.set(ordinal)
+
+    def set(self, ordinal: int):
+        self.bits[ordinal >> 3] |= 1 << (ordinal & 7)
+
+    def clear(self, ordinal: int):
+        self.bits[ordinal >> 3] &= ~(1 << (ordinal & 7))
+
+    def is_set(self, ordinal: int) -> bool:
+        return bool(self.bits[ordinal >> 3] & (1 << (ordinal & 7)))
+
+    def mark(self, seat_ids, taken: bool):
+        for seat_id in seat_ids:
+            if (ordinal := self.index.ordinals.get(seat_id)) is not None:
+                self.set(ordinal) if taken else self.clear(ordinal)
+
+    def taken_count(self) -> int:
+        return sum(byte.bit_count() for byte in self.bits)
+
+    def encode(self) -> str:
+        return base64.b64encode(self.bits).decode()
+
+
+class AvailabilityCache:
+    """Per-process bitmaps, refreshed from the ticket table after a short TTL.
+
+    The database stays authoritative for conflicts; the bitmaps only serve
+    reads, so another worker's bookings show up within ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._halls: dict[int, SeatIndex] = {}
+        self._screenings: dict[int, Availability] = {}
+
+    async def seat_index(self, session: AsyncSession, hall_id: int) -> SeatIndex:
+        if (index := self._halls.get(hall_id)) is None:
+            seat_ids = (
+                await session.execute(
+                    select(Seat.id)
+                    .join(SeatHallLink, SeatHallLink.seat_id == Seat.id)
+                    .where(SeatHallLink.hall_id == hall_id)
+                    .order_by(Seat.row, Seat.column, Seat.id)
+                )
+            ).scalars().all()
+            index = self._halls[hall_id] = SeatIndex(list(seat_ids))
+        return index
+
+    def invalidate_hall(self, hall_id: int):
+        if (index := self._halls.pop(hall_id, None)) is None:
+            return
+        self._screenings = {
+            screening_id: availability
+            for screening_id, availability in self._screenings.items()
+            if availability.index is not index
+        }
+
+    async def get(
+        self, session: AsyncSession, screening_id: int, hall_id: int, now: datetime
+    ) -> Availability:
+        availability = self._screenings.get(screening_id)
+        if availability is None or time.monotonic() - availability.loaded_at > self.ttl:
+            index = await self.seat_index(session, hall_id)
+            taken = (
+                await session.execute(
+                    select(Ticket.seat_id).where(
+                        Ticket.screening_id == screening_id,
+                        or_(Ticket.status == TicketStatus.sold, Ticket.expires_at > now),
+                    )
+                )
+            ).scalars().all()
+            availability = self._screenings[screening_id] = Availability(
+                index, [index.ordinals[s] for s in taken if s in index.ordinals]
+            )
+        return availability
+
+    def get_cached(self, screening_id: int) -> Availability | None:
+        return self._screenings.get(screening_id)
+
+
+availability_cache = AvailabilityCache(settings.booking_availability_ttl)
@@ -0,0 +1,57 @@
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, UniqueConstraint
+from sqlmodel import SQLModel, Field
+
+
+class TicketStatus(str, Enum):
+    held = "held"
+    sold = "sold"
+
+
+class Ticket(SQLModel, table=True):
+    # One row per (screening, seat): the unique index is the only thing two
+    # concurrent holds on the same seat contend on.
+    __table_args__ = (UniqueConstraint("screening_id", "seat_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Screenings with sold tickets are never deleted (see
+    # release_screenings), so the cascade only ever takes holds with it.
+    # Seats are not deleted while tickets refer to them.
+    screening_id: int = Field(foreign_key="filmscreening.id", ondelete="CASCADE")
+    seat_id: uuid.UUID = Field(foreign_key="seat.id")
+    hold_id: uuid.UUID = Field(index=True)
+    status: TicketStatus
+    expires_at: Optional[datetime] = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )
+
+
+class HoldCreate(SQLModel):
+    seat_ids: list[uuid.UUID] = Field(min_length=1)
+
+
+class HoldPublic(SQLModel):
+    hold_id: uuid.UUID
+    screening_id: int
+    seat_ids: list[uuid.UUID]
+    expires_at: datetime
+
+
+class BookingPublic(SQLModel):
+    hold_id: uuid.UUID
+    screening_id: int
+    seat_ids: list[uuid.UUID]
+    status: TicketStatus
+
+
+class AvailabilityPublic(SQLModel):
+    screening_id: int
+    capacity: int
+    available: int
+    # Base64 bitmap, bit i set when the hall's i-th seat (by row, column)
+    # is held or sold.
+    taken: str
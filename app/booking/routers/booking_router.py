@@ -0,0 +1,190 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter
+from fastapi.params import Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.booking.availability import availability_cache
+from app.booking.models import (
+    AvailabilityPublic,
+    BookingPublic,
+    HoldCreate,
+    HoldPublic,
+    Ticket,
+    TicketStatus,
+)
+from app.booking.seatmap import AVAILABLE, seat_map_hub
+from app.config import settings
+from app.db import get_read_session, get_session, upsert
+from app.film.models import FilmScreening
+from app.utils.exceptions import (
+    NotFoundHoldException,
+    NotFoundModelException,
+    SeatsUnavailableException,
+    UnknownSeatsException,
+)
+
+booking_router = APIRouter(prefix="/booking", tags=["Booking"])
+
+
+# On the primary: the seat index cached here lives until the hall's scheme
+# changes, so one loaded from a lagging replica could keep the old seats.
+@booking_router.get("/availability", response_model=AvailabilityPublic)
+async def get_availability(screening_id: int, session: AsyncSession = Depends(get_session)):
+    if not (screening := await session.get(FilmScreening, screening_id)):
+        raise NotFoundModelException(FilmScreening)
+    availability = await availability_cache.get(
+        session, screening_id, screening.hall_id, datetime.now(timezone.utc)
+    )
+    capacity = len(availability.index)
+    return AvailabilityPublic(
+        screening_id=screening_id,
+        capacity=capacity,
+        available=capacity - availability.taken_count(),
+        taken=availability.encode(),
+    )
+
+
+@booking_router.get("/seatmap")
+async def seat_map(screening_id: int, session: AsyncSession = Depends(get_read_session)):
+    """Server-sent events: a ``snapshot`` of the held and sold seats, then
+    ``delta`` events mapping seat ids to their new state (``held``,
+    ``sold`` or ``available``). A client that reads too slowly to keep up
+    gets a new snapshot instead of the deltas it missed."""
+    if not await session.get(FilmScreening, screening_id):
+        raise NotFoundModelException(FilmScreening)
+    return StreamingResponse(
+        seat_map_hub.subscribe(screening_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@booking_router.post("/hold", response_model=HoldPublic)
+async def hold_seats(
+    screening_id: int, hold: HoldCreate, session: AsyncSession = Depends(get_session)
+):
+    if not (screening := await session.get(FilmScreening, screening_id)):
+        raise NotFoundModelException(FilmScreening)
+    index = await availability_cache.seat_index(session, screening.hall_id)
+    # Sorting fixes the order row locks are taken in, so overlapping holds
+    # cannot deadlock each other.
+    seat_ids = sorted(set(hold.seat_ids))
+    if unknown := [seat_id for seat_id in seat_ids if seat_id not in index.ordinals]:
+        raise UnknownSeatsException(unknown)
+
+    now = datetime.now(timezone.utc)
+    hold_id = uuid.uuid4()
+    expires_at = now + timedelta(seconds=settings.booking_hold_seconds)
+    statement = upsert(session, Ticket).values(
+        [
+            {
+                "screening_id": screening_id,
+                "seat_id": seat_id,
+                "hold_id": hold_id,
+                "status": TicketStatus.held,
+                "expires_at": expires_at,
+            }
+            for seat_id in seat_ids
+        ]
+    )
+    # A seat can only be taken over when its previous hold has lapsed.
+    statement = statement.on_conflict_do_update(
+        index_elements=["screening_id", "seat_id"],
+        set_={
+            "hold_id": statement.excluded.hold_id,
+            "status": statement.excluded.status,
+            "expires_at": statement.excluded.expires_at,
+        },
+        where=and_(Ticket.status == TicketStatus.held, Ticket.expires_at <= now),
+    ).returning(Ticket.seat_id)
+    held = set((await session.execute(statement)).scalars().all())
+
+    availability = availability_cache.get_cached(screening_id)
+    if len(held) != len(seat_ids):
+        await session.rollback()
+        taken = [seat_id for seat_id in seat_ids if seat_id not in held]
+        if availability:
+            availability.mark(taken, True)
+        raise SeatsUnavailableException(taken)
+
+    await session.commit()
+    if availability:
+        availability.mark(seat_ids, True)
+    seat_map_hub.publish(screening_id, seat_ids, TicketStatus.held.value)
+    return HoldPublic(
+        hold_id=hold_id, screening_id=screening_id, seat_ids=seat_ids, expires_at=expires_at
+    )
+
+
+@booking_router.post("/{hold_id}/confirm", response_model=BookingPublic)
+async def confirm_booking(
+    screening_id: int, hold_id: uuid.UUID, session: AsyncSession = Depends(get_session)
+):
+    seat_ids = (
+        await session.execute(
+            update(Ticket)
+            .where(
+                Ticket.screening_id == screening_id,
+                Ticket.hold_id == hold_id,
+                Ticket.status == TicketStatus.held,
+                Ticket.expires_at > datetime.now(timezone.utc),
+            )
+            .values(status=TicketStatus.sold, expires_at=None)
+            .returning(Ticket.seat_id)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalars().all()
+    await session.commit()
+
+    if not seat_ids:
+        # Confirming twice is harmless: report the existing booking.
+        seat_ids = (
+            await session.execute(
+                select(Ticket.seat_id).where(
+                    Ticket.screening_id == screening_id,
+                    Ticket.hold_id == hold_id,
+                    Ticket.status == TicketStatus.sold,
+                )
+            )
+        ).scalars().all()
+        if not seat_ids:
+            raise NotFoundHoldException()
+    else:
+        seat_map_hub.publish(screening_id, seat_ids, TicketStatus.sold.value)
+
+    return BookingPublic(
+        hold_id=hold_id,
+        screening_id=screening_id,
+        seat_ids=sorted(seat_ids),
+        status=TicketStatus.sold,
+    )
+
+
+@booking_router.delete("/{hold_id}")
+async def release_hold(
+    screening_id: int, hold_id: uuid.UUID, session: AsyncSession = Depends(get_session)
+):
+    seat_ids = (
+        await session.execute(
+            delete(Ticket)
+            .where(
+                Ticket.screening_id == screening_id,
+                Ticket.hold_id == hold_id,
+                Ticket.status == TicketStatus.held,
+            )
+            .returning(Ticket.seat_id)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalars().all()
+    if not seat_ids:
+        raise NotFoundHoldException()
+    await session.commit()
+
+    if availability := availability_cache.get_cached(screening_id):
+        availability.mark(seat_ids, False)
+    seat_map_hub.publish(screening_id, seat_ids, AVAILABLE)
+    return {"message": f"Successfully released hold with id {hold_id}"}
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from itertools import islice
+from typing import AsyncIterator
+
+from pydantic_core import to_json
+from sqlalchemy import or_, select
+
+from app import db
+from app.booking.models import Ticket, TicketStatus
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+AVAILABLE = "available"
+
+
+def _event(name: str, version: int, data: dict) -> bytes:
+    return b"event: %s\nid: %d\ndata: %s\n\n" % (name.encode(), version, to_json(data))
+
+
+class SeatMapChannel:
+    """Live seat states of one screening and the last ``history`` deltas.
+
+    Every event is encoded once and the same bytes go to all subscribers,
+    so a change costs the same however many clients watch it. Subscribers
+    read the shared log at their own pace: one that falls further behind
+    than the log reaches skips the missed deltas and gets a fresh snapshot,
+    so a slow client never makes the channel buffer more.
+
+    Seats booked through this process are pushed as they happen. Holds
+    that lapse and bookings made by other workers are picked up by
+    re-reading the tickets every ``resync`` seconds while anyone listens.
+    """
+
+    def __init__(self, screening_id: int, history: int, resync: float):
+        self.screening_id = screening_id
+        self.resync = resync
+        self.states: dict[uuid.UUID, str] = {}
+        self.version = 0
+        self.log: deque[tuple[int, bytes]] = deque(maxlen=history)
+        self.subscribers = 0
+        self.lagged = 0
+        self.ready = asyncio.Event()
+        self._changed = asyncio.Event()
+        self._snapshot: tuple[int, bytes] | None = None
+        self._published: list[dict[uuid.UUID, str]] | None = None
+        self._task = asyncio.create_task(self._run())
+
+    def apply(self, changes: dict[uuid.UUID, str]):
+        for seat_id, state in changes.items():
+            if state == AVAILABLE:
+                self.states.pop(seat_id, None)
+            else:
+                self.states[seat_id] = state
+        if self._published is not None:
+            self._published.append(changes)
+        self.version += 1
+        self.log.append((self.version, _event("delta", self.version, {"seats": changes})))
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def refresh(self):
+        self._published = published = []
+        try:
+            async with db.new_session() as session:
+                rows = (
+                    await session.execute(
+                        select(Ticket.seat_id, Ticket.status).where(
+                            Ticket.screening_id == self.screening_id,
+                            or_(
+                                Ticket.status == TicketStatus.sold,
+                                Ticket.expires_at > datetime.now(timezone.utc),
+                            ),
+                        )
+                    )
+                ).all()
+        finally:
+            self._published = None
+        states = {seat_id: status.value for seat_id, status in rows}
+        # A change pushed while the query ran may be newer than what it saw,
+        # and is never older: it goes on top.
+        for changes in published:
+            for seat_id, state in changes.items():
+                if state == AVAILABLE:
+                    states.pop(seat_id, None)
+                else:
+                    states[seat_id] = state
+        changes = {seat_id: AVAILABLE for seat_id in self.states if seat_id not in states}
+        changes.update(
+            (seat_id, state)
+            for seat_id, state in states.items()
+            if self.states.get(seat_id) != state
+        )
+        if changes:
+            self.apply(changes)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+                self.ready.set()
+            except Exception:
+                logger.exception("seat map refresh failed for screening %s", self.screening_id)
+            await asyncio.sleep(self.resync if self.ready.is_set() else 0.1)
+
+    def close(self):
+        self._task.cancel()
+
+    def snapshot(self) -> bytes:
+        if self._snapshot is None or self._snapshot[0] != self.version:
+            data = {"screening_id": self.screening_id, "seats": self.states}
+            self._snapshot = (self.version, _event("snapshot", self.version, data))
+        return self._snapshot[1]
+
+    def since(self, version: int) -> bytes | None:
+        """The deltas after ``version``, or None once they left the log."""
+        if not self.log or self.log[0][0] > version + 1:
+            return None
+        start = version + 1 - self.log[0][0]
+        return b"".join(data for _, data in islice(self.log, start, None))
+
+    async def events(self, keepalive: float) -> AsyncIterator[bytes]:
+        await self.ready.wait()
+        version = self.version
+        yield self.snapshot()
+        while True:
+            if version == self.version:
+                changed = self._changed
+                try:
+                    async with asyncio.timeout(keepalive):
+                        await changed.wait()
+                except TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+            if (chunk := self.since(version)) is None:
+                self.lagged += 1
+                chunk = self.snapshot()
+            version = self.version
+            yield chunk
+
+
+class SeatMapHub:
+    """Per-process fan-out of seat map changes, one channel per watched
+    screening. Channels exist only while they have subscribers."""
+
+    def __init__(self, history: int, resync: float, keepalive: float):
+        self.history = history
+        self.resync = resync
+        self.keepalive = keepalive
+        self._channels: dict[int, SeatMapChannel] = {}
+
+    async def subscribe(self, screening_id: int) -> AsyncIterator[bytes]:
+        if (channel := self._channels.get(screening_id)) is None:
+            channel = self._channels[screening_id] = SeatMapChannel(
+                screening_id, self.history, self.resync
+            )
+        channel.subscribers += 1
+        try:
+            async for chunk in channel.events(self.keepalive):
+                yield chunk
+        finally:
+            channel.subscribers -= 1
+            if not channel.subscribers:
+                channel.close()
+                if self._channels.get(screening_id) is channel:
+                    del self._channels[screening_id]
+
+    def publish(self, screening_id: int, seat_ids, state: str):
+        if (channel := self._channels.get(screening_id)) is not None:
+            channel.apply({seat_id: state for seat_id in seat_ids})
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._channels),
+            "subscribers": sum(c.subscribers for c in self._channels.values()),
+            "lagged": sum(c.lagged for c in self._channels.values()),
+        }
+
+
+seat_map_hub = SeatMapHub(
+    settings.seatmap_history, settings.seatmap_resync_seconds, settings.seatmap_keepalive_seconds
+)
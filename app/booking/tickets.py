@@ -0,0 +1,22 @@
+from sqlalchemy import delete, exists, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.booking.models import Ticket, TicketStatus
+from app.film.models import FilmScreening
+from app.utils.exceptions import SoldTicketsException
+
+
+async def release_screenings(session: AsyncSession, *criteria, what: str):
+    """Delete the tickets of the screenings matching ``criteria``, which are
+    about to be deleted. Holds go with them; a sold ticket refuses the
+    deletion of ``what``."""
+    screening_ids = select(FilmScreening.id).where(*criteria)
+    if await session.scalar(
+        select(
+            exists().where(
+                Ticket.screening_id.in_(screening_ids), Ticket.status == TicketStatus.sold
+            )
+        )
+    ):
+        raise SoldTicketsException(f"{what} cannot be deleted")
+    await session.execute(delete(Ticket).where(Ticket.screening_id.in_(screening_ids)))
@@ -1,9 +1,13 @@
 import uuid
+from datetime import datetime
+from enum import Enum
 from typing import Optional, List
 
 from pydantic import AnyUrl, computed_field
+from sqlalchemy import DateTime, Index, func
 from sqlmodel import SQLModel, Field, Relationship
 
+from app.db import updated_at_field
 from app.minio import minio_handler
 
 
@@ -15,11 +19,25 @@ class CinemaBase(SQLModel):
 
 
 class Cinema(CinemaBase, table=True):
+    # /cinema/nearby looks cinemas up by geohash prefix (LIKE 'u4pr%'). In
+    # a non-C collation only the pattern opclass serves that from an index.
+    __table_args__ = (
+        Index(
+            "ix_cinema_geohash", "geohash", postgresql_ops={"geohash": "varchar_pattern_ops"}
+        ),
+    )
+
     id: Optional[int] = Field(primary_key=True, index=True, default=None)
+    geohash: Optional[str] = None
+    updated_at: Optional[datetime] = updated_at_field()
 
 
-class CinemaPublic(Cinema):
-    pass
+class CinemaPublic(CinemaBase):
+    id: int
+
+
+class CinemaNearbyPublic(CinemaPublic):
+    distance_km: float
 
 
 class CinemaCreate(CinemaBase):
@@ -45,25 +63,36 @@ class CinemaHallBase(SQLModel):
 class CinemaHall(CinemaHallBase, table=True):
     id: Optional[int] = Field(primary_key=True, index=True, default=None)
 
-    scheme: str
+    scheme: Optional[str] = None
+    # SHA-256 of the scheme file, set for schemes stored under their hash.
+    scheme_hash: Optional[str] = None
+    updated_at: Optional[datetime] = updated_at_field()
 
-    cinema_id: int = Field(foreign_key="cinema.id")
+    cinema_id: int = Field(foreign_key="cinema.id", index=True)
     screenings: List["FilmScreening"] = Relationship(back_populates="hall")
-    seats: List["Seat"] = Relationship(back_populates="hall", link_model=SeatHallLink)
+    seats: List["Seat"] = Relationship(
+        back_populates="hall",
+        link_model=SeatHallLink,
+        sa_relationship_kwargs={"order_by": "[Seat.row, Seat.column, Seat.id]"},
+    )
 
 
-class CinemaHallPublic(SQLModel):
+class CinemaHallSummaryPublic(SQLModel):
     id: int
     name: str
     capacity: int
     is_vip: bool
     cinema_id: int = Field(foreign_key="cinema.id")
-    seats: List["SeatPublic"]
-    scheme: str = Field(exclude=True)
+    scheme: Optional[str] = Field(default=None, exclude=True)
+    scheme_hash: Optional[str] = None
 
-    @computed_field(return_type=str)
-    def scheme_url(self) -> str:
-        return minio_handler.get_url(self.scheme)
+    @computed_field(return_type=Optional[str])
+    def scheme_url(self) -> Optional[str]:
+        return minio_handler.get_url(self.scheme) if self.scheme else None
+
+
+class CinemaHallPublic(CinemaHallSummaryPublic):
+    seats: Optional[List["SeatPublic"]] = None
 
 
 class CinemaHallCreate(CinemaHallBase):
@@ -86,4 +115,46 @@ class Seat(SQLModel, table=True):
 class SeatPublic(SQLModel):
     id: uuid.UUID
     row: int
-    column: int
\ No newline at end of file
+    column: int
+
+
+class SchemeJobStatus(str, Enum):
+    queued = "queued"
+    parsing = "parsing"
+    storing = "storing"
+    saving = "saving"
+    done = "done"
+    failed = "failed"
+
+
+class SchemeJob(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    hall_id: int = Field(foreign_key="cinemahall.id", index=True, ondelete="CASCADE")
+    status: SchemeJobStatus = SchemeJobStatus.queued
+    error: Optional[str] = None
+    seats: Optional[int] = None
+    scheme: Optional[str] = None
+    created_at: Optional[datetime] = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),
+        sa_column_kwargs={"default": func.now()},
+    )
+    updated_at: Optional[datetime] = updated_at_field()
+
+
+class SchemeJobPublic(SQLModel):
+    id: uuid.UUID
+    hall_id: int
+    status: SchemeJobStatus
+    error: Optional[str] = None
+    seats: Optional[int] = None
+    scheme: Optional[str] = Field(default=None, exclude=True)
+    created_at: datetime
+    updated_at: datetime
+
+    @computed_field(return_type=Optional[str])
+    def scheme_url(self) -> Optional[str]:
+        # A job names its file before it is done with it.
+        if self.status != SchemeJobStatus.done or not self.scheme:
+            return None
+        return minio_handler.get_url(self.scheme)
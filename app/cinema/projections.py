@@ -0,0 +1,11 @@
+from app.cinema.models import CinemaHall, CinemaHallSummaryPublic, Seat, SeatPublic
+from app.utils.projection import Projection, Relation
+
+
+def hall_relation() -> Relation:
+    return Relation(
+        CinemaHall, CinemaHallSummaryPublic, {"seats": Relation(Seat, SeatPublic)}
+    )
+
+
+hall_projection = Projection(hall_relation())
@@ -1,57 +1,107 @@
-from fastapi import APIRouter
+from typing import Annotated
+
+from fastapi import APIRouter, Query
 from fastapi.params import Depends
-from sqlmodel import Session, select
+from sqlalchemy import or_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.cinema.models import CinemaCreate, CinemaPublic, Cinema, CinemaUpdate
+from app.cinema.models import (
+    CinemaCreate,
+    CinemaPublic,
+    Cinema,
+    CinemaUpdate,
+    CinemaNearbyPublic,
+)
 from app.cinema.routers.hall_router import hall_router
-from app.db import get_session
+from app.db import get_read_session, get_session
+from app.utils.cache import response_cache
 from app.utils.exceptions import NotFoundModelException
+from app.utils.geo import covering_prefixes, encode_geohash, haversine_km
+from app.utils.pagination import Page, Pagination
 
 cinema_router = APIRouter(prefix="/cinema", tags=["Cinema"])
 
 
 @cinema_router.post("/", response_model=CinemaPublic)
-def create_cinema(cinema: CinemaCreate, session: Session = Depends(get_session)):
+async def create_cinema(cinema: CinemaCreate, session: AsyncSession = Depends(get_session)):
     db_cinema = Cinema.model_validate(cinema)
+    db_cinema.geohash = encode_geohash(db_cinema.latitude, db_cinema.longitude)
     session.add(db_cinema)
-    session.commit()
-    session.refresh(db_cinema)
+    await session.commit()
+    await response_cache.bump("cinema")
+    await session.refresh(db_cinema)
     return db_cinema
 
 
-@cinema_router.get("/", response_model=list[CinemaPublic])
-def list_cinema(session: Session = Depends(get_session)):
-    cinemas = session.exec(select(Cinema)).all()
-    return cinemas
+@cinema_router.get("/", response_model=Page[CinemaPublic])
+@response_cache.depends_on("cinema")
+async def list_cinema(
+    pagination: Pagination = Depends(), session: AsyncSession = Depends(get_read_session)
+):
+    statement = pagination.apply(select(Cinema), Cinema.id)
+    cinemas = (await session.exec(statement)).all()
+    return pagination.page(cinemas)
+
+
+@cinema_router.get("/nearby", response_model=list[CinemaNearbyPublic])
+@response_cache.depends_on("cinema")
+async def list_nearby_cinema(
+    lat: Annotated[float, Query(ge=-90, le=90)],
+    lon: Annotated[float, Query(ge=-180, le=180)],
+    radius: Annotated[float, Query(gt=0, le=500, description="Radius in km")] = 10,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    session: AsyncSession = Depends(get_read_session),
+):
+    # Geohash prefixes map to contiguous ranges of the geohash index, so
+    # only cinemas in the cells around the point are read. LIKE rather than
+    # a range bound: collations other than C do not order "{" after the
+    # base32 letters.
+    cells = [
+        Cinema.geohash.startswith(prefix) for prefix in covering_prefixes(lat, lon, radius)
+    ]
+    candidates = (await session.exec(select(Cinema).where(or_(*cells)))).all()
+
+    nearby = []
+    for cinema in candidates:
+        distance = haversine_km(lat, lon, cinema.latitude, cinema.longitude)
+        if distance <= radius:
+            nearby.append(CinemaNearbyPublic(**cinema.model_dump(), distance_km=distance))
+    nearby.sort(key=lambda cinema: cinema.distance_km)
+    return nearby[:limit]
 
 
 @cinema_router.get("/{cinema_id}", response_model=CinemaPublic)
-def get_cinema(cinema_id: int, session: Session = Depends(get_session)):
-    if not (cinema := session.get(Cinema, cinema_id)):
+@response_cache.depends_on("cinema")
+async def get_cinema(cinema_id: int, session: AsyncSession = Depends(get_read_session)):
+    if not (cinema := await session.get(Cinema, cinema_id)):
         raise NotFoundModelException(Cinema)
     return cinema
 
 
 @cinema_router.patch("/{cinema_id}", response_model=CinemaPublic)
-def update_cinema(
-    cinema_id: int, cinema: CinemaUpdate, session: Session = Depends(get_session)
+async def update_cinema(
+    cinema_id: int, cinema: CinemaUpdate, session: AsyncSession = Depends(get_session)
 ):
-    if not (db_cinema := session.get(Cinema, cinema_id)):
+    if not (db_cinema := await session.get(Cinema, cinema_id)):
         raise NotFoundModelException(Cinema)
     cinema_data = cinema.model_dump(exclude_unset=True)
     db_cinema.sqlmodel_update(cinema_data)
+    db_cinema.geohash = encode_geohash(db_cinema.latitude, db_cinema.longitude)
     session.add(db_cinema)
-    session.commit()
-    session.refresh(db_cinema)
+    await session.commit()
+    await response_cache.bump("cinema")
+    await session.refresh(db_cinema)
     return db_cinema
 
 
 @cinema_router.delete("/{cinema_id}")
-def delete_cinema(cinema_id: int, session: Session = Depends(get_session)):
-    if not (cinema := session.get(Cinema, cinema_id)):
+async def delete_cinema(cinema_id: int, session: AsyncSession = Depends(get_session)):
+    if not (cinema := await session.get(Cinema, cinema_id)):
         raise NotFoundModelException(Cinema)
-    session.delete(cinema)
-    session.commit()
+    await session.delete(cinema)
+    await session.commit()
+    await response_cache.bump("cinema")
     return {"message": f"Successfully deleted cinema with id {cinema_id}"}
 
 
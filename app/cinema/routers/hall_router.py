@@ -1,127 +1,296 @@
+import uuid
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, UploadFile, Form
-from sqlalchemy import delete
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, UploadFile, Form, Header, Path, Response
+from fastapi.responses import StreamingResponse
+from minio.error import S3Error
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.cinema.models import (
     CinemaHallPublic,
     CinemaHallCreate,
     Cinema,
     CinemaHall,
-    CinemaHallUpdate, Seat, SeatHallLink,
+    CinemaHallUpdate,
+    SchemeJob,
+    SchemeJobPublic,
 )
-from app.db import get_session
+from app.cinema.projections import hall_projection
+from app.cinema.schemes import (
+    SCHEME_CACHE_CONTROL,
+    scheme_name,
+    scheme_pipeline,
+    upload_name,
+)
+from app.config import settings
+from app.db import get_read_session, get_session
 from app.minio import minio_handler
-from app.utils.exceptions import NotFoundModelException
-from app.utils.svg import process_scheme
+from app.utils.cache import response_cache
+from app.utils.exceptions import (
+    NotFoundModelException,
+    NotFoundSchemeException,
+    SchemeTooLargeException,
+)
+from app.utils.http import etag_matches, parse_range
+from app.utils.pagination import Page, Pagination
+from app.utils.projection import Projected
 
 hall_router = APIRouter(prefix="/hall", tags=["Hall"])
 
 
 @hall_router.post("/", response_model=CinemaHallPublic)
-def create_hall(
-    cinema_id: int, hall: CinemaHallCreate, session: Session = Depends(get_session)
+async def create_hall(
+    cinema_id: int,
+    hall: CinemaHallCreate,
+    projection: Projected = Depends(hall_projection.detail),
+    session: AsyncSession = Depends(get_session),
 ):
-    if not (cinema := session.get(Cinema, cinema_id)):
+    if not (cinema := await session.get(Cinema, cinema_id)):
         raise NotFoundModelException(Cinema)
     db_hall = CinemaHall(**hall.model_dump(), cinema_id=cinema_id)
     session.add(db_hall)
-    session.commit()
-    session.refresh(db_hall)
-    return db_hall
+    await session.commit()
+    await response_cache.bump("hall")
+    if projection.expand:
+        await session.refresh(db_hall, list(projection.expand))
+    return projection.render(db_hall)
 
 
 @hall_router.get("/{hall_id}", response_model=CinemaHallPublic)
-def get_hall(cinema_id: int, hall_id: int, session: Session = Depends(get_session)):
+@response_cache.depends_on("cinema", "hall")
+async def get_hall(
+    cinema_id: int,
+    hall_id: int,
+    projection: Projected = Depends(hall_projection.detail),
+    session: AsyncSession = Depends(get_read_session),
+):
     if not (
-        hall := session.exec(
-            select(CinemaHall).where(
-                CinemaHall.cinema_id == cinema_id, CinemaHall.id == hall_id
+        hall := (
+            await session.exec(
+                select(CinemaHall)
+                .where(CinemaHall.cinema_id == cinema_id, CinemaHall.id == hall_id)
+                .options(*projection.options())
             )
         ).first()
     ):
         raise NotFoundModelException(CinemaHall)
 
-    return hall
+    return projection.render(hall)
 
 
 @hall_router.patch("/{hall_id}", response_model=CinemaHallPublic)
-def update_hall(
+async def update_hall(
     cinema_id: int,
     hall_id: int,
     hall: CinemaHallUpdate,
-    session: Session = Depends(get_session),
+    projection: Projected = Depends(hall_projection.detail),
+    session: AsyncSession = Depends(get_session),
 ):
     if not (
-        db_hall := session.exec(
-            select(CinemaHall).where(
-                CinemaHall.cinema_id == cinema_id, CinemaHall.id == hall_id
+        db_hall := (
+            await session.exec(
+                select(CinemaHall)
+                .where(CinemaHall.cinema_id == cinema_id, CinemaHall.id == hall_id)
+                .options(*projection.options())
             )
         ).first()
     ):
         raise NotFoundModelException(CinemaHall)
-    hall_data = CinemaHall.model_dump(hall)
+    hall_data = hall.model_dump(exclude_unset=True)
     db_hall.sqlmodel_update(hall_data)
     session.add(db_hall)
-    session.commit()
-    session.refresh(db_hall)
-    return db_hall
+    await session.commit()
+    await response_cache.bump("hall")
+    return projection.render(db_hall)
 
 
 @hall_router.delete("/{hall_id}")
-def delete_hall(cinema_id: int, hall_id: int, session: Session = Depends(get_session)):
+async def delete_hall(
+    cinema_id: int, hall_id: int, session: AsyncSession = Depends(get_session)
+):
     if not (
-        hall := session.exec(
-            select(CinemaHall).where(
-                CinemaHall.cinema_id == cinema_id, CinemaHall.id == hall_id
+        hall := (
+            await session.exec(
+                select(CinemaHall).where(
+                    CinemaHall.cinema_id == cinema_id, CinemaHall.id == hall_id
+                )
             )
         ).first()
     ):
         raise NotFoundModelException(CinemaHall)
-    session.delete(hall)
-    session.commit()
+    await session.delete(hall)
+    await session.commit()
+    await response_cache.bump("hall")
     return {"message": f"Successfully deleted hall with id {hall_id}"}
 
 
-@hall_router.get("/", response_model=list[CinemaHallPublic])
-def list_hall(cinema_id: int, session: Session = Depends(get_session)):
-    if not (cinema := session.get(Cinema, cinema_id)):
+@hall_router.get("/", response_model=Page[CinemaHallPublic])
+@response_cache.depends_on("cinema", "hall")
+async def list_hall(
+    cinema_id: int,
+    pagination: Pagination = Depends(),
+    projection: Projected = Depends(hall_projection.summary),
+    session: AsyncSession = Depends(get_read_session),
+):
+    if not (cinema := await session.get(Cinema, cinema_id)):
         raise NotFoundModelException(Cinema)
-    statement = select(CinemaHall).where(CinemaHall.cinema_id == cinema.id)
-    halls = session.exec(statement).all()
+    statement = pagination.apply(
+        select(CinemaHall)
+        .where(CinemaHall.cinema_id == cinema.id)
+        .options(*projection.options()),
+        CinemaHall.id,
+    )
+    halls = (await session.exec(statement)).all()
+
+    return projection.render_page(pagination.page(halls))
 
-    return halls
 
-@hall_router.post("/{hall_id}/scheme")
-def upload_scheme(svg_file: UploadFile, cinema_id: int, hall_id: int, session: Session = Depends(get_session)):
+@hall_router.post("/{hall_id}/scheme", response_model=SchemeJobPublic, status_code=202)
+async def upload_scheme(svg_file: UploadFile, cinema_id: int, hall_id: int, session: AsyncSession = Depends(get_session)):
+    """Store the upload and queue it for processing. Poll the returned
+    job until it is ``done`` (the hall has the new scheme and seats) or
+    ``failed``."""
     if not (
-        hall := session.exec(
-            select(CinemaHall).where(
-                CinemaHall.cinema_id == cinema_id, CinemaHall.id == hall_id
+        hall := (
+            await session.exec(
+                select(CinemaHall).where(
+                    CinemaHall.cinema_id == cinema_id, CinemaHall.id == hall_id
+                )
             )
         ).first()
     ):
         raise NotFoundModelException(CinemaHall)
+    if svg_file.size > settings.scheme_max_bytes:
+        raise SchemeTooLargeException(f"more than {settings.scheme_max_bytes} bytes")
+
+    job = SchemeJob(hall_id=hall.id)
+    await minio_handler.upload_file(upload_name(job.id), svg_file.file, svg_file.size)
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    scheme_pipeline.submit(job.id, hall.id, cinema_id)
+    return job
+
+
+@hall_router.get("/{hall_id}/scheme/jobs/{job_id}", response_model=SchemeJobPublic)
+async def get_scheme_job(
+    cinema_id: int,
+    hall_id: int,
+    job_id: uuid.UUID,
+    session: AsyncSession = Depends(get_read_session),
+):
+    if not (
+        job := (
+            await session.exec(
+                select(SchemeJob)
+                .join(CinemaHall)
+                .where(
+                    SchemeJob.id == job_id,
+                    CinemaHall.cinema_id == cinema_id,
+                    CinemaHall.id == hall_id,
+                )
+            )
+        ).first()
+    ):
+        raise NotFoundModelException(SchemeJob)
+    return job
 
-    seat_ids = [seat.id for seat in hall.seats]
-    session.exec(delete(SeatHallLink).where(SeatHallLink.seat_id.in_(seat_ids)))
-    session.exec(delete(Seat).where(Seat.id.in_(seat_ids)))
-    session.commit()
 
-    scheme, seats = process_scheme(svg_file.file)
+async def scheme_response(
+    name: str,
+    etag: str | None,
+    cache_control: str,
+    range: str | None,
+    if_none_match: str | None,
+):
+    """Serve the stored scheme ``name``. A known ``etag`` answers a
+    matching If-None-Match without asking storage."""
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": cache_control}
+    if etag is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers | {"ETag": etag})
+
+    try:
+        stat = await minio_handler.stats(name)
+    except S3Error as e:
+        if e.code == "NoSuchKey":
+            raise NotFoundSchemeException()
+        raise
+
+    etag = etag or f'"{stat.etag}"'
+    headers["ETag"] = etag
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
 
-    scheme_object_name = f"cinema_{cinema_id}/hall_{hall_id}.svg"
-    minio_handler.upload_file(scheme_object_name, scheme, scheme.getbuffer().nbytes)
+    if (byte_range := parse_range(range, stat.size)) is None:
+        return StreamingResponse(
+            minio_handler.download_file(name),
+            media_type="image/svg+xml",
+            headers=headers | {"Content-Length": str(stat.size)},
+        )
 
-    print(seats)
-    hall.scheme = scheme_object_name
-    for seat in seats:
-        seat.hall = hall
+    start, end = byte_range
+    return StreamingResponse(
+        minio_handler.download_file(name, offset=start, length=end - start + 1),
+        status_code=206,
+        media_type="image/svg+xml",
+        headers=headers
+        | {
+            "Content-Range": f"bytes {start}-{end}/{stat.size}",
+            "Content-Length": str(end - start + 1),
+        },
+    )
 
-    session.add_all([hall] + seats)
-    session.commit()
 
-    url = minio_handler.get_url(scheme_object_name)
+@hall_router.get("/{hall_id}/scheme")
+async def download_scheme(
+    cinema_id: int,
+    hall_id: int,
+    range: Annotated[str | None, Header()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """The hall's current scheme. It changes with every upload, so caches
+    must revalidate; ``/scheme/{scheme_hash}`` can be cached for good."""
+    if not (
+        hall := (
+            await session.exec(
+                select(CinemaHall).where(
+                    CinemaHall.cinema_id == cinema_id, CinemaHall.id == hall_id
+                )
+            )
+        ).first()
+    ):
+        raise NotFoundModelException(CinemaHall)
+    if not hall.scheme:
+        raise NotFoundSchemeException()
+    etag = f'"{hall.scheme_hash}"' if hall.scheme_hash else None
+    return await scheme_response(hall.scheme, etag, "no-cache", range, if_none_match)
+
 
-    return {"object_name": scheme_object_name, "download_url": url}
+@hall_router.get("/{hall_id}/scheme/{scheme_hash}")
+async def download_scheme_version(
+    cinema_id: int,
+    hall_id: int,
+    scheme_hash: Annotated[str, Path(pattern="^[0-9a-f]{64}$")],
+    range: Annotated[str | None, Header()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """A scheme of the hall by its ``scheme_hash``. The content behind this
+    URL never changes, so it is served as immutable, and a replaced scheme
+    stays here until the sweep removes it
+    (``scheme_sweep_grace_seconds``)."""
+    if not (
+        hall := (
+            await session.exec(
+                select(CinemaHall).where(
+                    CinemaHall.cinema_id == cinema_id, CinemaHall.id == hall_id
+                )
+            )
+        ).first()
+    ):
+        raise NotFoundModelException(CinemaHall)
+    return await scheme_response(
+        scheme_name(scheme_hash), f'"{scheme_hash}"', SCHEME_CACHE_CONTROL, range, if_none_match
+    )
@@ -0,0 +1,342 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from minio.error import S3Error
+from sqlalchemy import exists, update
+from sqlmodel import select
+from starlette.exceptions import HTTPException
+
+from app import db
+from app.booking.availability import availability_cache
+from app.cinema.models import CinemaHall, SchemeJob, SchemeJobStatus
+from app.cinema.seats import replace_hall_seats
+from app.config import settings
+from app.minio import minio_handler
+from app.utils.cache import response_cache
+from app.utils.svg import parse_scheme
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED = (
+    SchemeJobStatus.queued,
+    SchemeJobStatus.parsing,
+    SchemeJobStatus.storing,
+    SchemeJobStatus.saving,
+)
+
+
+# Stored schemes never change, so clients and CDNs may keep them forever.
+SCHEME_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+SEAT_NAMESPACE = uuid.UUID("0d070512-38ac-4796-8f1d-f09932e3ba82")
+
+
+def upload_name(job_id: uuid.UUID) -> str:
+    """Where the raw upload waits until its job ends."""
+    return f"uploads/{job_id}.svg"
+
+
+SCHEMES_PREFIX = "schemes/"
+
+
+def scheme_name(scheme_hash: str) -> str:
+    return f"{SCHEMES_PREFIX}{scheme_hash}.svg"
+
+
+def seat_namespace(hall_id: int) -> uuid.UUID:
+    """Seat ids derive from the hall and the seat's row and column, so the
+    same plan uploaded again for a hall hashes the same."""
+    return uuid.uuid5(SEAT_NAMESPACE, str(hall_id))
+
+
+@dataclass
+class SchemeTask:
+    job_id: uuid.UUID
+    hall_id: int
+    cinema_id: int
+    scheme: bytes | None = None
+    seats: list[dict] = field(default_factory=list)
+    scheme_hash: str | None = None
+
+
+class SchemePipeline:
+    """Runs scheme jobs through three stages, each with its own queue and
+    workers: parse the raw upload in a process pool, store the processed
+    SVG, then swap the hall's seats. A large scheme only ever occupies a
+    pool process, never the event loop or a request's DB connection.
+
+    Jobs are rows in the database, so any API worker can report on them,
+    and the raw upload stays in storage until the job ends, so one cut
+    off by a restart can run again (see ``recover``).
+    """
+
+    def __init__(self, workers: int, stale: float, grace: float):
+        self.workers = workers
+        self.stale = stale
+        self.grace = grace
+        self.swept = 0
+        self.done = 0
+        self.failed = 0
+        self._pool: ProcessPoolExecutor | None = None
+        self._queues: list[asyncio.Queue[SchemeTask]] = []
+        self._tasks: list[asyncio.Task] = []
+
+    def submit(self, job_id: uuid.UUID, hall_id: int, cinema_id: int):
+        self._start()
+        self._queues[0].put_nowait(SchemeTask(job_id, hall_id, cinema_id))
+
+    def _start(self):
+        if self._tasks:
+            return
+        # Forking a process that runs an event loop and threads is unsafe.
+        self._pool = ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        # One saver: seat swaps of different halls would only contend for
+        # the same connection pool.
+        stages = [(self._parse, self.workers), (self._store, self.workers), (self._save, 1)]
+        self._queues = [asyncio.Queue() for _ in stages]
+        for i, (stage, concurrency) in enumerate(stages):
+            next_queue = self._queues[i + 1] if i + 1 < len(stages) else None
+            self._tasks += [
+                asyncio.create_task(self._run(stage, self._queues[i], next_queue))
+                for _ in range(concurrency)
+            ]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, stage, queue: asyncio.Queue, next_queue: asyncio.Queue | None):
+        while True:
+            task = await queue.get()
+            try:
+                await stage(task)
+            except HTTPException as e:
+                await self._fail(task, e.detail)
+            except Exception:
+                logger.exception("scheme job %s failed", task.job_id)
+                await self._fail(task, "processing failed")
+            else:
+                if next_queue is not None:
+                    next_queue.put_nowait(task)
+            finally:
+                queue.task_done()
+
+    async def join(self):
+        """Wait until every job submitted so far has finished."""
+        # A job moves on before it leaves its stage, so stage by stage
+        # is enough.
+        for queue in self._queues:
+            await queue.join()
+
+    async def _set_status(self, job_id: uuid.UUID, status: SchemeJobStatus, **values):
+        async with db.new_session() as session:
+            await session.execute(
+                update(SchemeJob)
+                .where(SchemeJob.id == job_id)
+                .values(status=status, **values)
+            )
+            await session.commit()
+
+    async def _parse(self, task: SchemeTask):
+        await self._set_status(task.job_id, SchemeJobStatus.parsing)
+        data = await minio_handler.read_file(upload_name(task.job_id))
+        task.scheme, task.seats, task.scheme_hash = (
+            await asyncio.get_running_loop().run_in_executor(
+                self._pool, parse_scheme, data, seat_namespace(task.hall_id)
+            )
+        )
+
+    async def _store(self, task: SchemeTask):
+        name = scheme_name(task.scheme_hash)
+        # The job names its file before looking for it, so a sweep that
+        # starts after this leaves the file be.
+        await self._set_status(task.job_id, SchemeJobStatus.storing, scheme=name)
+        # Objects are named by content, so one that exists already is this
+        # very file and the upload can be skipped. Not if it is halfway
+        # to the sweep's grace period, though: a sweep that looked before
+        # the job named it may be about to remove it. Uploading it again
+        # restarts its clock.
+        if not await self._fresh(name):
+            await self._upload(name, task.scheme)
+        task.scheme = None
+
+    async def _fresh(self, name: str) -> bool:
+        try:
+            stat = await minio_handler.stats(name)
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                return False
+            raise
+        return stat.last_modified > datetime.now(timezone.utc) - timedelta(
+            seconds=self.grace / 2
+        )
+
+    async def _upload(self, name: str, data: bytes):
+        await minio_handler.upload_file(
+            name,
+            io.BytesIO(data),
+            len(data),
+            content_type="image/svg+xml",
+            cache_control=SCHEME_CACHE_CONTROL,
+        )
+
+    async def _save(self, task: SchemeTask):
+        await self._set_status(task.job_id, SchemeJobStatus.saving)
+        name = scheme_name(task.scheme_hash)
+        async with db.new_session() as session:
+            hall = (
+                await session.exec(
+                    select(CinemaHall).where(CinemaHall.id == task.hall_id).with_for_update()
+                )
+            ).first()
+            if hall is None:
+                # The job went with the hall.
+                await self._cleanup(task)
+                return
+            created_at = select(SchemeJob.created_at).where(SchemeJob.id == task.job_id)
+            if await session.scalar(
+                select(
+                    exists().where(
+                        SchemeJob.hall_id == task.hall_id,
+                        SchemeJob.status == SchemeJobStatus.done,
+                        SchemeJob.created_at > created_at.scalar_subquery(),
+                    )
+                )
+            ):
+                await session.rollback()
+                await self._fail(task, "superseded by a newer upload")
+                return
+
+            # The hall has this very plan already, with the same seat ids:
+            # leave its seats, and the tickets on them, alone.
+            changed = hall.scheme_hash != task.scheme_hash
+            if changed:
+                hall.scheme, hall.scheme_hash = name, task.scheme_hash
+                session.add(hall)
+                await replace_hall_seats(session, hall.id, task.seats)
+            await session.execute(
+                update(SchemeJob)
+                .where(SchemeJob.id == task.job_id)
+                .values(status=SchemeJobStatus.done, seats=len(task.seats), scheme=name)
+            )
+            await session.commit()
+
+        self.done += 1
+        if changed:
+            await response_cache.bump("hall")
+            availability_cache.invalidate_hall(task.hall_id)
+        await self._cleanup(task)
+
+    async def _fail(self, task: SchemeTask, error: str):
+        self.failed += 1
+        try:
+            await self._set_status(task.job_id, SchemeJobStatus.failed, error=error)
+        except Exception:
+            logger.exception("could not mark scheme job %s failed", task.job_id)
+        # A scheme stored for a failed job is left to the sweep.
+        await self._cleanup(task)
+
+    async def _remove(self, name: str):
+        try:
+            await minio_handler.remove_file(name)
+        except Exception:
+            logger.warning("could not remove %s", name, exc_info=True)
+
+    async def _cleanup(self, task: SchemeTask):
+        await self._remove(upload_name(task.job_id))
+
+    async def _in_use(self, name: str) -> bool:
+        """Whether a hall points at the file, or a job that has not
+        finished may be about to."""
+        async with db.new_session() as session:
+            return await session.scalar(
+                select(
+                    exists().where(CinemaHall.scheme == name)
+                    | exists().where(SchemeJob.scheme == name, SchemeJob.status.in_(UNFINISHED))
+                )
+            )
+
+    async def sweep(self):
+        """Remove the stored schemes that no hall or unfinished job uses
+        and that were stored more than ``grace`` seconds ago. Replaced
+        schemes are never removed inline: the same file may be another
+        hall's, and clients may hold its immutable URL."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.grace)
+        for obj in await minio_handler.list(prefix=SCHEMES_PREFIX):
+            if obj["last_modified"] < cutoff and not await self._in_use(obj["name"]):
+                minio_handler.invalidate_url(obj["name"])
+                await self._remove(obj["name"])
+                self.swept += 1
+
+    async def sweeper(self, interval: float):
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("scheme sweep failed")
+            await asyncio.sleep(interval)
+
+    async def recover(self):
+        """Run again the jobs that have not moved for ``stale`` seconds.
+        Claiming them is one conditional UPDATE, so of several workers
+        starting at once only one picks up each job."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.stale)
+        try:
+            async with db.new_session() as session:
+                jobs = (
+                    await session.execute(
+                        update(SchemeJob)
+                        .where(SchemeJob.status.in_(UNFINISHED), SchemeJob.updated_at < cutoff)
+                        .values(status=SchemeJobStatus.queued)
+                        .returning(SchemeJob.id, SchemeJob.hall_id)
+                    )
+                ).all()
+                await session.commit()
+                cinemas = dict(
+                    (
+                        await session.exec(
+                            select(CinemaHall.id, CinemaHall.cinema_id).where(
+                                CinemaHall.id.in_({hall_id for _, hall_id in jobs})
+                            )
+                        )
+                    ).all()
+                )
+        except Exception:
+            logger.exception("could not recover scheme jobs")
+            return
+        for job_id, hall_id in jobs:
+            self.submit(job_id, hall_id, cinemas[hall_id])
+        if jobs:
+            logger.info("resumed %d scheme jobs", len(jobs))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": {
+                stage: queue.qsize()
+                for stage, queue in zip(("parse", "store", "save"), self._queues)
+            },
+            "done": self.done,
+            "failed": self.failed,
+            "swept": self.swept,
+        }
+
+
+scheme_pipeline = SchemePipeline(
+    settings.scheme_workers,
+    settings.scheme_job_stale_seconds,
+    settings.scheme_sweep_grace_seconds,
+)
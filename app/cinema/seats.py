@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+from itertools import batched
+
+from sqlalchemy import delete, exists, func, insert, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.booking.models import Ticket, TicketStatus
+from app.cinema.models import Seat, SeatHallLink
+from app.film.models import FilmScreening
+from app.utils.exceptions import SoldTicketsException
+
+# Upper bound for one executemany call and for the IN list of a DELETE,
+# which keeps each statement well under Postgres' bind-parameter limit.
+BATCH_SIZE = 2000
+
+
+async def replace_hall_seats(session: AsyncSession, hall_id: int, seats: list[dict]):
+    """Swap the hall's seats for ``seats`` using set-based statements.
+
+    Seats the new plan keeps (same id) are left alone, with their tickets.
+    Holds on the seats it drops are released; sold tickets for screenings
+    still to come refuse the swap, and the seats of earlier sold tickets
+    stay in the table, out of the hall, so the tickets keep their seat.
+
+    Nothing is committed here, so callers can keep the swap in the same
+    transaction as the rest of their changes.
+    """
+    old_seat_ids = set(
+        (
+            await session.execute(
+                select(SeatHallLink.seat_id).where(SeatHallLink.hall_id == hall_id)
+            )
+        ).scalars().all()
+    )
+    new_seat_ids = {seat["id"] for seat in seats}
+    removed = list(old_seat_ids - new_seat_ids)
+    added = [seat for seat in seats if seat["id"] not in old_seat_ids]
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for batch in batched(removed, BATCH_SIZE):
+        if sold := await session.scalar(
+            select(func.count())
+            .select_from(Ticket)
+            .join(FilmScreening, FilmScreening.id == Ticket.screening_id)
+            .where(
+                Ticket.seat_id.in_(batch),
+                Ticket.status == TicketStatus.sold,
+                FilmScreening.ends_at > now,
+            )
+        ):
+            raise SoldTicketsException(f"{sold} on seats the new plan removes")
+        await session.execute(
+            delete(Ticket).where(Ticket.seat_id.in_(batch), Ticket.status == TicketStatus.held)
+        )
+        await session.execute(
+            delete(SeatHallLink).where(
+                SeatHallLink.hall_id == hall_id, SeatHallLink.seat_id.in_(batch)
+            )
+        )
+        await session.execute(
+            delete(Seat).where(
+                Seat.id.in_(batch), ~exists().where(Ticket.seat_id == Seat.id)
+            )
+        )
+
+    for batch in batched(added, BATCH_SIZE):
+        # A seat kept for old tickets comes back into the hall as it was.
+        kept = set(
+            (
+                await session.execute(
+                    select(Seat.id).where(Seat.id.in_([seat["id"] for seat in batch]))
+                )
+            ).scalars().all()
+        )
+        if fresh := [seat for seat in batch if seat["id"] not in kept]:
+            await session.execute(insert(Seat), fresh)
+        await session.execute(
+            insert(SeatHallLink),
+            [{"seat_id": seat["id"], "hall_id": hall_id} for seat in batch],
+        )
@@ -0,0 +1,214 @@
+from sqlalchemy import delete, insert, tuple_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.cinema.models import CinemaHall
+from app.film.models import Film, FilmGenreLink, FilmScreening, Genre
+from app.film.schedule import Slot, ends_at, film_runtimes, find_conflicts, retime_films
+from app.utils.imports import ImportReport, Rows
+
+
+async def _genre_ids(
+    session: AsyncSession, names: set[str], report: ImportReport | None = None
+) -> dict[str, int]:
+    """Map genre names to ids, creating the missing genres in one statement."""
+    if not names:
+        return {}
+    ids = dict(
+        (await session.exec(select(Genre.name, Genre.id).where(Genre.name.in_(names))))
+        .all()
+    )
+    if missing := [{"name": name} for name in names if name not in ids]:
+        created = await session.execute(
+            insert(Genre).returning(Genre.name, Genre.id), missing
+        )
+        ids.update(created.tuples().all())
+    if report is not None:
+        report.created += len(missing)
+        report.unchanged += len(names) - len(missing)
+    return ids
+
+
+async def upsert_genres(session: AsyncSession, rows: Rows, report: ImportReport):
+    names = {row.name for _, row in rows}
+    await _genre_ids(session, names, report)
+    report.unchanged += len(rows) - len(names)
+
+
+async def upsert_films(session: AsyncSession, rows: Rows, report: ImportReport):
+    """Films are matched by name. Matched films get their genres replaced,
+    and unknown genre names are created. A new runtime moves the end of the
+    film's screenings, unless that would make them overlap. Of two rows
+    for the same film the first is kept."""
+    films = {}
+    for line, row in rows:
+        if (first := films.get(row.name)) is not None:
+            report.fail(line, f"duplicates line {first[0]}")
+        else:
+            films[row.name] = (line, row)
+    genre_ids = await _genre_ids(
+        session, {genre for _, row in films.values() for genre in row.genres}
+    )
+
+    existing = {
+        name: (film_id, runtime)
+        for name, film_id, runtime in (
+            await session.exec(
+                select(Film.name, Film.id, Film.runtime).where(Film.name.in_(films))
+            )
+        ).all()
+    }
+    ids = {name: film_id for name, (film_id, _) in existing.items()}
+    runtimes = {
+        film_id: films[name][1].runtime
+        for name, (film_id, runtime) in existing.items()
+        if films[name][1].runtime not in (None, runtime)
+    }
+    if runtimes:
+        await session.execute(
+            update(Film), [{"id": i, "runtime": r} for i, r in runtimes.items()]
+        )
+        if rejected := await retime_films(session, runtimes):
+            await session.execute(
+                update(Film),
+                [
+                    {"id": film_id, "runtime": runtime}
+                    for film_id, runtime in existing.values()
+                    if film_id in rejected
+                ],
+            )
+            for name, (film_id, _) in existing.items():
+                if film_id in rejected:
+                    report.fail(
+                        films.pop(name)[0],
+                        f"runtime {runtimes[film_id]} would make {name!r} overlap "
+                        f"screenings {rejected[film_id]}",
+                    )
+                    del ids[name]
+    if ids:
+        await session.execute(
+            delete(FilmGenreLink).where(FilmGenreLink.film_id.in_(ids.values()))
+        )
+    report.updated += len(ids)
+    if missing := [
+        {"name": name, "runtime": row.runtime}
+        for name, (_, row) in films.items()
+        if name not in ids
+    ]:
+        created = await session.execute(
+            insert(Film).returning(Film.name, Film.id), missing
+        )
+        ids.update(created.tuples().all())
+        report.created += len(missing)
+    report.unchanged += len(rows) - report.failed - len(films)
+
+    if links := [
+        {"film_id": ids[name], "genre_id": genre_ids[genre]}
+        for name, (_, row) in films.items()
+        for genre in dict.fromkeys(row.genres)
+    ]:
+        await session.execute(insert(FilmGenreLink), links)
+
+
+async def upsert_screenings(session: AsyncSession, rows: Rows, report: ImportReport):
+    """Screenings are matched by hall and start time, so re-importing a
+    schedule moves a slot to another film instead of duplicating it. Rows
+    that would overlap another screening in the hall fail; of two
+    overlapping rows, or of two for the same slot, the first is kept."""
+    film_names = {row.film for _, row in rows if row.film is not None}
+    film_ids = {row.film_id for _, row in rows if row.film_id is not None}
+    hall_ids = {row.hall_id for _, row in rows}
+
+    films_by_name = {
+        name: (film_id, runtime)
+        for name, film_id, runtime in (
+            await session.exec(
+                select(Film.name, Film.id, Film.runtime).where(Film.name.in_(film_names))
+            )
+        ).all()
+    }
+    runtimes = await film_runtimes(session, film_ids)
+    runtimes.update(films_by_name.values())
+    known_halls = set(
+        (await session.exec(select(CinemaHall.id).where(CinemaHall.id.in_(hall_ids))))
+        .all()
+    )
+
+    slots = {}
+    for line, row in rows:
+        if row.film is None:
+            film_id = row.film_id if row.film_id in runtimes else None
+        else:
+            film_id = films_by_name.get(row.film, (None, None))[0]
+        if film_id is None:
+            report.fail(line, f"film {row.film or row.film_id!r} not found")
+        elif row.hall_id not in known_halls:
+            report.fail(line, f"hall {row.hall_id} not found")
+        elif (first := slots.get((row.hall_id, row.date))) is not None:
+            report.fail(line, f"duplicates line {first[0]}")
+        else:
+            slots[(row.hall_id, row.date)] = (line, film_id)
+    if not slots:
+        return
+
+    existing = {
+        (hall_id, date): (screening_id, film_id)
+        for hall_id, date, screening_id, film_id in (
+            await session.exec(
+                select(
+                    FilmScreening.hall_id,
+                    FilmScreening.date,
+                    FilmScreening.id,
+                    FilmScreening.film_id,
+                ).where(tuple_(FilmScreening.hall_id, FilmScreening.date).in_(slots))
+            )
+        ).all()
+    }
+    proposed = {
+        line: Slot(
+            hall_id,
+            date,
+            ends_at(date, runtimes[film_id]),
+            index=line,
+            screening_id=existing.get((hall_id, date), (None,))[0],
+        )
+        for (hall_id, date), (line, film_id) in slots.items()
+    }
+    # A failed row leaves the screening it would have replaced in place,
+    # which can clash with rows that passed, so repeat until none clash.
+    while conflicts := await find_conflicts(
+        session,
+        list(proposed.values()),
+        {s.screening_id for s in proposed.values() if s.screening_id is not None},
+    ):
+        for pair in conflicts:
+            if not all(s.index is None or s.index in proposed for s in pair):
+                continue
+            # Stored screenings sort first, so the later proposed line fails.
+            other, slot = sorted(pair, key=lambda s: -1 if s.index is None else s.index)
+            del proposed[slot.index]
+            del slots[(slot.hall_id, slot.start)]
+            report.fail(
+                slot.index,
+                f"overlaps line {other.index}"
+                if other.index is not None
+                else f"overlaps screening {other.screening_id}",
+            )
+
+    changed, created = [], []
+    for (hall_id, date), (line, film_id) in slots.items():
+        slot = proposed[line]
+        if (hall_id, date) not in existing:
+            created.append(
+                {"hall_id": hall_id, "date": date, "ends_at": slot.end, "film_id": film_id}
+            )
+        elif existing[(hall_id, date)][1] != film_id:
+            changed.append({"id": slot.screening_id, "film_id": film_id, "ends_at": slot.end})
+    report.unchanged += len(rows) - report.failed - len(created) - len(changed)
+
+    if changed:
+        await session.execute(update(FilmScreening), changed)
+        report.updated += len(changed)
+    if created:
+        await session.execute(insert(FilmScreening), created)
+        report.created += len(created)
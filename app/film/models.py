@@ -1,16 +1,52 @@
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import Annotated, List, Optional
+
+from sqlalchemy import Index, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+from pydantic import AfterValidator, field_validator, model_validator
 from sqlmodel import SQLModel, Field, Relationship
 
 from app.cinema.models import CinemaHallPublic
+from app.config import settings
+from app.db import updated_at_field
+
+
+def runtime_field():
+    """Film runtime in minutes. The upper bound also bounds how long before
+    a screening an overlapping one can start."""
+    return Field(default=None, gt=0, le=settings.film_runtime_max)
+
+
+def naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# Screening times are stored without a time zone, in UTC. Input with an
+# offset is converted; input without one is taken as UTC already.
+ScreeningTime = Annotated[datetime, AfterValidator(naive_utc)]
+
+
+def trigram_index(table: str) -> Index:
+    return Index(
+        f"ix_{table}_name_trgm",
+        "name",
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
 
 
 class FilmGenreLink(SQLModel, table=True):
+    __table_args__ = (Index("ix_filmgenrelink_genre_id", "genre_id"),)
+
     film_id: int = Field(foreign_key="film.id", primary_key=True)
     genre_id: int = Field(foreign_key="genre.id", primary_key=True)
 
 
 class Genre(SQLModel, table=True):
+    __table_args__ = (trigram_index("genre"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
 
@@ -32,12 +68,20 @@ class GenreUpdate(SQLModel):
     name: str
 
 
+class GenreImport(SQLModel):
+    name: str = Field(min_length=1)
+
+
 class FilmBase(SQLModel):
     name: str
+    runtime: Optional[int] = None
 
 
 class Film(FilmBase, table=True):
+    __table_args__ = (trigram_index("film"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    updated_at: Optional[datetime] = updated_at_field()
 
     genres: List[Genre] = Relationship(back_populates="films", link_model=FilmGenreLink)
     screenings: List["FilmScreening"] = Relationship(back_populates="film")
@@ -46,22 +90,72 @@ class Film(FilmBase, table=True):
 class FilmCreate(SQLModel):
     name: str
     genres: list[int]
+    runtime: Optional[int] = runtime_field()
+
+
+class FilmSummaryPublic(SQLModel):
+    id: int
+    name: str
+    runtime: Optional[int] = None
+
+
+class FilmPublic(FilmSummaryPublic):
+    genres: Optional[List[GenrePublic]] = None
+    screenings: Optional[List["FilmScreeningInFilmPublic"]] = None
 
 
-class FilmPublic(SQLModel):
+class FilmSearchResultPublic(SQLModel):
     id: int
     name: str
-    genres: List[GenrePublic]
-    screenings: List["FilmScreeningPublic"]
+    score: float
+
+
+class GenreSearchResultPublic(SQLModel):
+    id: int
+    name: str
+    score: float
 
 
 class FilmUpdate(SQLModel):
     name: str | None = None
     genres: list[int] | None = None
+    runtime: int | None = runtime_field()
+
+
+class FilmImport(SQLModel):
+    name: str = Field(min_length=1)
+    genres: list[str] = []
+    runtime: Optional[int] = runtime_field()
+
+    @field_validator("runtime", mode="before")
+    @classmethod
+    def empty_runtime(cls, value):
+        return None if value == "" else value
+
+    @field_validator("genres", mode="before")
+    @classmethod
+    def split_genres(cls, value):
+        if isinstance(value, str):
+            return [name.strip() for name in value.split("|") if name.strip()]
+        return value
 
 class FilmScreening(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_filmscreening_hall_id_date", "hall_id", "date"),
+        Index("ix_filmscreening_film_id_date", "film_id", "date"),
+        # Enforces what app.film.schedule checks, also under concurrent writes.
+        ExcludeConstraint(
+            ("hall_id", "="),
+            (text("tsrange(date, ends_at)"), "&&"),
+            name="ex_filmscreening_hall_id_time",
+            using="gist",
+        ).ddl_if(dialect="postgresql"),
+    )
+
     id: Optional[int] = Field(primary_key=True, default=None)
-    date: datetime
+    date: datetime = Field(index=True)
+    ends_at: datetime
+    updated_at: Optional[datetime] = updated_at_field()
 
     film_id: int = Field(foreign_key="film.id")
     hall_id: int = Field(foreign_key="cinemahall.id")
@@ -70,20 +164,84 @@ class FilmScreening(SQLModel, table=True):
     hall: Optional["CinemaHall"] = Relationship(back_populates="screenings")
 
 class FilmScreeningCreate(SQLModel):
-    date: datetime
+    date: ScreeningTime
 
     film_id: int = Field(foreign_key="film.id")
     hall_id: int = Field(foreign_key="cinemahall.id")
 
 class FilmScreeningUpdate(SQLModel):
-    date: datetime | None = None
+    date: ScreeningTime | None = None
 
     film_id: int | None = None
     hall_id: int | None = None
 
-class FilmScreeningPublic(SQLModel):
+class FilmScreeningSummaryPublic(SQLModel):
+    id: int
+    date: datetime
+    ends_at: datetime
+
+    film_id: int
+    hall_id: int
+
+class FilmScreeningImport(SQLModel):
+    date: ScreeningTime
+    hall_id: int
+
+    film_id: int | None = None
+    film: str | None = None
+
+    @model_validator(mode="after")
+    def check_film(self):
+        if (self.film_id is None) == (self.film is None):
+            raise ValueError("exactly one of film_id or film is required")
+        return self
+
+class FilmScreeningInFilmPublic(FilmScreeningSummaryPublic):
+    hall: Optional[CinemaHallPublic] = None
+
+class FilmScreeningPublic(FilmScreeningSummaryPublic):
+    film: Optional[FilmPublic] = None
+    hall: Optional[CinemaHallPublic] = None
+
+
+class ScheduleEntryPublic(SQLModel):
     id: int
     date: datetime
+    ends_at: datetime
+
+    film_id: int
+    film_name: str
+    hall_id: int
+    hall_name: str
+    is_vip: bool
+    cinema_id: int
+    cinema_name: str
+
+
+class ScheduleConflictPublic(SQLModel):
+    index: int
+    hall_id: int
+    date: datetime
+    ends_at: datetime
+    # What it overlaps: another proposed screening or a stored one.
+    other_index: Optional[int] = None
+    screening_id: Optional[int] = None
+
+
+class ScheduleRowError(SQLModel):
+    index: int
+    error: str
+
+
+class ScheduleValidationPublic(SQLModel):
+    checked: int
+    valid: bool
+    conflicts: List[ScheduleConflictPublic]
+    errors: List[ScheduleRowError]
+
 
-    film: FilmPublic
-    hall: CinemaHallPublic
+class ScheduleExportRow(ScheduleEntryPublic):
+    cinema_address: str
+    latitude: float
+    longitude: float
+    updated_at: datetime
@@ -0,0 +1,38 @@
+from app.cinema.projections import hall_relation
+from app.film.models import (
+    Film,
+    FilmScreening,
+    FilmScreeningSummaryPublic,
+    FilmSummaryPublic,
+    Genre,
+    GenrePublic,
+)
+from app.utils.projection import Projection, Relation
+
+film_projection = Projection(
+    Relation(
+        Film,
+        FilmSummaryPublic,
+        {
+            "genres": Relation(Genre, GenrePublic),
+            "screenings": Relation(
+                FilmScreening, FilmScreeningSummaryPublic, {"hall": hall_relation()}
+            ),
+        },
+    ),
+    detail=("genres", "screenings.hall"),
+)
+
+screening_projection = Projection(
+    Relation(
+        FilmScreening,
+        FilmScreeningSummaryPublic,
+        {
+            "film": Relation(
+                Film, FilmSummaryPublic, {"genres": Relation(Genre, GenrePublic)}
+            ),
+            "hall": hall_relation(),
+        },
+    ),
+    detail=("film.genres", "hall"),
+)
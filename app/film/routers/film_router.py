@@ -1,115 +1,240 @@
-from fastapi import APIRouter
+from typing import Annotated
+
+from fastapi import APIRouter, Query, UploadFile
 from fastapi.params import Depends
-from sqlmodel import Session, select
+from sqlalchemy import delete
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db import get_session
+from app.booking.tickets import release_screenings
+from app.db import get_read_session, get_session
 from app.film.models import (
     Film,
+    FilmGenreLink,
+    FilmSearchResultPublic,
+    GenreSearchResultPublic,
     FilmPublic,
     FilmCreate,
+    FilmScreening,
+    FilmImport,
     FilmUpdate,
     GenrePublic,
     GenreCreate,
+    GenreImport,
     Genre,
     GenreUpdate,
 )
-from app.utils.exceptions import NotFoundModelException
+from app.film.imports import upsert_films, upsert_genres
+from app.film.projections import film_projection
+from app.film.schedule import retime_films
+from app.film.search import search_statement
+from app.utils.cache import response_cache
+from app.utils.exceptions import NotFoundModelException, ScreeningOverlapException
+from app.utils.imports import ImportFormat, ImportReport, run_import
+from app.utils.pagination import OffsetPagination, Page, Pagination
+from app.utils.projection import Projected
 
 film_router = APIRouter(prefix="/film", tags=["Film"])
 
 
 @film_router.post("/genre", response_model=GenrePublic)
-def create_genre(genre: GenreCreate, session: Session = Depends(get_session)):
+async def create_genre(genre: GenreCreate, session: AsyncSession = Depends(get_session)):
     db_genre = Genre.model_validate(genre)
     session.add(db_genre)
-    session.commit()
-    session.refresh(db_genre)
+    await session.commit()
+    await response_cache.bump("genre")
+    await session.refresh(db_genre)
     return db_genre
 
 
-@film_router.get("/genre", response_model=list[GenrePublic])
-def list_genres(session: Session = Depends(get_session)):
-    genres = session.exec(select(Genre)).all()
-    return genres
+@film_router.get("/genre", response_model=Page[GenrePublic])
+@response_cache.depends_on("genre")
+async def list_genres(
+    pagination: Pagination = Depends(), session: AsyncSession = Depends(get_read_session)
+):
+    statement = pagination.apply(select(Genre), Genre.id)
+    genres = (await session.exec(statement)).all()
+    return pagination.page(genres)
+
+
+@film_router.get("/genre/search", response_model=Page[GenreSearchResultPublic])
+@response_cache.depends_on("genre")
+async def search_genres(
+    q: Annotated[str, Query(min_length=1, max_length=100)],
+    pagination: OffsetPagination = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    statement = pagination.apply(search_statement(Genre, q))
+    genres = (await session.exec(statement)).mappings().all()
+    return pagination.page(genres)
+
+
+@film_router.post("/genre/import", response_model=ImportReport)
+async def import_genres(
+    file: UploadFile,
+    format: ImportFormat | None = None,
+    session: AsyncSession = Depends(get_session),
+):
+    return await run_import(session, file, format, GenreImport, upsert_genres, "genre")
 
 
 @film_router.get("/genre/{genre_id}", response_model=GenrePublic)
-def get_genre(genre_id: int, session: Session = Depends(get_session)):
-    if not (genre := session.get(Genre, genre_id)):
+@response_cache.depends_on("genre")
+async def get_genre(genre_id: int, session: AsyncSession = Depends(get_read_session)):
+    if not (genre := await session.get(Genre, genre_id)):
         raise NotFoundModelException(Genre)
     return genre
 
 
 @film_router.post("/genre/{genre_id}", response_model=GenrePublic)
-def update_genre(
-    genre_id: int, genre: GenreUpdate, session: Session = Depends(get_session)
+async def update_genre(
+    genre_id: int, genre: GenreUpdate, session: AsyncSession = Depends(get_session)
 ):
-    if not (db_genre := session.get(Genre, genre_id)):
+    if not (db_genre := await session.get(Genre, genre_id)):
         raise NotFoundModelException(Genre)
     genre_data = Genre.model_dump(genre)
     db_genre.sqlmodel_update(genre_data)
     session.add(db_genre)
-    session.commit()
-    session.refresh(db_genre)
+    await session.commit()
+    await response_cache.bump("genre")
+    await session.refresh(db_genre)
     return db_genre
 
 
 @film_router.delete("/genre/{genre_id}")
-def delete_genre(genre_id: int, session: Session = Depends(get_session)):
-    if not (genre := session.get(Genre, genre_id)):
+async def delete_genre(genre_id: int, session: AsyncSession = Depends(get_session)):
+    if not (genre := await session.get(Genre, genre_id)):
         raise NotFoundModelException(Genre)
-    session.delete(genre)
-    session.commit()
+    await session.delete(genre)
+    await session.commit()
+    await response_cache.bump("genre")
     return {"message": f"Successfully deleted genre with id {genre_id}"}
 
 
-@film_router.get("/", response_model=list[FilmPublic])
-def list_films(session: Session = Depends(get_session)):
-    films = session.exec(select(Film)).all()
-    return films
+@film_router.get("/", response_model=Page[FilmPublic])
+@response_cache.depends_on("film", "genre", "screening", "hall")
+async def list_films(
+    pagination: Pagination = Depends(),
+    projection: Projected = Depends(film_projection.summary),
+    session: AsyncSession = Depends(get_read_session),
+):
+    statement = pagination.apply(select(Film).options(*projection.options()), Film.id)
+    films = (await session.exec(statement)).all()
+    return projection.render_page(pagination.page(films))
+
+
+@film_router.get("/search", response_model=Page[FilmSearchResultPublic])
+@response_cache.depends_on("film", "genre")
+async def search_films(
+    q: Annotated[str, Query(min_length=1, max_length=100)],
+    genre_id: Annotated[list[int] | None, Query()] = None,
+    pagination: OffsetPagination = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    statement = search_statement(Film, q)
+    if genre_id:
+        statement = statement.where(
+            select(FilmGenreLink)
+            .where(
+                FilmGenreLink.film_id == Film.id, FilmGenreLink.genre_id.in_(genre_id)
+            )
+            .exists()
+        )
+    films = (await session.exec(pagination.apply(statement))).mappings().all()
+    return pagination.page(films)
+
+
+@film_router.post("/import", response_model=ImportReport)
+async def import_films(
+    file: UploadFile,
+    format: ImportFormat | None = None,
+    session: AsyncSession = Depends(get_session),
+):
+    return await run_import(
+        session, file, format, FilmImport, upsert_films, "film", "genre"
+    )
 
 
 @film_router.post("/", response_model=FilmPublic)
-def create_film(film: FilmCreate, session: Session = Depends(get_session)):
-    genres = session.exec(select(Genre).where(Genre.id.in_(film.genres))).all()
+async def create_film(
+    film: FilmCreate,
+    projection: Projected = Depends(film_projection.detail),
+    session: AsyncSession = Depends(get_session),
+):
+    genres = (
+        await session.exec(select(Genre).where(Genre.id.in_(film.genres)))
+    ).all()
 
-    db_film = Film(name=film.name, genres=genres)
+    db_film = Film(name=film.name, runtime=film.runtime, genres=genres)
     session.add(db_film)
-    session.commit()
-    session.refresh(db_film)
-    return db_film
+    await session.commit()
+    await response_cache.bump("film")
+    db_film = await session.get(
+        Film, db_film.id, options=projection.options(), populate_existing=True
+    )
+    return projection.render(db_film)
 
 
 @film_router.get("/{film_id}", response_model=FilmPublic)
-def get_film(film_id: int, session: Session = Depends(get_session)):
-    if not (film := session.get(Film, film_id)):
+@response_cache.depends_on("film", "genre", "screening", "hall")
+async def get_film(
+    film_id: int,
+    projection: Projected = Depends(film_projection.detail),
+    session: AsyncSession = Depends(get_read_session),
+):
+    if not (film := await session.get(Film, film_id, options=projection.options())):
         raise NotFoundModelException(Film)
-    return film
+    return projection.render(film)
 
 
 @film_router.post("/{film_id}", response_model=FilmPublic)
-def update_film(
-    film_id: int, film: FilmUpdate, session: Session = Depends(get_session)
+async def update_film(
+    film_id: int,
+    film: FilmUpdate,
+    projection: Projected = Depends(film_projection.detail),
+    session: AsyncSession = Depends(get_session),
 ):
-    if not (db_film := session.get(Film, film_id)):
+    if not (
+        db_film := await session.get(
+            Film, film_id, options=(selectinload(Film.genres),)
+        )
+    ):
         raise NotFoundModelException(Film)
 
     if film.name:
         db_film.name = film.name
     if film.genres:
-        genres = session.exec(select(Genre).where(Genre.id.in_(film.genres))).all()
+        genres = (
+            await session.exec(select(Genre).where(Genre.id.in_(film.genres)))
+        ).all()
         db_film.genres = genres
+    retimed = "runtime" in film.model_fields_set and film.runtime != db_film.runtime
+    if retimed:
+        db_film.runtime = film.runtime
+        if rejected := await retime_films(session, {film_id: film.runtime}):
+            await session.rollback()
+            raise ScreeningOverlapException(rejected[film_id])
 
     session.add(db_film)
-    session.commit()
-    session.refresh(db_film)
-    return db_film
+    await session.commit()
+    await response_cache.bump("film")
+    if retimed:
+        await response_cache.bump("screening")
+    db_film = await session.get(
+        Film, db_film.id, options=projection.options(), populate_existing=True
+    )
+    return projection.render(db_film)
 
 
 @film_router.delete("/{film_id}")
-def delete_film(film_id: int, session: Session = Depends(get_session)):
-    if not (film := session.get(Film, film_id)):
+async def delete_film(film_id: int, session: AsyncSession = Depends(get_session)):
+    if not (film := await session.get(Film, film_id)):
         raise NotFoundModelException(Film)
-    session.delete(film)
-    session.commit()
+    # The film's screenings go with it.
+    await release_screenings(session, FilmScreening.film_id == film_id, what="The film")
+    await session.execute(delete(FilmScreening).where(FilmScreening.film_id == film_id))
+    await session.delete(film)
+    await session.commit()
+    await response_cache.bump("film", "screening")
     return {"message": f"Successfully deleted film with id {film_id}"}
@@ -1,50 +1,309 @@
-from fastapi import APIRouter
+from datetime import datetime, timedelta
+from typing import Annotated
+
+from fastapi import APIRouter, Body, Request, UploadFile
 from fastapi.params import Depends
-from sqlmodel import Session
+from sqlalchemy import exc, func, or_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.cinema.models import CinemaHall
-from app.db import get_session
-from app.film.models import FilmScreeningPublic, FilmScreeningCreate, FilmScreening, Film, FilmScreeningUpdate
-from app.utils.exceptions import NotFoundModelException
+from app.booking.routers.booking_router import booking_router
+from app.booking.tickets import release_screenings
+from app.cinema.models import Cinema, CinemaHall
+from app.config import settings
+from app.db import get_read_session, get_session, open_read_session
+from app.film.models import (
+    FilmScreeningPublic,
+    FilmScreeningCreate,
+    FilmScreeningImport,
+    FilmScreening,
+    Film,
+    FilmScreeningUpdate,
+    ScheduleConflictPublic,
+    ScheduleEntryPublic,
+    ScheduleExportRow,
+    ScheduleRowError,
+    ScheduleValidationPublic,
+    ScreeningTime,
+)
+from app.film.imports import upsert_screenings
+from app.film.projections import screening_projection
+from app.film.schedule import (
+    Slot,
+    ends_at,
+    film_runtimes,
+    find_conflicts,
+    is_overlap_violation,
+)
+from app.utils.cache import response_cache
+from app.utils.exceptions import (
+    InvalidDateRangeException,
+    NotFoundModelException,
+    ScreeningOverlapException,
+)
+from app.utils.exports import ExportFormat, stream_export
+from app.utils.imports import ImportFormat, ImportReport, run_import
+from app.utils.projection import Projected
 
 screening_router = APIRouter(prefix="/screening", tags=["Screening"])
 
+
+def schedule_statement(*columns):
+    return (
+        select(
+            FilmScreening.id,
+            FilmScreening.date,
+            FilmScreening.ends_at,
+            Film.id.label("film_id"),
+            Film.name.label("film_name"),
+            CinemaHall.id.label("hall_id"),
+            CinemaHall.name.label("hall_name"),
+            CinemaHall.is_vip,
+            Cinema.id.label("cinema_id"),
+            Cinema.name.label("cinema_name"),
+            *columns,
+        )
+        .join(Film, Film.id == FilmScreening.film_id)
+        .join(CinemaHall, CinemaHall.id == FilmScreening.hall_id)
+        .join(Cinema, Cinema.id == CinemaHall.cinema_id)
+    )
+
+
+async def book_hall(session: AsyncSession, screening: FilmScreening):
+    """Check the hall is free for the whole screening."""
+    slot = Slot(screening.hall_id, screening.date, screening.ends_at, index=0)
+    exclude = [screening.id] if screening.id is not None else []
+    if conflicts := await find_conflicts(session, [slot], exclude):
+        raise ScreeningOverlapException(
+            sorted(other.screening_id for pair in conflicts for other in pair if other.index is None)
+        )
+
+
+async def commit_booking(session: AsyncSession):
+    try:
+        await session.commit()
+    except exc.IntegrityError as e:
+        await session.rollback()
+        if is_overlap_violation(e):
+            raise ScreeningOverlapException([])
+        raise
+
+
 @screening_router.post("/", response_model=FilmScreeningPublic)
-def create_screening(screening: FilmScreeningCreate, session: Session = Depends(get_session)):
+async def create_screening(
+    screening: FilmScreeningCreate,
+    projection: Projected = Depends(screening_projection.detail),
+    session: AsyncSession = Depends(get_session),
+):
 
-    if not (film := session.get(Film, screening.film_id)):
+    if not (film := await session.get(Film, screening.film_id)):
         raise NotFoundModelException(Film)
-    if not (hall := session.get(CinemaHall, screening.hall_id)):
+    if not (hall := await session.get(CinemaHall, screening.hall_id)):
         raise NotFoundModelException(CinemaHall)
 
-    db_screening = FilmScreening.model_validate(screening)
+    db_screening = FilmScreening.model_validate(
+        screening, update={"ends_at": ends_at(screening.date, film.runtime)}
+    )
+    await book_hall(session, db_screening)
 
     db_screening.film = film
     db_screening.hall = hall
 
     session.add(db_screening)
-    session.commit()
-    session.refresh(db_screening)
+    await commit_booking(session)
+    await response_cache.bump("screening")
+
+    session.expunge_all()
+    db_screening = await session.get(
+        FilmScreening, db_screening.id, options=projection.options()
+    )
+    return projection.render(db_screening)
+
+@screening_router.post("/import", response_model=ImportReport)
+async def import_screenings(
+    file: UploadFile,
+    format: ImportFormat | None = None,
+    session: AsyncSession = Depends(get_session),
+):
+    return await run_import(
+        session, file, format, FilmScreeningImport, upsert_screenings, "screening"
+    )
+
+
+@screening_router.post("/validate", response_model=ScheduleValidationPublic)
+async def validate_schedule(
+    screenings: Annotated[
+        list[FilmScreeningCreate], Body(max_length=settings.schedule_validate_max)
+    ],
+    session: AsyncSession = Depends(get_session),
+):
+    """Check a proposed schedule, e.g. next week's, without saving it.
+
+    Reports proposals that overlap each other or a stored screening in the
+    same hall, by their position in the request. All proposals are checked
+    together with one query for the films, one for the halls and one for
+    the stored screenings around them.
+    """
+    runtimes = await film_runtimes(session, {s.film_id for s in screenings})
+    halls = set(
+        (
+            await session.exec(
+                select(CinemaHall.id).where(
+                    CinemaHall.id.in_({s.hall_id for s in screenings})
+                )
+            )
+        ).all()
+    )
+
+    errors, slots = [], []
+    for i, screening in enumerate(screenings):
+        if screening.film_id not in runtimes:
+            errors.append(ScheduleRowError(index=i, error=f"film {screening.film_id} not found"))
+        elif screening.hall_id not in halls:
+            errors.append(ScheduleRowError(index=i, error=f"hall {screening.hall_id} not found"))
+        else:
+            end = ends_at(screening.date, runtimes[screening.film_id])
+            slots.append(Slot(screening.hall_id, screening.date, end, index=i))
+
+    conflicts = []
+    for a, b in await find_conflicts(session, slots):
+        # Pairs come ordered by start, so a stored screening can be either side.
+        slot, other = (b, a) if b.index is not None else (a, b)
+        conflicts.append(
+            ScheduleConflictPublic(
+                index=slot.index,
+                hall_id=slot.hall_id,
+                date=slot.start,
+                ends_at=slot.end,
+                other_index=other.index,
+                screening_id=other.screening_id,
+            )
+        )
+    return ScheduleValidationPublic(
+        checked=len(screenings),
+        valid=not errors and not conflicts,
+        conflicts=conflicts,
+        errors=errors,
+    )
+
+
+@screening_router.get("/schedule", response_model=list[ScheduleEntryPublic])
+@response_cache.depends_on("screening", "film", "hall", "cinema")
+async def get_schedule(
+    date_from: ScreeningTime,
+    date_to: ScreeningTime,
+    cinema_id: int | None = None,
+    hall_id: int | None = None,
+    film_id: int | None = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    if date_to <= date_from:
+        raise InvalidDateRangeException("date_to must be after date_from")
+    if date_to - date_from > timedelta(days=settings.schedule_max_days):
+        raise InvalidDateRangeException(
+            f"range must not exceed {settings.schedule_max_days} days"
+        )
+
+    statement = (
+        schedule_statement()
+        .where(FilmScreening.date >= date_from, FilmScreening.date < date_to)
+        .order_by(FilmScreening.date, FilmScreening.id)
+    )
+    if cinema_id is not None:
+        statement = statement.where(CinemaHall.cinema_id == cinema_id)
+    if hall_id is not None:
+        statement = statement.where(FilmScreening.hall_id == hall_id)
+    if film_id is not None:
+        statement = statement.where(FilmScreening.film_id == film_id)
+
+    return (await session.exec(statement)).mappings().all()
+
+
+@screening_router.get(
+    "/export",
+    response_model=list[ScheduleExportRow],
+    responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}}},
+)
+async def export_schedule(
+    request: Request,
+    format: ExportFormat = "ndjson",
+    since: datetime | None = None,
+):
+    """Every screening with its film, hall and cinema, streamed in id order.
+
+    With ``since``, only rows where the screening, film, hall or cinema
+    changed at or after that time are exported. Pass the previous export's
+    ``X-Export-Watermark`` to fetch changes incrementally. The watermark
+    trails the export by ``export_watermark_lag_seconds``, so rows that
+    changed shortly before an export come again in the next one: consumers
+    get every change at least once and should upsert. Deleted screenings
+    are not reported.
+    """
+    # The watermark is read on the connection the rows are streamed from,
+    # so it is that database's clock and snapshot, replica or primary.
+    session = await open_read_session(request)
+    try:
+        now = (await session.exec(select(func.now()))).one()
+    except BaseException:
+        await session.close()
+        raise
+    # SQLite returns CURRENT_TIMESTAMP as text.
+    if not isinstance(now, datetime):
+        now = datetime.fromisoformat(now)
+    watermark = now - timedelta(seconds=settings.export_watermark_lag_seconds)
+    statement = schedule_statement(
+        Cinema.address.label("cinema_address"),
+        Cinema.latitude,
+        Cinema.longitude,
+        FilmScreening.updated_at,
+    ).order_by(FilmScreening.id)
+    if since is not None:
+        statement = statement.where(
+            or_(
+                FilmScreening.updated_at >= since,
+                Film.updated_at >= since,
+                CinemaHall.updated_at >= since,
+                Cinema.updated_at >= since,
+            )
+        )
+    return stream_export(
+        session,
+        statement,
+        format,
+        "schedule",
+        headers={"X-Export-Watermark": watermark.isoformat()},
+    )
 
-    return db_screening
 
 @screening_router.get("/{screening_id}", response_model=FilmScreeningPublic)
-def get_screening(screening_id: int, session: Session = Depends(get_session)):
-    if not (screening := session.get(FilmScreening, screening_id)):
+@response_cache.depends_on("screening", "film", "genre", "hall")
+async def get_screening(
+    screening_id: int,
+    projection: Projected = Depends(screening_projection.detail),
+    session: AsyncSession = Depends(get_read_session),
+):
+    if not (
+        screening := await session.get(
+            FilmScreening, screening_id, options=projection.options()
+        )
+    ):
         raise NotFoundModelException(FilmScreening)
 
-    return screening
+    return projection.render(screening)
 
 @screening_router.post("/{screening_id}", response_model=FilmScreeningPublic)
-def update_screening(
-    screening_id: int, screening: FilmScreeningUpdate, session: Session = Depends(get_session)
+async def update_screening(
+    screening_id: int,
+    screening: FilmScreeningUpdate,
+    projection: Projected = Depends(screening_projection.detail),
+    session: AsyncSession = Depends(get_session),
 ):
-    if not (db_screening := session.get(FilmScreening, screening_id)):
+    if not (db_screening := await session.get(FilmScreening, screening_id)):
         raise NotFoundModelException(FilmScreening)
-    if screening.film_id and not (db_film := session.get(Film, screening.film_id)):
-        raise NotFoundModelException(Film)
-    if screening.hall_id and not (db_hall := session.get(CinemaHall, screening.hall_id)):
+    if not (db_film := await session.get(Film, screening.film_id or db_screening.film_id)):
         raise NotFoundModelException(Film)
+    if screening.hall_id and not (db_hall := await session.get(CinemaHall, screening.hall_id)):
+        raise NotFoundModelException(CinemaHall)
 
     if screening.date:
         db_screening.date = screening.date
@@ -54,18 +313,28 @@ def update_screening(
     if screening.hall_id:
         db_screening.hall = db_hall
         db_screening.hall_id = screening.hall_id
-
+    db_screening.ends_at = ends_at(db_screening.date, db_film.runtime)
+    await book_hall(session, db_screening)
 
     session.add(db_screening)
-    session.commit()
-    session.refresh(db_screening)
-    return db_screening
+    await commit_booking(session)
+    await response_cache.bump("screening")
+    session.expunge_all()
+    db_screening = await session.get(
+        FilmScreening, db_screening.id, options=projection.options()
+    )
+    return projection.render(db_screening)
 
 
 @screening_router.delete("/{screening_id}")
-def delete_screening(screening_id: int, session: Session = Depends(get_session)):
-    if not (creening := session.get(FilmScreening, screening_id)):
+async def delete_screening(screening_id: int, session: AsyncSession = Depends(get_session)):
+    if not (creening := await session.get(FilmScreening, screening_id)):
         raise NotFoundModelException(FilmScreening)
-    session.delete(creening)
-    session.commit()
+    await release_screenings(session, FilmScreening.id == screening_id, what="The screening")
+    await session.delete(creening)
+    await session.commit()
+    await response_cache.bump("screening")
     return {"message": f"Successfully deleted film with id {screening_id}"}
+
+
+screening_router.include_router(booking_router, prefix="/{screening_id}")
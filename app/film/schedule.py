@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import exc, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import settings
+from app.film.models import Film, FilmScreening
+
+
+@dataclass(frozen=True, slots=True)
+class Slot:
+    """A hall booked over [start, end). ``index`` is set on proposed slots
+    and tells the caller which proposal it was: a position in the request,
+    an import line or a film. ``screening_id`` is set on stored ones."""
+
+    hall_id: int
+    start: datetime
+    end: datetime
+    index: int | None = None
+    screening_id: int | None = None
+
+
+def ends_at(start: datetime, runtime: int | None) -> datetime:
+    return start + timedelta(minutes=runtime or settings.film_runtime_default)
+
+
+def overlaps(slots: Iterable[Slot]) -> list[tuple[Slot, Slot]]:
+    """Every overlapping pair, earlier start first, in one sweep over the
+    slots sorted by hall and start. Only the slots still running at each
+    start are compared, so this is O(n log n) plus the number of pairs."""
+    pairs = []
+    hall_id, running = None, []
+    for slot in sorted(slots, key=lambda s: (s.hall_id, s.start, s.end)):
+        if slot.hall_id != hall_id:
+            hall_id, running = slot.hall_id, []
+        running = [other for other in running if other.end > slot.start]
+        pairs.extend((other, slot) for other in running)
+        running.append(slot)
+    return pairs
+
+
+async def film_runtimes(session: AsyncSession, film_ids: set[int]) -> dict[int, int | None]:
+    if not film_ids:
+        return {}
+    return dict(
+        (await session.exec(select(Film.id, Film.runtime).where(Film.id.in_(film_ids))))
+        .all()
+    )
+
+
+async def find_conflicts(
+    session: AsyncSession, slots: list[Slot], exclude: Iterable[int] = ()
+) -> list[tuple[Slot, Slot]]:
+    """Overlaps of the proposed ``slots`` with each other and with the
+    stored screenings, apart from the ``exclude``d ones they replace.
+
+    The stored screenings are read in one query per call, a range scan of
+    the (hall_id, date) index: a screening that overlaps [start, end)
+    cannot start more than ``film_runtime_max`` before ``start``.
+    """
+    if not slots:
+        return []
+    exclude = set(exclude)
+    earliest = min(s.start for s in slots) - timedelta(minutes=settings.film_runtime_max)
+    # Pending changes to the slots being checked must not be flushed yet:
+    # on Postgres the exclusion constraint would reject them mid-query.
+    with session.no_autoflush:
+        rows = await session.exec(
+            select(
+                FilmScreening.id,
+                FilmScreening.hall_id,
+                FilmScreening.date,
+                FilmScreening.ends_at,
+            ).where(
+                FilmScreening.hall_id.in_({s.hall_id for s in slots}),
+                FilmScreening.date > earliest,
+                FilmScreening.date < max(s.end for s in slots),
+            )
+        )
+    stored = [
+        Slot(hall_id, start, end, screening_id=screening_id)
+        for screening_id, hall_id, start, end in rows
+        if screening_id not in exclude
+    ]
+    return [
+        (a, b)
+        for a, b in overlaps([*slots, *stored])
+        if a.index is not None or b.index is not None
+    ]
+
+
+async def retime_films(
+    session: AsyncSession, runtimes: dict[int, int | None]
+) -> dict[int, list[int]]:
+    """Move the end of every screening of the given films to match their
+    new runtime. Films whose screenings would then overlap others keep
+    their old ends; they are returned with the screenings in the way."""
+    rows = (
+        await session.exec(
+            select(
+                FilmScreening.id,
+                FilmScreening.hall_id,
+                FilmScreening.date,
+                FilmScreening.film_id,
+            ).where(FilmScreening.film_id.in_(runtimes))
+        )
+    ).all()
+    rejected: dict[int, set[int]] = {}
+    # Rejecting a film keeps its old slots in place, which can clash with
+    # another film's new ones, so repeat until nothing changes.
+    while True:
+        slots = [
+            Slot(
+                hall_id,
+                start,
+                ends_at(start, runtimes[film_id]),
+                index=film_id,
+                screening_id=screening_id,
+            )
+            for screening_id, hall_id, start, film_id in rows
+            if film_id not in rejected
+        ]
+        conflicts = await find_conflicts(
+            session, slots, {s.screening_id for s in slots}
+        )
+        if not conflicts:
+            break
+        for pair in conflicts:
+            for slot, other in (pair, pair[::-1]):
+                if slot.index is not None:
+                    rejected.setdefault(slot.index, set()).add(other.screening_id)
+    if slots:
+        await session.execute(
+            update(FilmScreening),
+            [{"id": s.screening_id, "ends_at": s.end} for s in slots],
+        )
+    return {film_id: sorted(ids) for film_id, ids in rejected.items()}
+
+
+def is_overlap_violation(error: exc.IntegrityError) -> bool:
+    """Whether Postgres' exclusion constraint rejected the write, i.e. a
+    concurrent write got in between the check and the commit."""
+    orig = error.orig
+    return "23P01" in (getattr(orig, "sqlstate", None), getattr(orig, "pgcode", None))
@@ -0,0 +1,22 @@
+from sqlalchemy import func, literal, or_, select
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_statement(model, query: str):
+    """Ranked prefix + typo-tolerant match on ``model.name``.
+
+    Both predicates are served by the pg_trgm GIN index on ``name``:
+    ILIKE for prefixes and ``<%`` (word similarity) for misspellings.
+    Prefix hits rank first, then by word similarity.
+    """
+    query = query.strip()
+    is_prefix = model.name.ilike(f"{_escape_like(query)}%", escape="\\")
+    score = func.word_similarity(query, model.name)
+    return (
+        select(model.id, model.name, score.label("score"))
+        .where(or_(is_prefix, literal(query).op("<%")(model.name)))
+        .order_by(is_prefix.desc(), score.desc(), model.id)
+    )
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app import db
+from app.minio import minio_handler
+
+health_router = APIRouter(prefix="/health", tags=["Health"], include_in_schema=False)
+
+
+@health_router.get("/live")
+async def live():
+    return {"status": "ok"}
+
+
+@health_router.get("/ready")
+async def ready():
+    # Storage and replicas are reported but do not gate readiness: only
+    # scheme uploads and downloads need storage, its setup keeps retrying in
+    # the background, and reads fall back to the primary without replicas.
+    database = await db.ping()
+    return JSONResponse(
+        {
+            "status": "ok" if database else "unavailable",
+            "database": "ok" if database else "unavailable",
+            "storage": "ok" if minio_handler.bucket_ready else "pending",
+            "replicas": f"{sum(db.replicas.healthy)}/{len(db.replicas.engines)} ok",
+        },
+        status_code=200 if database else 503,
+    )
@@ -0,0 +1,40 @@
+from fastapi import APIRouter
+
+from app.booking.seatmap import seat_map_hub
+from app.cinema.schemes import scheme_pipeline
+from app.db import get_pool_stats
+from app.minio import minio_handler
+from app.utils.cache import response_cache
+from app.utils.profiling import profiler
+
+internal_router = APIRouter(prefix="/internal", tags=["Internal"], include_in_schema=False)
+
+
+@internal_router.get("/db/pool")
+async def db_pool_stats():
+    return get_pool_stats()
+
+
+@internal_router.get("/cache")
+async def cache_stats():
+    return {**response_cache.stats(), "presigned_urls": minio_handler.url_cache.stats()}
+
+
+@internal_router.get("/profile")
+async def profile_stats():
+    return profiler.stats()
+
+
+@internal_router.delete("/profile", status_code=204)
+async def reset_profile_stats():
+    profiler.reset()
+
+
+@internal_router.get("/seatmap")
+async def seat_map_stats():
+    return seat_map_hub.stats()
+
+
+@internal_router.get("/schemes")
+async def scheme_pipeline_stats():
+    return scheme_pipeline.stats()
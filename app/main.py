@@ -1,34 +1,66 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from scalar_fastapi import get_scalar_api_reference
 from starlette.middleware.cors import CORSMiddleware
 
+from app import db
 from app.cinema.routers.cinema_router import cinema_router
-from app.db import init_db
+from app.cinema.schemes import scheme_pipeline
 from app.film.routers.film_router import film_router
 from app.film.routers.film_screening_router import screening_router
+from app.internal.routers.health_router import health_router
+from app.internal.routers.internal_router import internal_router
 from app.minio import minio_handler
+from app.config import settings
+from app.utils.cache import ResponseCacheMiddleware, response_cache
+from app.utils.profiling import ProfilingMiddleware
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_db()
-    minio_handler.create_bucket_if_not_exists()
+    # Nothing here waits on the database or MinIO: the schema is managed by
+    # migrations (alembic upgrade head) and the bucket is set up in the
+    # background. /health/ready reports when the worker can take traffic.
+    storage_init = asyncio.create_task(
+        minio_handler.initialize(settings.minio_init_retry_min, settings.minio_init_retry_max)
+    )
+    scheme_recovery = asyncio.create_task(scheme_pipeline.recover())
+    scheme_sweeper = asyncio.create_task(scheme_pipeline.sweeper(settings.scheme_sweep_seconds))
+    replica_monitor = asyncio.create_task(
+        db.replicas.monitor(settings.db_replica_check_seconds)
+    )
+    cache_sync = asyncio.create_task(
+        response_cache.monitor(settings.response_cache_sync_seconds)
+    )
     yield
+    storage_init.cancel()
+    scheme_recovery.cancel()
+    scheme_sweeper.cancel()
+    replica_monitor.cancel()
+    cache_sync.cancel()
+    await scheme_pipeline.close()
 
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(cinema_router)
 app.include_router(film_router)
 app.include_router(screening_router)
+app.include_router(internal_router)
+app.include_router(health_router)
 
+app.add_middleware(ResponseCacheMiddleware)
+app.add_middleware(db.ReadYourWritesMiddleware)
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # или ["*"] для всех источников
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
 @app.get("/scalar", include_in_schema=False)
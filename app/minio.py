@@ -1,51 +1,211 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
 from typing import BinaryIO
 
 import minio
 from minio import Minio
+from minio.error import S3Error
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils.profiling import span
+
+logger = logging.getLogger(__name__)
+
+
+class PresignedUrlCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 3000):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, url: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, url)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
 
 
 class MinioHandler:
-    def __init__(self, minio_endpoint: str, access_key: str, secret_key: str, bucket: str, secure: bool = False):
-        self.client = Minio(
-            minio_endpoint,
+    def __init__(
+        self,
+        minio_endpoint: str,
+        access_key: str,
+        secret_key: str,
+        bucket: str,
+        secure: bool = False,
+        region: str | None = None,
+        url_expires: timedelta = timedelta(hours=1),
+        url_cache_size: int = 1024,
+        url_cache_margin: timedelta = timedelta(minutes=10),
+        chunk_size: int = 64 * 1024,
+        client=None,
+    ):
+        self._client = client
+        self._client_options = dict(
+            endpoint=minio_endpoint,
             access_key=access_key,
             secret_key=secret_key,
-            secure=secure
+            secure=secure,
+            region=region,
         )
         self.bucket = bucket
+        self.bucket_ready = False
+        self.url_expires = url_expires
+        self.chunk_size = chunk_size
+        # Cached URLs are dropped before they expire so clients always get
+        # at least url_cache_margin of validity.
+        self.url_cache = PresignedUrlCache(
+            maxsize=url_cache_size,
+            ttl=(url_expires - url_cache_margin).total_seconds(),
+        )
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = Minio(**self._client_options)
+        return self._client
 
-    def upload_file(self, name: str, file: BinaryIO, length: int):
-        return self.client.put_object(self.bucket, name, file, length=length)
+    async def upload_file(
+        self,
+        name: str,
+        file: BinaryIO,
+        length: int,
+        content_type: str = "application/octet-stream",
+        cache_control: str | None = None,
+    ):
+        await self.ensure_bucket()
+        metadata = {"Cache-Control": cache_control} if cache_control else None
+        with span("storage"):
+            return await run_in_threadpool(
+                self.client.put_object,
+                self.bucket,
+                name,
+                file,
+                length=length,
+                content_type=content_type,
+                metadata=metadata,
+            )
 
-    def list(self):
-        objects = list(self.client.list_objects(self.bucket))
+    async def list(self, prefix: str | None = None):
+        with span("storage"):
+            objects = await run_in_threadpool(
+                lambda: list(
+                    self.client.list_objects(self.bucket, prefix=prefix, recursive=True)
+                )
+            )
         return [{"name": i.object_name, "last_modified": i.last_modified} for i in objects]
 
-    def stats(self, name: str) -> minio.api.Object:
-        return self.client.stat_object(self.bucket, name)
+    async def stats(self, name: str) -> minio.api.Object:
+        with span("storage"):
+            return await run_in_threadpool(self.client.stat_object, self.bucket, name)
 
-    def download_file(self, name: str):
-        info = self.client.stat_object(self.bucket, name)
-        total_size = info.size
-        offset = 0
-        while True:
-            response = self.client.get_object(self.bucket, name, offset=offset, length=2048)
-            yield response.read()
-            offset = offset + 2048
-            if offset >= total_size:
-                break
+    async def exists(self, name: str) -> bool:
+        try:
+            await self.stats(name)
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                return False
+            raise
+        return True
+
+    def download_file(self, name: str, offset: int = 0, length: int = 0, chunk_size: int | None = None):
+        response = self.client.get_object(self.bucket, name, offset=offset, length=length)
+        try:
+            yield from response.stream(chunk_size or self.chunk_size)
+        finally:
+            response.close()
+            response.release_conn()
+
+    async def read_file(self, name: str) -> bytes:
+        with span("storage"):
+            return await run_in_threadpool(lambda: b"".join(self.download_file(name)))
+
+    async def remove_file(self, name: str):
+        with span("storage"):
+            await run_in_threadpool(self.client.remove_object, self.bucket, name)
+
+    async def create_bucket_if_not_exists(self):
+        if not await run_in_threadpool(self.client.bucket_exists, self.bucket):
+            await run_in_threadpool(self.client.make_bucket, self.bucket)
 
-    def create_bucket_if_not_exists(self):
-        if not self.client.bucket_exists(self.bucket):
-            self.client.make_bucket(self.bucket)
+    async def ensure_bucket(self):
+        if not self.bucket_ready:
+            await self.create_bucket_if_not_exists()
+            self.bucket_ready = True
+
+    async def initialize(self, retry_min: float, retry_max: float):
+        """Keep trying ``ensure_bucket`` until it succeeds, so startup never
+        waits for MinIO and a brief outage does not kill the worker."""
+        delay = retry_min
+        while True:
+            try:
+                await self.ensure_bucket()
+                return
+            except Exception as e:
+                logger.warning("storage not ready, retrying in %.1fs: %s", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, retry_max)
 
     def get_url(self, object_name):
-        return self.client.presigned_get_object(self.bucket, object_name)
+        if (url := self.url_cache.get(object_name)) is not None:
+            return url
+        with span("storage"):
+            url = self.client.presigned_get_object(
+                self.bucket, object_name, expires=self.url_expires
+            )
+        self.url_cache.set(object_name, url)
+        return url
+
+    def invalidate_url(self, object_name):
+        self.url_cache.invalidate(object_name)
+
+    def use_client(self, client, bucket: str | None = None):
+        """Swap the S3 client, e.g. for an in-process stand-in. Anything
+        with the subset of the ``Minio`` API used here will do."""
+        self._client = client
+        self.bucket = bucket or self.bucket
+        self.bucket_ready = False
+        self.url_cache = PresignedUrlCache(self.url_cache.maxsize, self.url_cache.ttl)
 
 minio_handler = MinioHandler(
-    "localhost:9011",
-    "cinema_access_key",
-    "cinema_secret_key",
-    "cinema",
-    False
-)
\ No newline at end of file
+    settings.minio_endpoint,
+    settings.minio_access_key,
+    settings.minio_secret_key,
+    settings.minio_bucket,
+    settings.minio_secure,
+    region=settings.minio_region,
+)
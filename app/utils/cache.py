@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+from sqlmodel import Field, SQLModel, select
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app import db
+from app.config import settings
+from app.db import pinned_to_primary
+from app.utils.http import etag_matches, match_route
+
+logger = logging.getLogger(__name__)
+
+
+class CacheVersion(SQLModel, table=True):
+    """Write counter of a cached resource, shared by every API worker."""
+
+    resource: str = Field(primary_key=True)
+    version: int = 0
+
+
+class ResponseCache:
+    """Version-keyed cache for serialized GET responses.
+
+    Every cached route declares the resources it reads. Writes bump those
+    resources' counters, which changes the ETag of every dependent
+    response, so stale bodies are never looked up again and simply age
+    out of the LRU. The counters live in the ``cacheversion`` table: a
+    write bumps its own copy at once and the shared row after, and every
+    worker reads the table each ``response_cache_sync_seconds`` (see
+    ``monitor``). Another worker's writes show within that long, and an
+    ETag one worker issued validates on all of them. The ``max_age``
+    bucket bounds how old the presigned scheme URLs inside a cached body
+    can get.
+
+    A body read from a replica right after a bump may predate the write,
+    so for ``db_read_your_writes_seconds`` after one such bodies are served
+    but not stored, and clients pinned to the primary bypass the cache.
+    """
+
+    def __init__(self, maxsize: int, max_bytes: int, max_age: int):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._versions: dict[str, int] = {}
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._bumped_at = float("-inf")
+
+    def depends_on(self, *resources: str):
+        def decorator(endpoint):
+            endpoint.cache_resources = resources
+            return endpoint
+
+        return decorator
+
+    async def bump(self, *resources: str):
+        for resource in resources:
+            self._versions[resource] = self._versions.get(resource, 0) + 1
+        self._bumped_at = time.monotonic()
+        # The write has committed either way; other workers then catch up
+        # with it at the next bump of the same resource or max_age roll.
+        try:
+            async with db.new_session() as session:
+                for resource in resources:
+                    statement = (
+                        db.upsert(session, CacheVersion)
+                        .values(resource=resource, version=1)
+                        .on_conflict_do_update(
+                            index_elements=["resource"],
+                            set_={"version": CacheVersion.version + 1},
+                        )
+                        .returning(CacheVersion.version)
+                    )
+                    shared = (await session.execute(statement)).scalar_one()
+                    self._versions[resource] = max(self._versions[resource], shared)
+                await session.commit()
+        except Exception:
+            logger.warning("could not share cache versions of %s", resources, exc_info=True)
+
+    async def sync(self):
+        """Take on the counters other workers have bumped."""
+        async with db.new_session() as session:
+            rows = (await session.exec(select(CacheVersion))).all()
+        for row in rows:
+            if row.version > self._versions.get(row.resource, 0):
+                self._versions[row.resource] = row.version
+                # Another worker wrote: replicas may not have it yet.
+                self._bumped_at = time.monotonic()
+
+    async def monitor(self, interval: float):
+        while True:
+            try:
+                await self.sync()
+            except Exception:
+                logger.warning("could not read cache versions", exc_info=True)
+            await asyncio.sleep(interval)
+
+    def bumped_within(self, seconds: float) -> bool:
+        return time.monotonic() - self._bumped_at < seconds
+
+    def etag(self, path: str, query: str, resources: tuple[str, ...]) -> str:
+        versions = ",".join(f"{r}:{self._versions.get(r, 0)}" for r in resources)
+        bucket = int(time.time() // self.max_age)
+        digest = hashlib.blake2b(
+            f"{path}?{query}|{versions}|{bucket}".encode(), digest_size=16
+        ).hexdigest()
+        return f'"{digest}"'
+
+    def get(self, etag: str) -> bytes | None:
+        if (body := self._entries.get(etag)) is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(etag)
+        self.hits += 1
+        return body
+
+    def set(self, etag: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        if (old := self._entries.pop(etag, None)) is not None:
+            self._size -= len(old)
+        self._entries[etag] = body
+        self._size += len(body)
+        while len(self._entries) > self.maxsize or self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "versions": dict(self._versions),
+        }
+
+
+response_cache = ResponseCache(
+    settings.response_cache_size,
+    settings.response_cache_max_bytes,
+    settings.response_cache_max_age,
+)
+
+
+def _route_resources(request: Request) -> tuple[str, ...] | None:
+    return getattr(getattr(match_route(request.scope), "endpoint", None), "cache_resources", None)
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if request.method != "GET" or not (resources := _route_resources(request)):
+            return await call_next(request)
+
+        etag = response_cache.etag(request.url.path, request.url.query, resources)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        # A client that just wrote gets a fresh body: its write may have
+        # gone through another worker, whose bumps this one's ETags miss.
+        if not pinned_to_primary(request):
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                response_cache.not_modified += 1
+                return Response(status_code=304, headers=headers)
+            if (body := response_cache.get(etag)) is not None:
+                return Response(body, media_type="application/json", headers=headers)
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        if not (
+            getattr(request.state, "db_replica", False)
+            and response_cache.bumped_within(settings.db_read_your_writes_seconds)
+        ):
+            response_cache.set(etag, body)
+        response.headers.update(headers)
+        return Response(
+            body,
+            status_code=200,
+            headers=dict(response.headers),
+            media_type=response.media_type,
+        )
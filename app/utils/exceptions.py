@@ -1,3 +1,5 @@
+import uuid
+
 from sqlmodel import SQLModel
 from starlette.exceptions import HTTPException
 
@@ -6,3 +8,68 @@ class NotFoundModelException(HTTPException):
     def __init__(self, model_class: SQLModel) -> None:
         detail = f"{model_class.__name__} is not found"
         super().__init__(status_code=404, detail=detail)
+
+
+class NotFoundSchemeException(HTTPException):
+    def __init__(self) -> None:
+        super().__init__(status_code=404, detail="Scheme is not found")
+
+
+class InvalidCursorException(HTTPException):
+    def __init__(self) -> None:
+        super().__init__(status_code=400, detail="Invalid pagination cursor")
+
+
+class InvalidSchemeException(HTTPException):
+    def __init__(self, detail: str) -> None:
+        super().__init__(status_code=422, detail=f"Invalid scheme: {detail}")
+
+
+class SchemeTooLargeException(HTTPException):
+    def __init__(self, detail: str) -> None:
+        super().__init__(status_code=413, detail=f"Scheme is too large: {detail}")
+
+
+class NotFoundHoldException(HTTPException):
+    def __init__(self) -> None:
+        super().__init__(status_code=404, detail="Hold is not found or has expired")
+
+
+class UnknownSeatsException(HTTPException):
+    def __init__(self, seat_ids: list[uuid.UUID]) -> None:
+        detail = {"message": "Seats do not belong to the hall", "seat_ids": [str(s) for s in seat_ids]}
+        super().__init__(status_code=422, detail=detail)
+
+
+class SeatsUnavailableException(HTTPException):
+    def __init__(self, seat_ids: list[uuid.UUID]) -> None:
+        detail = {"message": "Seats are already taken", "seat_ids": [str(s) for s in seat_ids]}
+        super().__init__(status_code=409, detail=detail)
+
+
+class SoldTicketsException(HTTPException):
+    def __init__(self, detail: str) -> None:
+        super().__init__(status_code=409, detail=f"Tickets are sold: {detail}")
+
+
+class ScreeningOverlapException(HTTPException):
+    def __init__(self, screening_ids: list[int]) -> None:
+        detail = {"message": "The hall is already booked at that time", "screening_ids": screening_ids}
+        super().__init__(status_code=409, detail=detail)
+
+
+class InvalidDateRangeException(HTTPException):
+    def __init__(self, detail: str) -> None:
+        super().__init__(status_code=422, detail=f"Invalid date range: {detail}")
+
+
+class InvalidProjectionException(HTTPException):
+    def __init__(self, detail: str) -> None:
+        super().__init__(status_code=422, detail=f"Invalid projection: {detail}")
+
+
+class UnsupportedImportFormatException(HTTPException):
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=415, detail="Import file must be NDJSON (.ndjson) or CSV (.csv)"
+        )
@@ -0,0 +1,68 @@
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Literal
+
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy import Select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.background import BackgroundTask
+
+from app.config import settings
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def _stream(
+    session: AsyncSession, statement: Select, format: ExportFormat
+) -> AsyncIterator[bytes]:
+    result = await session.stream(
+        statement.execution_options(yield_per=settings.export_batch_size)
+    )
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(result.keys())
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        async for rows in result.partitions():
+            writer.writerows([_csv_value(v) for v in row] for row in rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    else:
+        async for rows in result.mappings().partitions():
+            yield b"".join(to_json(dict(row)) + b"\n" for row in rows)
+
+
+def stream_export(
+    session: AsyncSession,
+    statement: Select,
+    format: ExportFormat,
+    filename: str,
+    headers: dict | None = None,
+) -> StreamingResponse:
+    """Stream the rows of ``statement`` from a server-side cursor,
+    ``export_batch_size`` rows per chunk, so memory use does not depend on
+    the size of the result.
+
+    The stream outlives the request's dependencies, so it takes over
+    ``session`` (see ``open_read_session``) and closes it once the
+    response is done."""
+    return StreamingResponse(
+        _stream(session, statement, format),
+        background=BackgroundTask(session.close),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{format}"',
+            **(headers or {}),
+        },
+    )
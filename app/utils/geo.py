@@ -0,0 +1,65 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+GEOHASH_PRECISION = 9
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def _cell_degrees(precision: int) -> tuple[float, float]:
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def covering_prefixes(latitude: float, longitude: float, radius_km: float) -> set[str]:
+    """Geohash prefixes whose cells cover every point within ``radius_km``.
+
+    Picks the finest precision whose cells are at least ``radius_km`` across
+    and returns the centre cell with its eight neighbours.
+    """
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        lat_deg, lon_deg = _cell_degrees(candidate)
+        if min(lat_deg * KM_PER_DEGREE, lon_deg * KM_PER_DEGREE * cos_lat) >= radius_km:
+            precision = candidate
+            break
+
+    lat_deg, lon_deg = _cell_degrees(precision)
+    prefixes = set()
+    for d_lat in (-lat_deg, 0, lat_deg):
+        for d_lon in (-lon_deg, 0, lon_deg):
+            lat = min(max(latitude + d_lat, -90.0), 90.0)
+            lon = (longitude + d_lon + 180.0) % 360.0 - 180.0
+            prefixes.add(encode_geohash(lat, lon, precision))
+    return prefixes
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
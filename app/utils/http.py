@@ -0,0 +1,45 @@
+from starlette.exceptions import HTTPException
+from starlette.routing import BaseRoute, Match
+from starlette.types import Scope
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Resolve a single ``bytes=`` range into an inclusive (start, end) pair.
+
+    Returns None when the whole object should be served.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header.removeprefix("bytes=").strip().partition("-")
+    try:
+        if not start:
+            start, end = max(size - int(end), 0), size - 1
+        else:
+            start, end = int(start), min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range is not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def match_route(scope: Scope) -> BaseRoute | None:
+    """The route a request is for, also from middleware that runs before
+    routing has set ``scope["route"]``."""
+    if (route := scope.get("route")) is not None:
+        return route
+    for route in scope["app"].router.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            return route
+    return None
@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+from itertools import batched
+from typing import Awaitable, Callable, Iterator, Literal
+
+from fastapi import UploadFile
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils.cache import response_cache
+from app.utils.exceptions import UnsupportedImportFormatException
+
+ImportFormat = Literal["ndjson", "csv"]
+
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportReport(BaseModel):
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    errors: list[ImportRowError] = []
+    errors_truncated: bool = False
+
+    def fail(self, line: int, error: str):
+        self.failed += 1
+        if len(self.errors) < settings.import_max_errors:
+            self.errors.append(ImportRowError(line=line, error=error))
+        else:
+            self.errors_truncated = True
+
+    def merge(self, other: "ImportReport"):
+        self.created += other.created
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        for error in other.errors:
+            self.fail(error.line, error.error)
+        self.failed += other.failed - len(other.errors)
+        self.errors_truncated |= other.errors_truncated
+
+
+Rows = list[tuple[int, SQLModel]]
+
+
+def detect_format(file: UploadFile, format: ImportFormat | None) -> ImportFormat:
+    if format:
+        return format
+    name = (file.filename or "").lower()
+    content_type = file.content_type or ""
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type:
+        return "ndjson"
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    raise UnsupportedImportFormatException()
+
+
+def _read_ndjson(stream) -> Iterator[tuple[int, dict | str]]:
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            yield line, f"invalid JSON: {e.msg}"
+            continue
+        yield line, data if isinstance(data, dict) else "expected a JSON object"
+
+
+def _read_csv(stream) -> Iterator[tuple[int, dict | str]]:
+    reader = csv.DictReader(stream)
+    for data in reader:
+        yield reader.line_num, {k: v for k, v in data.items() if v not in ("", None)}
+
+
+def parse_rows(
+    file, format: ImportFormat, schema: type[SQLModel], report: ImportReport
+):
+    """Yield ``(line, row)`` for every valid row, recording the rest in
+    ``report``. The file is decoded and parsed incrementally."""
+    stream = io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace", newline="")
+    read = _read_ndjson if format == "ndjson" else _read_csv
+    for line, data in read(stream):
+        if isinstance(data, str):
+            report.fail(line, data)
+            continue
+        try:
+            yield line, schema.model_validate(data)
+        except ValidationError as e:
+            errors = (
+                f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}"
+                for err in e.errors()
+            )
+            report.fail(line, "; ".join(errors))
+
+
+async def run_import(
+    session: AsyncSession,
+    file: UploadFile,
+    format: ImportFormat | None,
+    schema: type[SQLModel],
+    upsert_rows: Callable[[AsyncSession, Rows, ImportReport], Awaitable[None]],
+    *resources: str,
+) -> ImportReport:
+    """Stream ``file`` into the database ``settings.import_batch_size`` rows
+    at a time, one transaction per batch.
+
+    Parsing runs in the threadpool. Only the current batch and a capped
+    error list are held in memory. A batch the database rejects is rolled
+    back and split in halves until the rows it rejects are found, so only
+    those fail and the rest are imported. Batches committed before it are
+    kept.
+    """
+    report = ImportReport()
+    batches = batched(
+        parse_rows(file.file, detect_format(file, format), schema, report),
+        settings.import_batch_size,
+    )
+    while batch := await run_in_threadpool(next, batches, None):
+        await _import_batch(session, list(batch), upsert_rows, report, resources)
+    return report
+
+
+async def _import_batch(
+    session: AsyncSession,
+    batch: Rows,
+    upsert_rows: Callable[[AsyncSession, Rows, ImportReport], Awaitable[None]],
+    report: ImportReport,
+    resources: tuple[str, ...],
+):
+    batch_report = ImportReport()
+    try:
+        await upsert_rows(session, batch, batch_report)
+        await session.commit()
+    except DBAPIError as e:
+        await session.rollback()
+        if len(batch) == 1:
+            report.fail(batch[0][0], f"rejected by the database: {e.orig}")
+            return
+        middle = len(batch) // 2
+        for half in (batch[:middle], batch[middle:]):
+            await _import_batch(session, half, upsert_rows, report, resources)
+    else:
+        report.merge(batch_report)
+        await response_cache.bump(*resources)
@@ -0,0 +1,90 @@
+import base64
+from typing import Annotated, Generic, Sequence, TypeVar
+
+from fastapi import Query
+from pydantic import BaseModel
+from sqlalchemy import Select
+
+from app.config import settings
+from app.utils.exceptions import InvalidCursorException
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None
+
+
+def encode_cursor(key: int) -> str:
+    return base64.urlsafe_b64encode(str(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise InvalidCursorException()
+
+
+class Pagination:
+    """Keyset pagination over an integer primary key.
+
+    Pages are fetched with ``WHERE key > :after ORDER BY key LIMIT n + 1``,
+    so the cost of a page does not depend on how deep into the table it is.
+    """
+
+    def __init__(
+        self,
+        cursor: str | None = None,
+        limit: Annotated[
+            int, Query(ge=1, le=settings.page_size_max)
+        ] = settings.page_size_default,
+    ):
+        self.after = decode_cursor(cursor) if cursor else None
+        self.limit = limit
+
+    def apply(self, statement: Select, key) -> Select:
+        if self.after is not None:
+            statement = statement.where(key > self.after)
+        return statement.order_by(key).limit(self.limit + 1)
+
+    def page(self, items: Sequence, key: str = "id") -> dict:
+        items = list(items)
+        next_cursor = None
+        if len(items) > self.limit:
+            items = items[: self.limit]
+            next_cursor = encode_cursor(getattr(items[-1], key))
+        return {"items": items, "next_cursor": next_cursor}
+
+
+class OffsetPagination(Pagination):
+    """Cursor pagination for ranked results that have no stable sort key.
+
+    The cursor wraps a row offset, which is capped so deep pages cannot
+    turn into long scans.
+    """
+
+    max_offset = 1000
+
+    def __init__(
+        self,
+        cursor: str | None = None,
+        limit: Annotated[
+            int, Query(ge=1, le=settings.page_size_max)
+        ] = settings.page_size_default,
+    ):
+        super().__init__(cursor, limit)
+        self.offset = self.after or 0
+        if self.offset > self.max_offset:
+            raise InvalidCursorException()
+
+    def apply(self, statement: Select, key=None) -> Select:
+        return statement.offset(self.offset).limit(self.limit + 1)
+
+    def page(self, items: Sequence, key: str = "id") -> dict:
+        items = list(items)
+        next_cursor = None
+        if len(items) > self.limit and self.offset + self.limit <= self.max_offset:
+            next_cursor = encode_cursor(self.offset + self.limit)
+        return {"items": items[: self.limit], "next_cursor": next_cursor}
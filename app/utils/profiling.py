@@ -0,0 +1,208 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.utils.http import match_route
+
+# Upper bounds in milliseconds; the last bucket is open-ended.
+LATENCY_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+PHASES = ("db", "storage", "serialization")
+
+
+class RequestProfile:
+    """Where one request spent its time. Phases are exclusive: storage
+    calls made while serializing (presigned scheme URLs) count as storage,
+    not serialization."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self._nested = [0.0]
+
+    @contextmanager
+    def span(self, phase: str):
+        self._nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.seconds[phase] += elapsed - self._nested.pop()
+            self._nested[-1] += elapsed
+
+    def add(self, phase: str, elapsed: float):
+        self.seconds[phase] += elapsed
+        self._nested[-1] += elapsed
+
+    def server_timing(self, total: float) -> str:
+        metrics = [
+            f'db;dur={self.seconds["db"] * 1000:.2f};desc="{self.queries} queries"',
+            f'storage;dur={self.seconds["storage"] * 1000:.2f}',
+            f'serialization;dur={self.seconds["serialization"] * 1000:.2f}',
+            f"total;dur={total * 1000:.2f}",
+        ]
+        return ", ".join(metrics)
+
+
+_profile: ContextVar[RequestProfile | None] = ContextVar("profile", default=None)
+
+
+@contextmanager
+def span(phase: str):
+    """Attribute the enclosed block to ``phase`` of the current request, if
+    it is being profiled."""
+    if (profile := _profile.get()) is None:
+        yield
+        return
+    with profile.span(phase):
+        yield
+
+
+# The start goes on the execution context, which is dropped with the
+# statement whether or not it succeeds; the pooled connection outlives it.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _profile.get() is not None and context is not None:
+        context._profile_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if (profile := _profile.get()) is not None and (
+        start := getattr(context, "_profile_start", None)
+    ) is not None:
+        profile.queries += 1
+        profile.add("db", time.perf_counter() - start)
+
+
+class RouteStats:
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.sampled = 0
+        self.queries = 0
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+
+    def _quantile(self, q: float) -> float | str | None:
+        """Upper bound of the bucket holding the q-th request, or
+        ``">10000"`` for the open-ended one."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(LATENCY_BUCKETS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return bound
+        return f">{LATENCY_BUCKETS[-1]}"
+
+    def snapshot(self) -> dict:
+        sampled = max(self.sampled, 1)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / max(self.count, 1) * 1000, 3),
+            "p50_ms": self._quantile(0.5),
+            "p95_ms": self._quantile(0.95),
+            "p99_ms": self._quantile(0.99),
+            "buckets": {
+                f"le_{bound}": n for bound, n in zip(LATENCY_BUCKETS, self.buckets)
+            }
+            | {"inf": self.buckets[-1]},
+            "sampled": self.sampled,
+            "queries_avg": round(self.queries / sampled, 2),
+            **{
+                f"{phase}_avg_ms": round(self.seconds[phase] / sampled * 1000, 3)
+                for phase in PHASES
+            },
+        }
+
+
+class Profiler:
+    """Per-route latency histograms for every request, plus the query,
+    database, storage and serialization breakdown for a ``sample_rate``
+    share of them. Sampled responses carry a ``Server-Timing`` header."""
+
+    def __init__(self, sample_rate: float):
+        self.sample_rate = sample_rate
+        self._routes: dict[str, RouteStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, elapsed: float, profile: RequestProfile | None):
+        with self._lock:
+            if (stats := self._routes.get(route)) is None:
+                stats = self._routes[route] = RouteStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.buckets[bisect_left(LATENCY_BUCKETS, elapsed * 1000)] += 1
+            if profile is not None:
+                stats.sampled += 1
+                stats.queries += profile.queries
+                for phase in PHASES:
+                    stats.seconds[phase] += profile.seconds[phase]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sample_rate": self.sample_rate,
+                "routes": {
+                    route: stats.snapshot()
+                    for route, stats in sorted(self._routes.items())
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+profiler = Profiler(settings.profiling_sample_rate)
+
+
+def _route_name(scope) -> str:
+    # Responses the cache middleware answers never reach routing.
+    if (route := match_route(scope)) is None:
+        return "unmatched"
+    return f"{scope['method']} {route.path}"
+
+
+class ProfilingMiddleware:
+    """Pure ASGI, so requests that are not sampled only pay for a clock
+    read and a histogram update."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile() if random.random() < profiler.sample_rate else None
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message):
+            # Measured when the headers go out: the time to stream the rest
+            # of a body is not included.
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                profiler.record(_route_name(scope), elapsed, profile)
+                if profile is not None:
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", profile.server_timing(elapsed)
+                    )
+            await send(message)
+
+        token = _profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _profile.reset(token)
@@ -0,0 +1,170 @@
+from typing import Annotated, Literal
+
+from fastapi import Query, Response
+from pydantic_core import to_json
+from sqlalchemy.orm import selectinload
+from sqlmodel import SQLModel
+
+from app.config import settings
+from app.utils.exceptions import InvalidProjectionException
+from app.utils.profiling import span
+
+View = Literal["summary", "detail"]
+
+
+class Relation:
+    """A model, the flat schema it is rendered with and the relations a
+    client may expand from it.
+
+    Schemas never reference other schemas, so rendering only touches the
+    relations that were requested and loaded up front. Rendering reads the
+    schema's fields straight off the ORM objects and encodes the result with
+    pydantic-core, skipping the per-object validation ``response_model``
+    would do.
+    """
+
+    def __init__(
+        self,
+        model: type[SQLModel],
+        schema: type[SQLModel],
+        relations: dict[str, "Relation"] | None = None,
+    ):
+        self.model = model
+        self.schema = schema
+        self.relations = relations or {}
+        self.attributes = tuple(
+            name for name, field in schema.model_fields.items() if not field.exclude
+        )
+        self.computed = tuple(
+            (name, decorator.func)
+            for name, decorator in schema.__pydantic_decorators__.computed_fields.items()
+        )
+        self.fields = set(self.attributes) | {name for name, _ in self.computed}
+
+    def dump(self, obj, expand: dict, include: set[str] | None = None) -> dict:
+        if include is None:
+            data = {name: getattr(obj, name) for name in self.attributes}
+            for name, func in self.computed:
+                data[name] = func(obj)
+        else:
+            data = {
+                name: getattr(obj, name) for name in self.attributes if name in include
+            }
+            for name, func in self.computed:
+                if name in include:
+                    data[name] = func(obj)
+        for name, children in expand.items():
+            value = getattr(obj, name)
+            child = self.relations[name]
+            if value is None:
+                data[name] = None
+            elif isinstance(value, list):
+                data[name] = [child.dump(v, children) for v in value]
+            else:
+                data[name] = child.dump(value, children)
+        return data
+
+
+class Projected:
+    def __init__(self, root: Relation, expand: dict, fields: set[str] | None):
+        self.root = root
+        self.expand = expand
+        self.fields = fields
+
+    def options(self) -> tuple:
+        return tuple(self._options(self.root, self.expand, None))
+
+    def _options(self, relation: Relation, expand: dict, loader):
+        for name, children in expand.items():
+            attribute = getattr(relation.model, name)
+            child = (
+                selectinload(attribute)
+                if loader is None
+                else loader.selectinload(attribute)
+            )
+            if children:
+                yield from self._options(relation.relations[name], children, child)
+            else:
+                yield child
+
+    def dump(self, obj) -> dict:
+        return self.root.dump(obj, self.expand, self.fields)
+
+    def render(self, obj) -> Response:
+        with span("serialization"):
+            body = to_json(self.dump(obj))
+        return Response(body, media_type="application/json")
+
+    def render_page(self, page: dict) -> Response:
+        with span("serialization"):
+            body = to_json(
+                {
+                    "items": [self.dump(item) for item in page["items"]],
+                    "next_cursor": page["next_cursor"],
+                }
+            )
+        return Response(body, media_type="application/json")
+
+
+class Projection:
+    """Query-driven response shape for a resource.
+
+    ``view=summary`` renders only the resource's own fields, ``view=detail``
+    additionally expands the relations in ``detail``. ``expand`` adds dotted
+    relation paths on top of the view, up to ``projection_max_depth`` levels,
+    and ``fields`` narrows the top-level fields. Use ``summary`` or ``detail``
+    as the dependency to pick the default view of an endpoint.
+    """
+
+    def __init__(self, root: Relation, detail: tuple[str, ...] = ()):
+        self.root = root
+        self.detail_paths = detail
+
+    def resolve(
+        self,
+        view: View,
+        expand: list[str] | None = None,
+        fields: list[str] | None = None,
+    ) -> Projected:
+        paths = list(self.detail_paths) if view == "detail" else []
+        for value in expand or []:
+            paths.extend(p.strip() for p in value.split(",") if p.strip())
+
+        tree: dict = {}
+        for path in paths:
+            names = path.split(".")
+            if len(names) > settings.projection_max_depth:
+                raise InvalidProjectionException(
+                    f"'{path}' is deeper than {settings.projection_max_depth} levels"
+                )
+            relation, node = self.root, tree
+            for name in names:
+                if name not in relation.relations:
+                    raise InvalidProjectionException(f"'{path}' cannot be expanded")
+                relation = relation.relations[name]
+                node = node.setdefault(name, {})
+
+        selected = None
+        if fields:
+            selected = {f.strip() for v in fields for f in v.split(",") if f.strip()}
+            if unknown := selected - self.root.fields:
+                raise InvalidProjectionException(
+                    f"unknown fields: {', '.join(sorted(unknown))}"
+                )
+        return Projected(self.root, tree, selected)
+
+    def summary(
+        self,
+        view: View = "summary",
+        expand: Annotated[list[str] | None, Query()] = None,
+        fields: Annotated[list[str] | None, Query()] = None,
+    ) -> Projected:
+        return self.resolve(view, expand, fields)
+
+    def detail(
+        self,
+        view: View = "detail",
+        expand: Annotated[list[str] | None, Query()] = None,
+        fields: Annotated[list[str] | None, Query()] = None,
+    ) -> Projected:
+        return self.resolve(view, expand, fields)
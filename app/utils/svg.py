@@ -1,36 +1,92 @@
+import hashlib
 import io
-from uuid import uuid4
+import re
+from uuid import UUID, uuid4, uuid5
 
 from lxml import etree
 
-from app.cinema.models import Seat
+from app.config import settings
+from app.utils.exceptions import InvalidSchemeException, SchemeTooLargeException
 
+SVG_NS = "http://www.w3.org/2000/svg"
 
-def process_scheme(file, tag_names=('rect', 'circle', 'path', "ellipse")):
-    tree = etree.parse(file)
-    root = tree.getroot()
+# ASCII digits only: str.isdigit() also takes the likes of "²", which int()
+# rejects.
+SEAT_ID = re.compile(r"([0-9]+)-([0-9]+)")
 
-    ns = {'svg': 'http://www.w3.org/2000/svg'}
-    seats = []
-    for tag in tag_names:
-        for elem in root.findall(f'.//svg:{tag}', ns):
-            uuid = uuid4()
-            row, col = elem.get("id").split("-")
-            seats.append(
-                Seat(
-                    id=uuid,
-                    row=row,
-                    column=col
-                )
-            )
+
+class _LimitedReader:
+    def __init__(self, file, max_bytes: int):
+        self.file = file
+        self.max_bytes = max_bytes
+        self.read_bytes = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.file.read(size)
+        self.read_bytes += len(chunk)
+        if self.read_bytes > self.max_bytes:
+            raise SchemeTooLargeException(f"more than {self.max_bytes} bytes")
+        return chunk
+
+
+def _parse_seat_id(seat_id: str | None) -> tuple[int, int]:
+    if (match := SEAT_ID.fullmatch(seat_id or "")) is None:
+        raise InvalidSchemeException(f"seat id {seat_id!r} is not in row-col format")
+    return int(match[1]), int(match[2])
+
+
+def process_scheme(
+    file,
+    seat_namespace: UUID | None = None,
+    tag_names=('rect', 'circle', 'path', "ellipse"),
+    max_bytes: int = settings.scheme_max_bytes,
+    max_elements: int = settings.scheme_max_elements,
+):
+    seat_tags = {f"{{{SVG_NS}}}{tag}" for tag in tag_names}
+    # Elements are counted as the parser makes them, so a plan over the
+    # limit is turned away before the rest of it is read or built.
+    context = etree.iterparse(
+        _LimitedReader(file, max_bytes),
+        events=("start",),
+        resolve_entities=False,
+        no_network=True,
+        huge_tree=False,
+    )
+    seats, seen = [], set()
+    try:
+        for elements, (_, elem) in enumerate(context, 1):
+            if elements > max_elements:
+                raise SchemeTooLargeException(f"more than {max_elements} elements")
+            if elem.tag not in seat_tags:
+                continue
+            row, col = _parse_seat_id(elem.get("id"))
+            if (row, col) in seen:
+                raise InvalidSchemeException(f"seat {row}-{col} appears more than once")
+            seen.add((row, col))
+            # With a namespace the same plan always gets the same seat ids,
+            # so re-uploading it produces the same file.
+            uuid = uuid4() if seat_namespace is None else uuid5(seat_namespace, f"{row}-{col}")
+            seats.append({"id": uuid, "row": row, "column": col})
 
             elem.set('id', str(uuid))
             elem.set('fill', "white")
+    except etree.XMLSyntaxError as e:
+        raise InvalidSchemeException(str(e))
+    root = context.root
+    tree = root.getroottree()
 
     etree.cleanup_namespaces(root)
 
     buffer = io.BytesIO()
-    tree.write(buffer, pretty_print=True, encoding='utf-8', xml_declaration=True)
+    tree.write(buffer, encoding='utf-8', xml_declaration=True)
     buffer.seek(0)
 
     return buffer, seats
+
+
+def parse_scheme(data: bytes, seat_namespace: UUID) -> tuple[bytes, list[dict], str]:
+    """process_scheme on bytes, for running in another process. Also
+    returns the SHA-256 of the processed file."""
+    scheme, seats = process_scheme(io.BytesIO(data), seat_namespace)
+    scheme = scheme.getvalue()
+    return scheme, seats, hashlib.sha256(scheme).hexdigest()
@@ -0,0 +1,165 @@
+"""Before/after comparison for serving reads from the async engine.
+
+Runs GET /film/ as the app serves it now (``async def`` on the async
+engine) next to the same handler written the way it was before: a sync
+``def`` on a blocking Session, which Starlette runs in its threadpool.
+Both sides run the same statement and serialization, against the same
+freshly seeded database, at growing concurrency::
+
+    python -m benchmarks.concurrency --levels 1 16 64 256
+    python -m benchmarks.concurrency --database-url postgresql+asyncpg://...
+
+The blocking side uses the sync driver for the same database (psycopg2 for
+asyncpg, pysqlite for aiosqlite).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from anyio import to_thread
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, make_url
+from sqlmodel import Session, select
+
+from app import db
+from app.config import settings
+from app.film.models import Film
+from app.film.projections import film_projection
+from app.main import app
+from app.minio import minio_handler
+from app.utils.cache import ResponseCacheMiddleware, response_cache
+from app.utils.pagination import Pagination
+from app.utils.projection import Projected
+from benchmarks.seed import Scale, seed
+from benchmarks.storage import MemoryObjectStore
+
+SYNC_DRIVERS = {"asyncpg": "psycopg2", "aiosqlite": "pysqlite"}
+
+
+def blocking_app(database_url: str) -> FastAPI:
+    url = make_url(database_url)
+    engine = create_engine(
+        url.set(drivername=f"{url.get_backend_name()}+{SYNC_DRIVERS[url.get_driver_name()]}"),
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    blocking = FastAPI()
+    blocking.state.engine = engine
+    blocking.add_middleware(ResponseCacheMiddleware)
+
+    @blocking.get("/film/")
+    @response_cache.depends_on("film", "genre", "screening", "hall")
+    def list_films(
+        pagination: Pagination = Depends(),
+        projection: Projected = Depends(film_projection.summary),
+        session: Session = Depends(get_session),
+    ):
+        statement = pagination.apply(select(Film).options(*projection.options()), Film.id)
+        films = session.exec(statement).all()
+        return projection.render_page(pagination.page(films))
+
+    return blocking
+
+
+def _percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def measure(target: FastAPI, url: str, requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    indexes = iter(range(requests))
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker():
+            nonlocal errors
+            for _ in indexes:
+                start = time.perf_counter()
+                response = await client.get(url)
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def main(args):
+    database_url = args.database_url
+    if database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="cinema-concurrency-"), "bench.db")
+        database_url = f"sqlite+aiosqlite:///{path}"
+    engine = db.create_engine(database_url)
+    db.use_engine(engine)
+    minio_handler.use_client(MemoryObjectStore())
+    response_cache.maxsize = 0
+    await db.migrate()
+    await minio_handler.ensure_bucket()
+    async with db.new_session() as session:
+        await seed(session, Scale(cinemas=1, films=args.films, days=1))
+
+    blocking = blocking_app(database_url)
+    url = f"/film/?limit={args.limit}"
+    results = {"blocking": [], "async": []}
+    for concurrency in args.levels:
+        for name, target in (("blocking", blocking), ("async", app)):
+            # One round unmeasured, so both sides start with warm pools.
+            await measure(target, url, concurrency, concurrency)
+            result = await measure(target, url, args.requests, concurrency)
+            results[name].append(result)
+            print(
+                f"{name:<9} x{concurrency:<4} p50 {result['p50_ms']:8.2f} ms  "
+                f"p99 {result['p99_ms']:8.2f} ms  {result['throughput_rps']:8.1f} rps  "
+                f"errors {result['errors']}",
+                file=sys.stderr,
+            )
+    report = {
+        "meta": {
+            "dialect": engine.dialect.name,
+            "requests": args.requests,
+            "films": args.films,
+            "limit": args.limit,
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "threadpool_tokens": to_thread.current_default_thread_limiter().total_tokens,
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    blocking.state.engine.dispose()
+    await engine.dispose()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--films", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=50)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
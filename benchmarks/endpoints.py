@@ -0,0 +1,790 @@
+"""Latency, throughput and query counts for every API endpoint.
+
+Runs the app in-process against SQLite (default) or any database URL, with
+MemoryObjectStore standing in for MinIO, on a freshly seeded data set::
+
+    python -m benchmarks.endpoints --scale 0.5 --output results.json
+    python -m benchmarks.endpoints --database-url postgresql+asyncpg://...
+
+Endpoints that rely on Postgres-only SQL (pg_trgm search) are skipped on
+other dialects; on Postgres the search cases run over a catalogue of
+``--catalogue`` extra films (100k by default). The JSON output is stable and meant for diffing between
+commits.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+import httpx
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from app import db
+from app.cinema.schemes import scheme_pipeline
+from app.main import app
+from app.minio import minio_handler
+from app.utils.cache import response_cache
+from benchmarks.seed import Dataset, Scale, scheme_svg, seed, seed_catalogue
+from benchmarks.storage import MemoryObjectStore
+
+
+# Endless streams cannot be timed per request; benchmarks/seatmap.py
+# load-tests this one.
+ELSEWHERE = {("GET", "/screening/{screening_id}/booking/seatmap")}
+
+
+@dataclass
+class Case:
+    name: str
+    method: str
+    route: str
+    request: Callable[[int], dict[str, Any]]
+    expect: int = 200
+    requests: int | None = None
+    # Writes run one at a time: concurrent writers only measure lock
+    # contention on SQLite.
+    write: bool = False
+    postgres_only: bool = False
+    # Response JSON key(s) to record, e.g. the id of a created object for
+    # the case that deletes it.
+    collect: str | tuple[str, ...] | None = None
+    # Case whose collected values this one uses up, ``share`` per request.
+    consumes: str | None = None
+    share: int = 1
+    # Awaited after the requests, for work they leave running in the
+    # background; its duration is reported as settle_ms.
+    settle: Callable[[], Awaitable] | None = None
+
+
+@dataclass
+class State:
+    data: Dataset
+    created: dict[str, list] = field(default_factory=dict)
+
+    def take(self, key: str, i: int):
+        return self.created[key][i % len(self.created[key])]
+
+
+def _ndjson(rows) -> bytes:
+    return b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+
+
+def cases(state: State, rows: int) -> list[Case]:
+    data = state.data
+    cinema_id, hall_id = data.halls[0]
+    halls = data.halls
+    screenings = data.screenings
+    seats = data.hall_seats
+    film = data.film_ids
+
+    def hall(i):
+        return halls[i % len(halls)]
+
+    def screening(i):
+        return screenings[i % (len(screenings) // 2)]
+
+    def hold(i):
+        # Every request holds a different (screening, seat) pair.
+        screening_id, hall_id = screening(i)
+        seat_id = seats[hall_id][i // (len(screenings) // 2)]
+        return {
+            "url": f"/screening/{screening_id}/booking/hold",
+            "json": {"seat_ids": [str(seat_id)]},
+        }
+
+    def upload(url: str, name: str, content: bytes) -> dict:
+        return {"url": url, "files": {"file": (name, content)}}
+
+    titles = data.catalogue or data.film_names
+
+    def title(i):
+        return titles[(i * 7919) % len(titles)]
+
+    def misspell(name):
+        # Swap two letters in the middle of the first word longer than four.
+        word = next((w for w in name.split() if len(w) > 4), name)
+        j = len(word) // 2
+        return name.replace(word, word[: j - 1] + word[j] + word[j - 1] + word[j + 1 :], 1)
+
+    day = data.start.isoformat()
+    week = (data.start + timedelta(days=7)).isoformat()
+    svg = scheme_svg(10, 20)
+
+    return [
+        # Cinema
+        Case("list_cinema", "GET", "/cinema/", lambda i: {"url": "/cinema/?limit=50"}),
+        Case(
+            "list_nearby_cinema",
+            "GET",
+            "/cinema/nearby",
+            lambda i: {"url": "/cinema/nearby?lat=55.75&lon=37.62&radius=25"},
+        ),
+        Case(
+            "get_cinema",
+            "GET",
+            "/cinema/{cinema_id}",
+            lambda i: {"url": f"/cinema/{data.cinema_ids[i % len(data.cinema_ids)]}"},
+        ),
+        Case(
+            "create_cinema",
+            "POST",
+            "/cinema/",
+            lambda i: {
+                "url": "/cinema/",
+                "json": {
+                    "name": f"Bench {i}",
+                    "address": "Bench street",
+                    "latitude": 55.7 + i / 10000,
+                    "longitude": 37.6,
+                },
+            },
+            write=True,
+            collect="id",
+        ),
+        Case(
+            "update_cinema",
+            "PATCH",
+            "/cinema/{cinema_id}",
+            lambda i: {
+                "url": f"/cinema/{state.take('create_cinema', i)}",
+                "json": {"name": f"Bench {i} renamed"},
+            },
+            write=True,
+        ),
+        # Hall
+        Case(
+            "list_hall",
+            "GET",
+            "/cinema/{cinema_id}/hall/",
+            lambda i: {"url": f"/cinema/{hall(i)[0]}/hall/"},
+        ),
+        Case(
+            "get_hall",
+            "GET",
+            "/cinema/{cinema_id}/hall/{hall_id}",
+            lambda i: {"url": "/cinema/{}/hall/{}".format(*hall(i))},
+        ),
+        Case(
+            "get_hall[expand=seats]",
+            "GET",
+            "/cinema/{cinema_id}/hall/{hall_id}",
+            lambda i: {"url": "/cinema/{}/hall/{}?expand=seats".format(*hall(i))},
+        ),
+        Case(
+            "create_hall",
+            "POST",
+            "/cinema/{cinema_id}/hall/",
+            lambda i: {
+                "url": f"/cinema/{cinema_id}/hall/",
+                "json": {"name": f"Bench {i}", "capacity": 200, "is_vip": False},
+            },
+            write=True,
+            collect="id",
+        ),
+        Case(
+            "update_hall",
+            "PATCH",
+            "/cinema/{cinema_id}/hall/{hall_id}",
+            lambda i: {
+                "url": f"/cinema/{cinema_id}/hall/{state.take('create_hall', i)}",
+                "json": {"is_vip": bool(i % 2)},
+            },
+            write=True,
+        ),
+        Case(
+            "upload_scheme",
+            "POST",
+            "/cinema/{cinema_id}/hall/{hall_id}/scheme",
+            lambda i: {
+                "url": f"/cinema/{cinema_id}/hall/"
+                f"{state.take('create_hall', i)}/scheme",
+                "files": {"svg_file": ("hall.svg", svg, "image/svg+xml")},
+            },
+            expect=202,
+            write=True,
+            requests=20,
+            collect=("hall_id", "id"),
+            settle=scheme_pipeline.join,
+        ),
+        Case(
+            "get_scheme_job",
+            "GET",
+            "/cinema/{cinema_id}/hall/{hall_id}/scheme/jobs/{job_id}",
+            lambda i: {
+                "url": "/cinema/{}/hall/{}/scheme/jobs/{}".format(
+                    cinema_id, *state.take("upload_scheme", i)
+                )
+            },
+        ),
+        Case(
+            "download_scheme",
+            "GET",
+            "/cinema/{cinema_id}/hall/{hall_id}/scheme",
+            lambda i: {"url": "/cinema/{}/hall/{}/scheme".format(*hall(i))},
+        ),
+        Case(
+            "download_scheme[range]",
+            "GET",
+            "/cinema/{cinema_id}/hall/{hall_id}/scheme",
+            lambda i: {
+                "url": "/cinema/{}/hall/{}/scheme".format(*hall(i)),
+                "headers": {"Range": "bytes=0-4095"},
+            },
+            expect=206,
+        ),
+        Case(
+            "download_scheme[revalidate]",
+            "GET",
+            "/cinema/{cinema_id}/hall/{hall_id}/scheme",
+            lambda i: {
+                "url": "/cinema/{}/hall/{}/scheme".format(*hall(i)),
+                "headers": {"If-None-Match": f'"{data.scheme_hash}"'},
+            },
+            expect=304,
+        ),
+        Case(
+            "download_scheme_version",
+            "GET",
+            "/cinema/{cinema_id}/hall/{hall_id}/scheme/{scheme_hash}",
+            lambda i: {
+                "url": "/cinema/{}/hall/{}/scheme/{}".format(*hall(i), data.scheme_hash)
+            },
+        ),
+        # Genre
+        Case("list_genres", "GET", "/film/genre", lambda i: {"url": "/film/genre"}),
+        Case(
+            "search_genres",
+            "GET",
+            "/film/genre/search",
+            lambda i: {"url": "/film/genre/search?q=genr"},
+            postgres_only=True,
+        ),
+        Case(
+            "get_genre",
+            "GET",
+            "/film/genre/{genre_id}",
+            lambda i: {"url": f"/film/genre/{data.genre_ids[i % len(data.genre_ids)]}"},
+        ),
+        Case(
+            "create_genre",
+            "POST",
+            "/film/genre",
+            lambda i: {"url": "/film/genre", "json": {"name": f"Bench genre {i}"}},
+            write=True,
+            collect="id",
+        ),
+        Case(
+            "update_genre",
+            "POST",
+            "/film/genre/{genre_id}",
+            lambda i: {
+                "url": f"/film/genre/{state.take('create_genre', i)}",
+                "json": {"name": f"Bench genre {i} renamed"},
+            },
+            write=True,
+        ),
+        Case(
+            "import_genres",
+            "POST",
+            "/film/genre/import",
+            lambda i: upload(
+                "/film/genre/import",
+                "genres.ndjson",
+                _ndjson({"name": f"Imported genre {i}-{n}"} for n in range(rows)),
+            ),
+            write=True,
+            requests=5,
+        ),
+        # Film
+        Case("list_films", "GET", "/film/", lambda i: {"url": "/film/?limit=50"}),
+        Case(
+            "list_films[expand=genres]",
+            "GET",
+            "/film/",
+            lambda i: {"url": "/film/?limit=50&expand=genres"},
+        ),
+        Case(
+            "search_films",
+            "GET",
+            "/film/search",
+            lambda i: {"url": "/film/search?q=film 1"},
+            postgres_only=True,
+        ),
+        # Over the --catalogue films: prefixes the trigram index serves,
+        # one- and two-letter queries it cannot (they have no trigram), and
+        # misspelled titles matched by word similarity.
+        Case(
+            "search_films[prefix]",
+            "GET",
+            "/film/search",
+            lambda i: {"url": "/film/search", "params": {"q": title(i)[:5]}},
+            postgres_only=True,
+        ),
+        Case(
+            "search_films[short]",
+            "GET",
+            "/film/search",
+            lambda i: {"url": "/film/search", "params": {"q": title(i)[: 1 + i % 2]}},
+            postgres_only=True,
+        ),
+        Case(
+            "search_films[fuzzy]",
+            "GET",
+            "/film/search",
+            lambda i: {"url": "/film/search", "params": {"q": misspell(title(i))}},
+            postgres_only=True,
+        ),
+        Case(
+            "get_film",
+            "GET",
+            "/film/{film_id}",
+            lambda i: {"url": f"/film/{film[i % len(film)]}"},
+        ),
+        Case(
+            "create_film",
+            "POST",
+            "/film/",
+            lambda i: {
+                "url": "/film/",
+                "json": {"name": f"Bench film {i}", "genres": data.genre_ids[:2]},
+            },
+            write=True,
+            collect="id",
+        ),
+        Case(
+            "update_film",
+            "POST",
+            "/film/{film_id}",
+            lambda i: {
+                "url": f"/film/{state.take('create_film', i)}",
+                "json": {"genres": data.genre_ids[1:3]},
+            },
+            write=True,
+        ),
+        Case(
+            "import_films",
+            "POST",
+            "/film/import",
+            lambda i: upload(
+                "/film/import",
+                "films.csv",
+                (
+                    "name,genres\n"
+                    + "".join(
+                        f"Imported film {i}-{n},Genre 1|Genre 2\n" for n in range(rows)
+                    )
+                ).encode(),
+            ),
+            write=True,
+            requests=5,
+        ),
+        # Screening
+        Case(
+            "get_schedule",
+            "GET",
+            "/screening/schedule",
+            lambda i: {
+                "url": f"/screening/schedule?date_from={day}&date_to={week}"
+                f"&cinema_id={data.cinema_ids[i % len(data.cinema_ids)]}"
+            },
+        ),
+        Case(
+            "export_schedule",
+            "GET",
+            "/screening/export",
+            lambda i: {"url": "/screening/export"},
+            requests=5,
+        ),
+        Case(
+            "export_schedule[csv]",
+            "GET",
+            "/screening/export",
+            lambda i: {"url": "/screening/export?format=csv"},
+            requests=5,
+        ),
+        Case(
+            "get_screening",
+            "GET",
+            "/screening/{screening_id}",
+            lambda i: {"url": f"/screening/{screening(i)[0]}"},
+        ),
+        Case(
+            "create_screening",
+            "POST",
+            "/screening/",
+            lambda i: {
+                "url": "/screening/",
+                "json": {
+                    "date": (data.start - timedelta(days=30 + i)).isoformat(),
+                    "film_id": film[0],
+                    "hall_id": hall_id,
+                },
+            },
+            write=True,
+            collect="id",
+        ),
+        Case(
+            "update_screening",
+            "POST",
+            "/screening/{screening_id}",
+            lambda i: {
+                "url": f"/screening/{state.take('create_screening', i)}",
+                "json": {"film_id": film[i % len(film)]},
+            },
+            write=True,
+        ),
+        Case(
+            "import_screenings",
+            "POST",
+            "/screening/import",
+            lambda i: upload(
+                "/screening/import",
+                "screenings.ndjson",
+                _ndjson(
+                    {
+                        # Three hours apart in each hall, after the seeded
+                        # schedule, so no row overlaps another screening.
+                        "date": (
+                            data.start
+                            + timedelta(days=60 + 30 * i, hours=3 * (n // len(halls)))
+                        ).isoformat(),
+                        "hall_id": hall(n)[1],
+                        "film_id": film[n % len(film)],
+                    }
+                    for n in range(rows)
+                ),
+            ),
+            write=True,
+            requests=5,
+        ),
+        Case(
+            "validate_schedule",
+            "POST",
+            "/screening/validate",
+            # The seeded schedule again, an hour later: every row clashes.
+            lambda i: {
+                "url": "/screening/validate",
+                "json": [
+                    {
+                        "date": (
+                            data.start
+                            + timedelta(
+                                days=n // len(halls) // 5,
+                                hours=11 + 3 * (n // len(halls) % 5),
+                            )
+                        ).isoformat(),
+                        "hall_id": hall(n)[1],
+                        "film_id": film[n % len(film)],
+                    }
+                    for n in range(rows)
+                ],
+            },
+            requests=5,
+        ),
+        # Booking
+        Case(
+            "get_availability",
+            "GET",
+            "/screening/{screening_id}/booking/availability",
+            lambda i: {"url": f"/screening/{screening(i)[0]}/booking/availability"},
+        ),
+        Case(
+            "hold_seats",
+            "POST",
+            "/screening/{screening_id}/booking/hold",
+            hold,
+            write=True,
+            collect=("screening_id", "hold_id"),
+        ),
+        Case(
+            "confirm_booking",
+            "POST",
+            "/screening/{screening_id}/booking/{hold_id}/confirm",
+            lambda i: {
+                "url": "/screening/{}/booking/{}/confirm".format(
+                    *state.created["hold_seats"][i * 2]
+                )
+            },
+            write=True,
+            consumes="hold_seats",
+            share=2,
+        ),
+        Case(
+            "release_hold",
+            "DELETE",
+            "/screening/{screening_id}/booking/{hold_id}",
+            lambda i: {
+                "url": "/screening/{}/booking/{}".format(
+                    *state.created["hold_seats"][i * 2 + 1]
+                )
+            },
+            write=True,
+            consumes="hold_seats",
+            share=2,
+        ),
+        # Deletes consume what the create cases made.
+        Case(
+            "delete_screening",
+            "DELETE",
+            "/screening/{screening_id}",
+            lambda i: {"url": f"/screening/{state.created['create_screening'][i]}"},
+            write=True,
+            consumes="create_screening",
+        ),
+        Case(
+            "delete_film",
+            "DELETE",
+            "/film/{film_id}",
+            lambda i: {"url": f"/film/{state.created['create_film'][i]}"},
+            write=True,
+            consumes="create_film",
+        ),
+        Case(
+            "delete_genre",
+            "DELETE",
+            "/film/genre/{genre_id}",
+            lambda i: {"url": f"/film/genre/{state.created['create_genre'][i]}"},
+            write=True,
+            consumes="create_genre",
+        ),
+        Case(
+            "delete_hall",
+            "DELETE",
+            "/cinema/{cinema_id}/hall/{hall_id}",
+            lambda i: {
+                "url": f"/cinema/{cinema_id}/hall/{state.created['create_hall'][i]}"
+            },
+            write=True,
+            consumes="create_hall",
+        ),
+        Case(
+            "delete_cinema",
+            "DELETE",
+            "/cinema/{cinema_id}",
+            lambda i: {"url": f"/cinema/{state.created['create_cinema'][i]}"},
+            write=True,
+            consumes="create_cinema",
+        ),
+        # Internal
+        Case("db_pool_stats", "GET", "/internal/db/pool", lambda i: {"url": "/internal/db/pool"}),
+        Case("cache_stats", "GET", "/internal/cache", lambda i: {"url": "/internal/cache"}),
+    ]
+
+
+class QueryCounter:
+    def __init__(self, *engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def run_case(
+    client: httpx.AsyncClient,
+    case: Case,
+    state: State,
+    queries: QueryCounter,
+    requests: int,
+    concurrency: int,
+) -> dict:
+    requests = min(requests, case.requests or requests)
+    if case.consumes:
+        requests = min(requests, len(state.created[case.consumes]) // case.share)
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    collected = state.created.setdefault(case.name, []) if case.collect else None
+    indexes = iter(range(requests))
+
+    async def worker():
+        for i in indexes:
+            kwargs = case.request(i)
+            start = time.perf_counter()
+            response = await client.request(case.method, **kwargs)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+            if collected is not None and response.status_code == case.expect:
+                body = response.json()
+                if isinstance(case.collect, tuple):
+                    collected.append(tuple(body[key] for key in case.collect))
+                else:
+                    collected.append(body[case.collect])
+
+    before = queries.count
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(1 if case.write else concurrency)))
+    elapsed = time.perf_counter() - start
+    settle_start = time.perf_counter()
+    if case.settle is not None:
+        await case.settle()
+    settle_seconds = time.perf_counter() - settle_start
+
+    latencies.sort()
+    result = {
+        "name": case.name,
+        "method": case.method,
+        "route": case.route,
+        "requests": requests,
+        "errors": requests - statuses[case.expect],
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "concurrency": 1 if case.write else concurrency,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "queries_per_request": round((queries.count - before) / requests, 2),
+    }
+    if case.settle is not None:
+        result["settle_ms"] = round(settle_seconds * 1000, 3)
+    return result
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    database_url = args.database_url
+    if database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="cinema-bench-"), "bench.db")
+        database_url = f"sqlite+aiosqlite:///{path}"
+    engine = db.create_engine(database_url)
+    db.use_engine(engine)
+    # Stand-ins for read replicas: they always agree with the primary, so
+    # only the routing is measured, not replication lag.
+    db.use_replicas(
+        [db.create_engine(database_url, db.PoolStats()) for _ in range(args.replicas)]
+    )
+    minio_handler.use_client(MemoryObjectStore())
+    if not args.response_cache:
+        response_cache.maxsize = 0
+
+    await db.migrate()
+    await minio_handler.ensure_bucket()
+    dialect = engine.dialect.name
+    scale = Scale().scaled(args.scale)
+
+    start = time.perf_counter()
+    async with db.new_session() as session:
+        data = await seed(session, scale)
+        if dialect == "postgresql" and args.catalogue:
+            await seed_catalogue(session, data, args.catalogue)
+    seed_seconds = time.perf_counter() - start
+    print(
+        f"seeded {len(data.cinema_ids)} cinemas, {len(data.halls)} halls, "
+        f"{data.seats} seats, {len(data.film_ids)} films, "
+        f"{len(data.screenings)} screenings, {data.tickets} tickets, "
+        f"{len(data.catalogue)} catalogue films "
+        f"in {seed_seconds:.1f}s ({dialect})",
+        file=sys.stderr,
+    )
+
+    state = State(data)
+    queries = QueryCounter(engine, *db.replicas.engines)
+    selected = [c for c in cases(state, args.import_rows) if not args.only or c.name in args.only]
+    results, skipped = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for case in selected:
+            if case.postgres_only and dialect != "postgresql":
+                skipped.append({"name": case.name, "reason": f"requires postgresql, got {dialect}"})
+                continue
+            result = await run_case(
+                client, case, state, queries, args.requests, args.concurrency
+            )
+            results.append(result)
+            print(
+                f"{result['name']:<28} p50 {result['p50_ms']:8.2f} ms  "
+                f"p95 {result['p95_ms']:8.2f} ms  {result['throughput_rps']:8.1f} rps  "
+                f"{result['queries_per_request']:6.2f} q/req  errors {result['errors']}",
+                file=sys.stderr,
+            )
+
+    benchmarked = {(c.method, c.route) for c in selected} | ELSEWHERE
+    uncovered = sorted(
+        f"{method} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.include_in_schema
+        for method in route.methods
+        if (method, route.path) not in benchmarked
+    )
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "dialect": dialect,
+            "response_cache": args.response_cache,
+            "replicas": args.replicas,
+            "catalogue": len(data.catalogue),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "scale": vars(scale),
+            "seed_seconds": round(seed_seconds, 2),
+        },
+        "results": results,
+        "skipped": skipped,
+        "uncovered_routes": uncovered,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    await scheme_pipeline.close()
+    await db.replicas.dispose()
+    await engine.dispose()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--import-rows", type=int, default=1000)
+    parser.add_argument("--response-cache", action="store_true")
+    parser.add_argument(
+        "--catalogue",
+        type=int,
+        default=100_000,
+        help="extra films for the search cases, seeded on Postgres only",
+    )
+    parser.add_argument("--replicas", type=int, default=0, help="read engines on the same database")
+    parser.add_argument("--only", nargs="*", help="run only these cases")
+    parser.add_argument("--output", help="write the JSON report here")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
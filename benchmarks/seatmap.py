@@ -0,0 +1,172 @@
+"""Fan-out load test for the seat map stream.
+
+Opens thousands of in-process subscribers on one screening, a share of
+them deliberately slow, and publishes seat changes at a fixed rate::
+
+    python -m benchmarks.seatmap --subscribers 5000 --rate 200 --duration 10
+
+Subscribers consume the same byte stream the SSE endpoint sends and
+rebuild the seat states from it, so the run also checks that every client
+ends up with the channel's state. Reports delivery latency, how often slow
+clients were resynced with a snapshot, publish cost and peak RSS.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+from app import db
+from app.booking.seatmap import AVAILABLE, SeatMapHub
+from app.minio import minio_handler
+from benchmarks.seed import Scale, seed
+from benchmarks.storage import MemoryObjectStore
+
+STATES = ("held", "sold", AVAILABLE)
+
+
+class Subscriber:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.states: dict[str, str] = {}
+        self.deltas = 0
+        self.snapshots = 0
+        self.latencies: list[float] = []
+
+    def handle(self, chunk: bytes, published: dict[int, float]):
+        now = time.perf_counter()
+        for event in chunk.split(b"\n\n"):
+            if not event or event.startswith(b":"):
+                continue
+            name, version, data = (line.split(b": ", 1)[1] for line in event.split(b"\n"))
+            seats = json.loads(data)["seats"]
+            if name == b"snapshot":
+                self.snapshots += 1
+                self.states = seats
+                continue
+            self.deltas += 1
+            if (sent := published.get(int(version))) is not None:
+                self.latencies.append(now - sent)
+            for seat_id, state in seats.items():
+                if state == AVAILABLE:
+                    self.states.pop(seat_id, None)
+                else:
+                    self.states[seat_id] = state
+
+    async def run(self, stream, published: dict[int, float]):
+        async for chunk in stream:
+            self.handle(chunk, published)
+            if self.delay:
+                await asyncio.sleep(self.delay)
+
+
+def _percentile(values: list[float], q: int) -> float | None:
+    if len(values) < 2:
+        return values[0] if values else None
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def main(args):
+    path = os.path.join(tempfile.mkdtemp(prefix="cinema-seatmap-"), "bench.db")
+    db.use_engine(db.create_engine(f"sqlite+aiosqlite:///{path}"))
+    minio_handler.use_client(MemoryObjectStore())
+    await db.migrate()
+    await minio_handler.ensure_bucket()
+    scale = Scale(cinemas=1, halls_per_cinema=1, films=1, genres=1, days=1, screenings_per_day=1)
+    async with db.new_session() as session:
+        data = await seed(session, scale)
+    screening_id, hall_id = data.screenings[0]
+    seat_ids = data.hall_seats[hall_id]
+
+    # A long resync keeps the database out of the measurement: every change
+    # reaches subscribers through publish.
+    hub = SeatMapHub(args.history, resync=3600, keepalive=3600)
+    published: dict[int, float] = {}
+    rng = random.Random(42)
+    slow = int(args.subscribers * args.slow_share)
+    subscribers = [
+        Subscriber(args.slow_delay if i < slow else 0) for i in range(args.subscribers)
+    ]
+    streams = [hub.subscribe(screening_id) for _ in subscribers]
+    tasks = [
+        asyncio.create_task(s.run(stream, published))
+        for s, stream in zip(subscribers, streams)
+    ]
+    while hub.stats()["subscribers"] < len(subscribers):
+        await asyncio.sleep(0.01)
+    channel = hub._channels[screening_id]
+    await channel.ready.wait()
+
+    publish_seconds = 0.0
+    changes = int(args.rate * args.duration)
+    start = time.perf_counter()
+    for n in range(changes):
+        seats = rng.sample(seat_ids, args.seats_per_change)
+        state = rng.choice(STATES)
+        t = time.perf_counter()
+        hub.publish(screening_id, seats, state)
+        published[channel.version] = time.perf_counter()
+        publish_seconds += published[channel.version] - t
+        await asyncio.sleep(max(0.0, start + (n + 1) / args.rate - time.perf_counter()))
+    # Let the slow subscribers drain.
+    await asyncio.sleep(args.slow_delay * 2 + 0.5)
+
+    expected = {str(k): v for k, v in channel.states.items()}
+    consistent = sum(s.states == expected for s in subscribers)
+    stats = hub.stats()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for stream in streams:
+        await stream.aclose()
+
+    fast = [lat for s in subscribers[slow:] for lat in s.latencies]
+    report = {
+        "subscribers": args.subscribers,
+        "slow_subscribers": slow,
+        "changes": changes,
+        "rate": args.rate,
+        "history": args.history,
+        "publish_us_avg": round(publish_seconds / changes * 1e6, 2),
+        "deltas_delivered": sum(s.deltas for s in subscribers),
+        "snapshots_sent": sum(s.snapshots for s in subscribers),
+        "lagged_resyncs": stats["lagged"],
+        "latency_ms": {
+            f"p{q}": round(v * 1000, 3)
+            for q in (50, 95, 99)
+            if (v := _percentile(fast, q)) is not None
+        },
+        "consistent_subscribers": consistent,
+        "peak_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    print(json.dumps(report, indent=2))
+    print(
+        f"{args.subscribers} subscribers, {changes} changes: "
+        f"p99 {report['latency_ms'].get('p99')} ms, "
+        f"{report['lagged_resyncs']} resyncs, "
+        f"{consistent}/{args.subscribers} consistent",
+        file=sys.stderr,
+    )
+    await db.engine.dispose()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=100, help="changes per second")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--seats-per-change", type=int, default=2)
+    parser.add_argument("--history", type=int, default=256)
+    parser.add_argument("--slow-share", type=float, default=0.05)
+    parser.add_argument("--slow-delay", type=float, default=1.0, help="seconds per read")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
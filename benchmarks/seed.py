@@ -0,0 +1,236 @@
+"""Deterministic, realistically sized data set for the benchmarks."""
+
+import hashlib
+import io
+import random
+import uuid
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.booking.models import Ticket, TicketStatus
+from app.cinema.models import Cinema, CinemaHall
+from app.cinema.schemes import SCHEME_CACHE_CONTROL, scheme_name
+from app.cinema.seats import replace_hall_seats
+from app.film.models import Film, FilmGenreLink, FilmScreening, Genre
+from app.minio import minio_handler
+from app.utils.geo import encode_geohash
+
+SVG_NS = "http://www.w3.org/2000/svg"
+
+
+@dataclass
+class Scale:
+    cinemas: int = 10
+    halls_per_cinema: int = 4
+    seat_rows: int = 40
+    seat_columns: int = 50
+    films: int = 300
+    genres: int = 20
+    days: int = 14
+    screenings_per_day: int = 5
+    sold_screenings: float = 0.05
+    sold_share: float = 0.3
+
+    def scaled(self, factor: float) -> "Scale":
+        counts = ("cinemas", "films", "genres", "days")
+        return Scale(
+            **{
+                f.name: max(1, round(getattr(self, f.name) * factor))
+                if f.name in counts
+                else getattr(self, f.name)
+                for f in fields(self)
+            }
+        )
+
+
+@dataclass
+class Dataset:
+    start: datetime
+    cinema_ids: list[int] = field(default_factory=list)
+    halls: list[tuple[int, int]] = field(default_factory=list)
+    hall_seats: dict[int, list[uuid.UUID]] = field(default_factory=dict)
+    genre_ids: list[int] = field(default_factory=list)
+    film_ids: list[int] = field(default_factory=list)
+    screenings: list[tuple[int, int]] = field(default_factory=list)
+    film_names: list[str] = field(default_factory=list)
+    scheme_hash: str = ""
+    seats: int = 0
+    tickets: int = 0
+    catalogue: list[str] = field(default_factory=list)
+
+
+# Titles are drawn from a small vocabulary, so prefixes and misspellings
+# match many rows, as they do in a real catalogue.
+TITLE_WORDS = (
+    "star night city river dark last lost silent golden broken hidden "
+    "winter summer storm shadow empire kingdom journey secret wild iron "
+    "crimson midnight ocean mountain desert garden harbor machine dream "
+    "ghost island forest signal echo frontier paradise legend voyage"
+).split()
+
+
+def catalogue_names(count: int, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(1, 4))).title()
+        + (f" {rng.randint(2, 5)}" if rng.random() < 0.1 else "")
+        for _ in range(count)
+    ]
+
+
+async def seed_catalogue(session: AsyncSession, data: Dataset, count: int, seed: int = 42):
+    """Add ``count`` films for the search benchmarks."""
+    data.catalogue = catalogue_names(count, seed)
+    for start in range(0, count, 5000):
+        await session.execute(
+            insert(Film), [{"name": name} for name in data.catalogue[start : start + 5000]]
+        )
+    await session.commit()
+
+
+def scheme_svg(rows: int, columns: int) -> bytes:
+    """A hall plan in the format upload_scheme expects: one element per
+    seat whose id is ``row-column``."""
+    buffer = io.StringIO()
+    buffer.write(f'<svg xmlns="{SVG_NS}" width="{columns * 12}" height="{rows * 12}">')
+    for row in range(1, rows + 1):
+        for column in range(1, columns + 1):
+            buffer.write(
+                f'<rect id="{row}-{column}" x="{column * 12}" y="{row * 12}"'
+                ' width="10" height="10"/>'
+            )
+    buffer.write("</svg>")
+    return buffer.getvalue().encode()
+
+
+async def _insert(session: AsyncSession, model, rows: list[dict]) -> list[int]:
+    if not rows:
+        return []
+    result = await session.execute(
+        insert(model).returning(model.id, sort_by_parameter_order=True), rows
+    )
+    return list(result.scalars().all())
+
+
+async def seed(session: AsyncSession, scale: Scale, seed: int = 42) -> Dataset:
+    rng = random.Random(seed)
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    data = Dataset(start=start + timedelta(days=1))
+
+    data.genre_ids = await _insert(
+        session, Genre, [{"name": f"Genre {i}"} for i in range(scale.genres)]
+    )
+
+    data.film_names = [f"Film {i} {rng.choice('ABCDEFGH')}" for i in range(scale.films)]
+    # Screenings are three hours apart, so every film fits its slot.
+    runtimes = [rng.randint(80, 170) for _ in data.film_names]
+    data.film_ids = await _insert(
+        session, Film, [{"name": n, "runtime": r} for n, r in zip(data.film_names, runtimes)]
+    )
+    runtime_of = dict(zip(data.film_ids, runtimes))
+    links = {
+        (film_id, genre_id)
+        for film_id in data.film_ids
+        for genre_id in rng.sample(data.genre_ids, min(2, len(data.genre_ids)))
+    }
+    await session.execute(
+        insert(FilmGenreLink), [{"film_id": f, "genre_id": g} for f, g in links]
+    )
+
+    cinemas = []
+    for i in range(scale.cinemas):
+        lat, lon = 55.75 + rng.uniform(-0.3, 0.3), 37.62 + rng.uniform(-0.5, 0.5)
+        cinemas.append(
+            {
+                "name": f"Cinema {i}",
+                "address": f"Street {i}",
+                "latitude": lat,
+                "longitude": lon,
+                "geohash": encode_geohash(lat, lon),
+            }
+        )
+    data.cinema_ids = await _insert(session, Cinema, cinemas)
+
+    # Every hall has the same plan, stored once under its hash.
+    svg = scheme_svg(scale.seat_rows, scale.seat_columns)
+    data.scheme_hash = hashlib.sha256(svg).hexdigest()
+    scheme = scheme_name(data.scheme_hash)
+    await minio_handler.upload_file(
+        scheme,
+        io.BytesIO(svg),
+        len(svg),
+        content_type="image/svg+xml",
+        cache_control=SCHEME_CACHE_CONTROL,
+    )
+    capacity = scale.seat_rows * scale.seat_columns
+    for cinema_id in data.cinema_ids:
+        for h in range(scale.halls_per_cinema):
+            [hall_id] = await _insert(
+                session,
+                CinemaHall,
+                [
+                    {
+                        "name": f"Hall {h}",
+                        "capacity": capacity,
+                        "is_vip": h == 0,
+                        "scheme": scheme,
+                        "scheme_hash": data.scheme_hash,
+                        "cinema_id": cinema_id,
+                    }
+                ],
+            )
+            seats = [
+                {"id": uuid.uuid4(), "row": r, "column": c}
+                for r in range(1, scale.seat_rows + 1)
+                for c in range(1, scale.seat_columns + 1)
+            ]
+            await replace_hall_seats(session, hall_id, seats)
+            data.halls.append((cinema_id, hall_id))
+            data.hall_seats[hall_id] = [s["id"] for s in seats]
+            data.seats += len(seats)
+
+    screenings = []
+    for _, hall_id in data.halls:
+        for day in range(scale.days):
+            for slot in range(scale.screenings_per_day):
+                date = data.start + timedelta(days=day, hours=10 + slot * 3)
+                film_id = rng.choice(data.film_ids)
+                screenings.append(
+                    {
+                        "date": date,
+                        "ends_at": date + timedelta(minutes=runtime_of[film_id]),
+                        "hall_id": hall_id,
+                        "film_id": film_id,
+                    }
+                )
+    ids = await _insert(session, FilmScreening, screenings)
+    data.screenings = [(i, s["hall_id"]) for i, s in zip(ids, screenings)]
+
+    # Sold-out-ish screenings come from the end of the list, so the ones the
+    # booking benchmarks hold seats on start empty.
+    sold = data.screenings[-max(1, int(len(data.screenings) * scale.sold_screenings)) :]
+    for screening_id, hall_id in sold:
+        seat_ids = rng.sample(
+            data.hall_seats[hall_id], int(capacity * scale.sold_share)
+        )
+        hold_id = uuid.uuid4()
+        await session.execute(
+            insert(Ticket),
+            [
+                {
+                    "screening_id": screening_id,
+                    "seat_id": seat_id,
+                    "hold_id": hold_id,
+                    "status": TicketStatus.sold,
+                    "expires_at": None,
+                }
+                for seat_id in seat_ids
+            ],
+        )
+        data.tickets += len(seat_ids)
+
+    await session.commit()
+    return data
@@ -0,0 +1,118 @@
+"""Compare FastAPI's response_model path with the projection serializers.
+
+Run from the repository root: ``python -m benchmarks.serialization``.
+Builds transient ORM objects, so no database or object storage is needed.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+import app.main  # noqa: F401  configures the mappers
+from app.cinema.models import CinemaHall, CinemaHallPublic, Seat
+from app.cinema.projections import hall_projection
+from app.film.models import Film, FilmPublic, FilmScreening, Genre
+from app.film.projections import film_projection
+from app.utils.pagination import Page
+
+
+def build_films(count: int, screenings: int) -> list[Film]:
+    genres = [Genre(id=i, name=f"genre {i}") for i in range(5)]
+    halls = [
+        CinemaHall(
+            id=i, name=f"hall {i}", capacity=100, is_vip=False, scheme="s.svg", cinema_id=1
+        )
+        for i in range(10)
+    ]
+    films = []
+    for i in range(count):
+        film = Film(id=i, name=f"film {i}", genres=genres)
+        film.screenings = [
+            FilmScreening(
+                id=i * screenings + j,
+                date=datetime(2025, 1, 1),
+                film_id=i,
+                hall_id=halls[j % len(halls)].id,
+                hall=halls[j % len(halls)],
+            )
+            for j in range(screenings)
+        ]
+        films.append(film)
+    return films
+
+
+def build_hall(seats: int) -> CinemaHall:
+    hall = CinemaHall(
+        id=1, name="hall", capacity=seats, is_vip=False, scheme="s.svg", cinema_id=1
+    )
+    hall.seats = [Seat(id=uuid.uuid4(), row=i // 50, column=i % 50) for i in range(seats)]
+    return hall
+
+
+def response_model_path(model, content) -> bytes:
+    field = create_model_field(name="response", type_=model, mode="serialization")
+
+    def run():
+        return JSONResponse(
+            asyncio.run(serialize_response(field=field, response_content=content))
+        ).body
+
+    return run
+
+
+def measure(name: str, fn, repeat: int):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{name:<40} {elapsed * 1000:8.2f} ms  {len(body) / 1024:8.1f} KiB")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--films", type=int, default=200)
+    parser.add_argument("--screenings", type=int, default=20)
+    parser.add_argument("--seats", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    films = build_films(args.films, args.screenings)
+    page = {"items": films, "next_cursor": None}
+    projected = film_projection.resolve("detail")
+    baseline = measure(
+        f"list_films response_model ({args.films})",
+        response_model_path(Page[FilmPublic], page),
+        args.repeat,
+    )
+    fast = measure(
+        f"list_films projection ({args.films})",
+        lambda: projected.render_page(page).body,
+        args.repeat,
+    )
+    print(f"{'':<40} {baseline / fast:8.2f}x")
+
+    hall = build_hall(args.seats)
+    projected = hall_projection.resolve("detail", ["seats"])
+    baseline = measure(
+        f"get_hall response_model ({args.seats} seats)",
+        response_model_path(CinemaHallPublic, hall),
+        args.repeat,
+    )
+    fast = measure(
+        f"get_hall projection ({args.seats} seats)",
+        lambda: projected.render(hall).body,
+        args.repeat,
+    )
+    print(f"{'':<40} {baseline / fast:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
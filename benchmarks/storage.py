@@ -0,0 +1,91 @@
+"""In-process stand-in for the subset of the ``Minio`` client the app uses."""
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from minio.error import S3Error
+
+
+@dataclass
+class StoredObject:
+    object_name: str
+    data: bytes
+    etag: str
+    last_modified: datetime
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+class _Response:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def stream(self, chunk_size: int):
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start : start + chunk_size]
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class MemoryObjectStore:
+    def __init__(self):
+        self.buckets: dict[str, dict[str, StoredObject]] = {}
+        self._lock = threading.Lock()
+
+    def bucket_exists(self, bucket: str) -> bool:
+        return bucket in self.buckets
+
+    def make_bucket(self, bucket: str):
+        self.buckets.setdefault(bucket, {})
+
+    def put_object(self, bucket: str, name: str, data, length: int, **kwargs):
+        content = data.read(length)
+        with self._lock:
+            self.buckets[bucket][name] = StoredObject(
+                name,
+                content,
+                hashlib.md5(content).hexdigest(),
+                datetime.now(timezone.utc),
+            )
+
+    def _object(self, bucket: str, name: str) -> StoredObject:
+        if (obj := self.buckets.get(bucket, {}).get(name)) is None:
+            raise S3Error(
+                response=None,
+                code="NoSuchKey",
+                message="Object does not exist",
+                resource=name,
+                request_id=None,
+                host_id=None,
+            )
+        return obj
+
+    def stat_object(self, bucket: str, name: str) -> StoredObject:
+        return self._object(bucket, name)
+
+    def get_object(self, bucket: str, name: str, offset: int = 0, length: int = 0):
+        data = self._object(bucket, name).data
+        end = offset + length if length else len(data)
+        return _Response(data[offset:end])
+
+    def remove_object(self, bucket: str, name: str):
+        with self._lock:
+            self.buckets.get(bucket, {}).pop(name, None)
+
+    def list_objects(self, bucket: str, prefix: str | None = None, recursive: bool = False):
+        return [
+            obj
+            for name, obj in self.buckets.get(bucket, {}).items()
+            if name.startswith(prefix or "")
+        ]
+
+    def presigned_get_object(self, bucket: str, name: str, expires=None) -> str:
+        return f"memory://{bucket}/{name}"
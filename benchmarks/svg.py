@@ -0,0 +1,100 @@
+"""Time process_scheme on a synthetic arena plan.
+
+Run from the repository root: ``python -m benchmarks.svg``. The plan has
+``--seats`` seats in rings around the stage, each seat a group
+with a shape (rect, circle, path or ellipse, in turn) and a title, as
+drawing tools export them. Parsing only, so no database or object storage
+is needed.
+"""
+
+import argparse
+import io
+import math
+import time
+import uuid
+
+from app.utils.exceptions import SchemeTooLargeException
+from app.utils.svg import SVG_NS, process_scheme
+
+
+def _shape(index: int, x: float, y: float) -> str:
+    match index % 4:
+        case 0:
+            return f'<rect id="{{id}}" x="{x:.1f}" y="{y:.1f}" width="8" height="8"/>'
+        case 1:
+            return f'<circle id="{{id}}" cx="{x:.1f}" cy="{y:.1f}" r="4"/>'
+        case 2:
+            return f'<path id="{{id}}" d="M{x:.1f} {y:.1f}h8v8h-8z"/>'
+        case _:
+            return f'<ellipse id="{{id}}" cx="{x:.1f}" cy="{y:.1f}" rx="4" ry="3"/>'
+
+
+def arena_svg(seats: int, per_row: int = 100) -> bytes:
+    rows = math.ceil(seats / per_row)
+    size = 2 * (100 + rows * 12)
+    buffer = io.StringIO()
+    buffer.write(f'<svg xmlns="{SVG_NS}" width="{size}" height="{size}">')
+    for seat in range(seats):
+        row, column = divmod(seat, per_row)
+        angle = 2 * math.pi * column / per_row
+        radius = 100 + row * 12
+        x, y = size / 2 + radius * math.cos(angle), size / 2 + radius * math.sin(angle)
+        seat_id = f"{row + 1}-{column + 1}"
+        buffer.write('<g class="seat">')
+        buffer.write(_shape(seat, x, y).format(id=seat_id))
+        buffer.write(f"<title>Row {row + 1}, seat {column + 1}</title></g>")
+    buffer.write("</svg>")
+    return buffer.getvalue().encode()
+
+
+def measure(name: str, fn, repeat: int):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{name:<40} {elapsed * 1000:8.2f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seats", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    data = arena_svg(args.seats)
+    namespace = uuid.uuid4()
+    output, seats = process_scheme(io.BytesIO(data), namespace)
+    print(
+        f"arena: {args.seats} seats, {len(data) / 1024:.1f} KiB in, "
+        f"{len(output.getvalue()) / 1024:.1f} KiB out"
+    )
+    assert len(seats) == args.seats
+
+    measure(
+        "process_scheme (random seat ids)",
+        lambda: process_scheme(io.BytesIO(data)),
+        args.repeat,
+    )
+    measure(
+        "process_scheme (derived seat ids)",
+        lambda: process_scheme(io.BytesIO(data), namespace),
+        args.repeat,
+    )
+
+    # An oversized plan has to be turned away without parsing all of it.
+    limit = args.seats // 10
+
+    def rejected():
+        try:
+            process_scheme(io.BytesIO(data), namespace, max_elements=limit)
+        except SchemeTooLargeException:
+            return
+        raise AssertionError("the element limit was not enforced")
+
+    measure(f"rejected at {limit} elements", rejected, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""initial schema
+
+The tables as ``SQLModel.metadata.create_all`` created them before schema
+changes moved to migrations. Databases created that way are at this
+revision: ``alembic stamp 0001`` them, then upgrade.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cinema",
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("address", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("latitude", sa.Float(), nullable=False),
+        sa.Column("longitude", sa.Float(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_cinema_id"), "cinema", ["id"], unique=False)
+    op.create_table(
+        "film",
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "genre",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "seat",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("row", sa.Integer(), nullable=False),
+        sa.Column("column", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "cinemahall",
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("capacity", sa.Integer(), nullable=False),
+        sa.Column("is_vip", sa.Boolean(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("scheme", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("cinema_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["cinema_id"], ["cinema.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_cinemahall_id"), "cinemahall", ["id"], unique=False)
+    op.create_table(
+        "filmgenrelink",
+        sa.Column("film_id", sa.Integer(), nullable=False),
+        sa.Column("genre_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["film_id"], ["film.id"]),
+        sa.ForeignKeyConstraint(["genre_id"], ["genre.id"]),
+        sa.PrimaryKeyConstraint("film_id", "genre_id"),
+    )
+    op.create_table(
+        "filmscreening",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.DateTime(), nullable=False),
+        sa.Column("film_id", sa.Integer(), nullable=False),
+        sa.Column("hall_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["film_id"], ["film.id"]),
+        sa.ForeignKeyConstraint(["hall_id"], ["cinemahall.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "seathalllink",
+        sa.Column("seat_id", sa.Uuid(), nullable=False),
+        sa.Column("hall_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["hall_id"], ["cinemahall.id"]),
+        sa.ForeignKeyConstraint(["seat_id"], ["seat.id"]),
+        sa.PrimaryKeyConstraint("seat_id", "hall_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("seathalllink")
+    op.drop_table("filmscreening")
+    op.drop_table("filmgenrelink")
+    op.drop_index(op.f("ix_cinemahall_id"), table_name="cinemahall")
+    op.drop_table("cinemahall")
+    op.drop_table("seat")
+    op.drop_table("genre")
+    op.drop_table("film")
+    op.drop_index(op.f("ix_cinema_id"), table_name="cinema")
+    op.drop_table("cinema")
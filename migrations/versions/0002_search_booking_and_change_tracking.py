@@ -0,0 +1,138 @@
+"""search indexes, bookings, geohash and change tracking
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import context, op
+
+from app.utils.geo import encode_geohash
+
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRACKED = ("cinema", "cinemahall", "film", "filmscreening")
+
+
+def _trigram_index(table: str):
+    op.create_index(
+        f"ix_{table}_name_trgm",
+        table,
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def _backfill_geohash(bind):
+    cinema = sa.table(
+        "cinema",
+        sa.column("id", sa.Integer()),
+        sa.column("latitude", sa.Float()),
+        sa.column("longitude", sa.Float()),
+        sa.column("geohash", sa.String()),
+    )
+    rows = bind.execute(sa.select(cinema.c.id, cinema.c.latitude, cinema.c.longitude))
+    if geohashes := [
+        {"cinema_id": id, "geohash": encode_geohash(lat, lon)} for id, lat, lon in rows
+    ]:
+        bind.execute(
+            cinema.update()
+            .where(cinema.c.id == sa.bindparam("cinema_id"))
+            .values(geohash=sa.bindparam("geohash")),
+            geohashes,
+        )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.create_table(
+        "ticket",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("screening_id", sa.Integer(), nullable=False),
+        sa.Column("seat_id", sa.Uuid(), nullable=False),
+        sa.Column("hold_id", sa.Uuid(), nullable=False),
+        sa.Column("status", sa.Enum("held", "sold", name="ticketstatus"), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["screening_id"], ["filmscreening.id"]),
+        sa.ForeignKeyConstraint(["seat_id"], ["seat.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("screening_id", "seat_id"),
+    )
+    op.create_index(op.f("ix_ticket_hold_id"), "ticket", ["hold_id"], unique=False)
+
+    op.add_column(
+        "cinema", sa.Column("geohash", sqlmodel.sql.sqltypes.AutoString(), nullable=True)
+    )
+    op.create_index(
+        "ix_cinema_geohash",
+        "cinema",
+        ["geohash"],
+        unique=False,
+        postgresql_ops={"geohash": "varchar_pattern_ops"},
+    )
+    # Offline (--sql) runs cannot read rows; backfill there with
+    # app.utils.geo.encode_geohash after applying the script.
+    if not context.is_offline_mode():
+        _backfill_geohash(bind)
+
+    # Existing rows count as changed now, so the first incremental export
+    # after the upgrade includes them.
+    for table in TRACKED:
+        op.add_column(table, sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+        op.create_index(op.f(f"ix_{table}_updated_at"), table, ["updated_at"], unique=False)
+
+    with op.batch_alter_table("cinemahall") as batch_op:
+        batch_op.alter_column("scheme", existing_type=sa.VARCHAR(), nullable=True)
+    op.create_index(op.f("ix_cinemahall_cinema_id"), "cinemahall", ["cinema_id"], unique=False)
+
+    op.create_index("ix_filmgenrelink_genre_id", "filmgenrelink", ["genre_id"], unique=False)
+    op.create_index(op.f("ix_filmscreening_date"), "filmscreening", ["date"], unique=False)
+    op.create_index(
+        "ix_filmscreening_film_id_date", "filmscreening", ["film_id", "date"], unique=False
+    )
+    op.create_index(
+        "ix_filmscreening_hall_id_date", "filmscreening", ["hall_id", "date"], unique=False
+    )
+    _trigram_index("film")
+    _trigram_index("genre")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_genre_name_trgm", table_name="genre")
+    op.drop_index("ix_film_name_trgm", table_name="film")
+    op.drop_index("ix_filmscreening_hall_id_date", table_name="filmscreening")
+    op.drop_index("ix_filmscreening_film_id_date", table_name="filmscreening")
+    op.drop_index(op.f("ix_filmscreening_date"), table_name="filmscreening")
+    op.drop_index("ix_filmgenrelink_genre_id", table_name="filmgenrelink")
+
+    op.drop_index(op.f("ix_cinemahall_cinema_id"), table_name="cinemahall")
+    op.execute("UPDATE cinemahall SET scheme = '' WHERE scheme IS NULL")
+    with op.batch_alter_table("cinemahall") as batch_op:
+        batch_op.alter_column("scheme", existing_type=sa.VARCHAR(), nullable=False)
+
+    for table in reversed(TRACKED):
+        op.drop_index(op.f(f"ix_{table}_updated_at"), table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("updated_at")
+
+    op.drop_index("ix_cinema_geohash", table_name="cinema")
+    with op.batch_alter_table("cinema") as batch_op:
+        batch_op.drop_column("geohash")
+
+    op.drop_index(op.f("ix_ticket_hold_id"), table_name="ticket")
+    op.drop_table("ticket")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TYPE IF EXISTS ticketstatus")
@@ -0,0 +1,74 @@
+"""film runtime, screening end times and no overlapping screenings
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 15:00:00
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import context, op
+
+from app.config import settings
+
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OVERLAPS = """
+SELECT a.id, b.id FROM filmscreening a
+JOIN filmscreening b
+  ON a.hall_id = b.hall_id AND a.id < b.id
+ AND a.date < b.ends_at AND b.date < a.ends_at
+ORDER BY a.id, b.id
+LIMIT 20
+"""
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    postgres = bind.dialect.name == "postgresql"
+
+    op.add_column("film", sa.Column("runtime", sa.Integer(), nullable=True))
+
+    # Screenings so far are assumed to take the default runtime.
+    minutes = settings.film_runtime_default
+    op.add_column("filmscreening", sa.Column("ends_at", sa.DateTime(), nullable=True))
+    if postgres:
+        op.execute(f"UPDATE filmscreening SET ends_at = date + interval '{minutes} minutes'")
+    else:
+        # Keep the fractional seconds, as datetimes are compared as text.
+        op.execute(
+            "UPDATE filmscreening SET ends_at = "
+            f"datetime(date, '+{minutes} minutes') || substr(date, 20)"
+        )
+    with op.batch_alter_table("filmscreening") as batch_op:
+        batch_op.alter_column("ends_at", existing_type=sa.DateTime(), nullable=False)
+
+    if not postgres:
+        return
+    if not context.is_offline_mode() and (
+        overlapping := bind.execute(sa.text(OVERLAPS)).all()
+    ):
+        pairs = ", ".join(f"{a}/{b}" for a, b in overlapping)
+        raise RuntimeError(
+            f"Screenings overlap once they last {minutes} minutes ({pairs}). "
+            "Move or delete them, or set FILM_RUNTIME_DEFAULT lower, and rerun."
+        )
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    # op.create_exclude_constraint only takes plain columns.
+    op.execute(
+        "ALTER TABLE filmscreening ADD CONSTRAINT ex_filmscreening_hall_id_time "
+        "EXCLUDE USING gist (hall_id WITH =, tsrange(date, ends_at) WITH &&)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_constraint("ex_filmscreening_hall_id_time", "filmscreening")
+    with op.batch_alter_table("filmscreening") as batch_op:
+        batch_op.drop_column("ends_at")
+    with op.batch_alter_table("film") as batch_op:
+        batch_op.drop_column("runtime")
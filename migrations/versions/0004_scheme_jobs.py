@@ -0,0 +1,49 @@
+"""scheme upload jobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 18:00:00
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "schemejob",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("hall_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "queued", "parsing", "storing", "saving", "done", "failed",
+                name="schemejobstatus",
+            ),
+            nullable=False,
+        ),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("seats", sa.Integer(), nullable=True),
+        sa.Column("scheme", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["hall_id"], ["cinemahall.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_schemejob_hall_id"), "schemejob", ["hall_id"], unique=False)
+    op.create_index(op.f("ix_schemejob_updated_at"), "schemejob", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_schemejob_updated_at"), table_name="schemejob")
+    op.drop_index(op.f("ix_schemejob_hall_id"), table_name="schemejob")
+    op.drop_table("schemejob")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TYPE IF EXISTS schemejobstatus")
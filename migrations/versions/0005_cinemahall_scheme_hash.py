@@ -0,0 +1,31 @@
+"""content-addressed hall schemes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 20:00:00
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Halls keep their current scheme objects; the hash is set by their
+    # next upload.
+    op.add_column(
+        "cinemahall",
+        sa.Column("scheme_hash", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("cinemahall") as batch_op:
+        batch_op.drop_column("scheme_hash")
@@ -0,0 +1,36 @@
+"""tickets go with their screening
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 10:00:00
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 0002 left the constraint unnamed. Postgres names it like this; on SQLite
+# the batch copy of the table gives it the same name.
+NAME = "ticket_screening_id_fkey"
+NAMING = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+
+
+def _recreate(**kwargs):
+    with op.batch_alter_table("ticket", naming_convention=NAMING) as batch_op:
+        batch_op.drop_constraint(NAME, type_="foreignkey")
+        batch_op.create_foreign_key(
+            NAME, "filmscreening", ["screening_id"], ["id"], **kwargs
+        )
+
+
+def upgrade() -> None:
+    _recreate(ondelete="CASCADE")
+
+
+def downgrade() -> None:
+    _recreate()
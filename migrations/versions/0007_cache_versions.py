@@ -0,0 +1,30 @@
+"""response cache versions shared between workers
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-20 10:00:00
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cacheversion",
+        sa.Column("resource", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("resource"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("cacheversion")
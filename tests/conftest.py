@@ -0,0 +1,66 @@
+import httpx
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.booking.availability import availability_cache
+from app.cinema.schemes import scheme_pipeline
+from app.main import app
+from app.minio import minio_handler
+from app.utils.cache import response_cache
+from benchmarks.seed import Scale, seed
+from benchmarks.storage import MemoryObjectStore
+
+SMALL = Scale(
+    cinemas=1, halls_per_cinema=1, seat_rows=2, seat_columns=3, films=3, genres=2, days=1
+)
+LARGE = Scale(
+    cinemas=3, halls_per_cinema=2, seat_rows=10, seat_columns=12, films=40, genres=8, days=3
+)
+
+
+def _enforce_foreign_keys(connection, record):
+    connection.execute("PRAGMA foreign_keys = ON")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def database(tmp_path):
+    """A migrated SQLite database and in-memory storage, with the
+    process-wide caches emptied so nothing leaks between tests."""
+    engine = db.create_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+    previous = db.engine
+    db.use_engine(engine)
+    minio_handler.use_client(MemoryObjectStore())
+    response_cache.__init__(0, response_cache.max_bytes, response_cache.max_age)
+    availability_cache.__init__(availability_cache.ttl)
+    await db.migrate()
+    # Enforce foreign keys as Postgres does; off during migrations, whose
+    # table rebuilds would trip them.
+    await engine.dispose()
+    event.listen(engine.sync_engine, "connect", _enforce_foreign_keys)
+    await minio_handler.ensure_bucket()
+    yield engine
+    await scheme_pipeline.close()
+    await engine.dispose()
+    db.use_engine(previous)
+
+
+@pytest.fixture
+async def client(database):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def seeded(database):
+    async def seeded(scale: Scale = SMALL):
+        async with db.new_session() as session:
+            return await seed(session, scale)
+
+    return seeded
@@ -0,0 +1,136 @@
+import asyncio
+import random
+import uuid
+from collections import Counter
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app import db
+from app.booking.models import Ticket
+from app.cinema.schemes import scheme_pipeline, seat_namespace
+from app.film.models import FilmScreening
+from benchmarks.seed import Scale, scheme_svg
+
+pytestmark = pytest.mark.anyio
+
+
+async def ticket_count(*criteria) -> int:
+    async with db.new_session() as session:
+        return await session.scalar(select(func.count()).select_from(Ticket).where(*criteria))
+
+
+async def delete_tickets(*criteria):
+    async with db.new_session() as session:
+        await session.execute(delete(Ticket).where(*criteria))
+        await session.commit()
+
+
+async def hold(client, screening_id, seat_ids):
+    return await client.post(
+        f"/screening/{screening_id}/booking/hold",
+        json={"seat_ids": [str(s) for s in seat_ids]},
+    )
+
+
+async def sell(client, screening_id, seat_ids):
+    response = await hold(client, screening_id, seat_ids)
+    assert response.status_code == 200
+    response = await client.post(
+        f"/screening/{screening_id}/booking/{response.json()['hold_id']}/confirm"
+    )
+    assert response.status_code == 200
+
+
+async def test_concurrent_holds_never_share_a_seat(client, seeded):
+    data = await seeded(Scale(cinemas=1, halls_per_cinema=1, seat_rows=4, seat_columns=5, days=1))
+    screening_id, hall_id = data.screenings[0]
+    seats = data.hall_seats[hall_id]
+    rng = random.Random(7)
+    requests = [rng.sample(seats, rng.randint(1, 4)) for _ in range(60)]
+
+    responses = await asyncio.gather(*(hold(client, screening_id, r) for r in requests))
+
+    assert Counter(r.status_code for r in responses).keys() <= {200, 409}
+    won = [set(r) for r, response in zip(requests, responses) if response.status_code == 200]
+    held = [seat for seats in won for seat in seats]
+    assert len(held) == len(set(held))
+    assert await ticket_count(Ticket.screening_id == screening_id) == len(held)
+    for r, response in zip(requests, responses):
+        if response.status_code == 409:
+            taken = {uuid.UUID(s) for s in response.json()["detail"]["seat_ids"]}
+            assert taken and taken <= set(held)
+
+
+async def test_deleting_a_screening_releases_holds_but_not_sold_tickets(client, seeded):
+    data = await seeded()
+    (held_id, hall_id), (sold_id, _) = data.screenings[0], data.screenings[-1]
+    seats = data.hall_seats[hall_id]
+    assert (await hold(client, held_id, seats[:2])).status_code == 200
+
+    assert (await client.delete(f"/screening/{held_id}")).status_code == 200
+    assert await ticket_count(Ticket.screening_id == held_id) == 0
+
+    # The seeded sold-out screening.
+    response = await client.delete(f"/screening/{sold_id}")
+    assert response.status_code == 409
+    assert (await client.get(f"/screening/{sold_id}")).status_code == 200
+
+
+async def test_deleting_a_film_takes_its_screenings(client, seeded):
+    data = await seeded()
+    async with db.new_session() as session:
+        screenings = (
+            await session.exec(select(FilmScreening.film_id, FilmScreening.id, FilmScreening.hall_id))
+        ).all()
+    sold = {s.film_id for s in screenings if s.id == data.screenings[-1][0]}
+    film_id, screening_id, hall_id = next(s for s in screenings if s.film_id not in sold)
+    assert (await hold(client, screening_id, data.hall_seats[hall_id][:1])).status_code == 200
+
+    assert (await client.delete(f"/film/{film_id}")).status_code == 200
+    assert (await client.get(f"/screening/{screening_id}")).status_code == 404
+    assert await ticket_count(Ticket.screening_id == screening_id) == 0
+
+    assert (await client.delete(f"/film/{sold.pop()}")).status_code == 409
+
+
+async def upload(client, cinema_id, hall_id, rows, columns) -> dict:
+    response = await client.post(
+        f"/cinema/{cinema_id}/hall/{hall_id}/scheme",
+        files={"svg_file": ("plan.svg", scheme_svg(rows, columns))},
+    )
+    assert response.status_code == 202
+    await scheme_pipeline.join()
+    response = await client.get(
+        f"/cinema/{cinema_id}/hall/{hall_id}/scheme/jobs/{response.json()['id']}"
+    )
+    return response.json()
+
+
+async def test_new_scheme_keeps_tickets_on_seats_it_keeps(client, seeded):
+    data = await seeded()
+    cinema_id, hall_id = data.halls[0]
+    screening_id = data.screenings[0][0]
+    # The seeded sold tickets are on seats the first upload drops.
+    assert (await upload(client, cinema_id, hall_id, 2, 2))["status"] == "failed"
+    await delete_tickets()
+    assert (await upload(client, cinema_id, hall_id, 2, 2))["status"] == "done"
+    namespace = seat_namespace(hall_id)
+    corner = uuid.uuid5(namespace, "2-2")
+    await sell(client, screening_id, [corner])
+    assert (await hold(client, screening_id, [uuid.uuid5(namespace, "1-1")])).status_code == 200
+
+    # A bigger plan keeps every seat, and so both tickets.
+    assert (await upload(client, cinema_id, hall_id, 3, 3))["status"] == "done"
+    assert await ticket_count(Ticket.screening_id == screening_id) == 2
+
+    # A smaller one would drop the sold seat.
+    job = await upload(client, cinema_id, hall_id, 1, 1)
+    assert job["status"] == "failed"
+    assert job["error"].startswith("Tickets are sold")
+    assert await ticket_count(Ticket.screening_id == screening_id) == 2
+
+    # Once the sold ticket is gone the hold on a dropped seat is released.
+    await delete_tickets(Ticket.seat_id == corner)
+    assert (await upload(client, cinema_id, hall_id, 1, 1))["status"] == "done"
+    assert await ticket_count(Ticket.screening_id == screening_id) == 1
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from app.db import PRIMARY_COOKIE
+from app.minio import minio_handler
+from app.utils.cache import ResponseCache, response_cache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_workers_share_versions(client, seeded):
+    data = await seeded()
+    response_cache.maxsize = 16
+    # Another worker, with its own counters and cached bodies.
+    other = ResponseCache(16, response_cache.max_bytes, response_cache.max_age)
+    url, resources = f"/film/{data.film_ids[0]}", ("film", "genre", "screening", "hall")
+    etag = (await client.get(url)).headers["etag"]
+    assert other.etag(url, "", resources) == etag
+
+    response = await client.post(url, json={"name": "Renamed"})
+    assert response.status_code == 200
+    assert other.etag(url, "", resources) == etag
+    await other.sync()
+    assert other.etag(url, "", resources) != etag
+    assert other.etag(url, "", resources) == (await client.get(url)).headers["etag"]
+
+
+async def test_a_write_invalidates_cached_reads(client, seeded):
+    data = await seeded()
+    response_cache.maxsize = 16
+    url = f"/film/{data.film_ids[0]}"
+    first = await client.get(url)
+    assert (await client.get(url)).json() == first.json()
+    assert response_cache.hits == 1
+
+    response = await client.post(url, json={"name": "Renamed"})
+    assert response.status_code == 200
+    response = await client.get(url, headers={"If-None-Match": first.headers["etag"]})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    assert response_cache.hits == 1
+
+
+async def test_revalidation_and_cache_hits(client, seeded):
+    data = await seeded()
+    response_cache.maxsize = 16
+    url = f"/cinema/{data.cinema_ids[0]}"
+    etag = (await client.get(url)).headers["etag"]
+
+    assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 304
+    assert (await client.get(url)).status_code == 200
+    assert response_cache.hits == 1
+
+    # A client pinned to the primary after a write skips both shortcuts.
+    client.cookies.set(PRIMARY_COOKIE, f"{time.time() + 5}")
+    assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 200
+    assert (await client.get(url)).status_code == 200
+    assert response_cache.hits == 1
+
+
+async def test_presigned_url_stats(client, database):
+    for _ in range(3):
+        minio_handler.get_url("schemes/plan.svg")
+    stats = (await client.get("/internal/cache")).json()["presigned_urls"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
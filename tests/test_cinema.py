@@ -0,0 +1,34 @@
+import pytest
+
+from app.utils.geo import covering_prefixes, encode_geohash
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_nearby_finds_cinemas_in_the_neighbouring_cells(client, database):
+    # Where the equator meets the prime meridian, the four quadrants around
+    # the point fall in different geohash cells at every precision.
+    lat, lon = 0.001, 0.001
+    places = {
+        "north-east": (0.03, 0.03),
+        "north-west": (0.03, -0.03),
+        "south-west": (-0.03, -0.03),
+        "south-east": (-0.03, 0.03),
+        "far": (1.0, 1.0),
+    }
+    for name, (latitude, longitude) in places.items():
+        response = await client.post(
+            "/cinema/",
+            json={"name": name, "address": name, "latitude": latitude, "longitude": longitude},
+        )
+        assert response.status_code == 200
+
+    precision = len(next(iter(covering_prefixes(lat, lon, 10))))
+    cells = {encode_geohash(*places[name], precision) for name in places if name != "far"}
+    assert len(cells) == 4
+
+    response = await client.get("/cinema/nearby", params={"lat": lat, "lon": lon, "radius": 10})
+    assert response.status_code == 200
+    found = response.json()
+    assert {cinema["name"] for cinema in found} == places.keys() - {"far"}
+    assert [c["distance_km"] for c in found] == sorted(c["distance_km"] for c in found)
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_rows_the_database_rejects_fail_alone(client, database, monkeypatch):
+    # Stands in for a constraint only the database checks.
+    async with db.new_session() as session:
+        await session.execute(
+            text(
+                "CREATE TRIGGER reject_genre BEFORE INSERT ON genre "
+                "WHEN NEW.name LIKE 'bad%' BEGIN SELECT RAISE(ABORT, 'bad genre'); END"
+            )
+        )
+        await session.commit()
+    monkeypatch.setattr(settings, "import_batch_size", 4)
+    names = [f"bad {i}" if i in (3, 8) else f"Genre {i}" for i in range(1, 11)]
+    body = b"".join(json.dumps({"name": name}).encode() + b"\n" for name in names)
+
+    response = await client.post(
+        "/film/genre/import", files={"file": ("genres.ndjson", body)}
+    )
+
+    report = response.json()
+    assert report["created"] == 8
+    assert report["failed"] == 2
+    assert [e["line"] for e in report["errors"]] == [3, 8]
+    assert all("bad genre" in e["error"] for e in report["errors"])
+    genres = (await client.get("/film/genre", params={"limit": 50})).json()["items"]
+    assert sorted(g["name"] for g in genres) == sorted(n for n in names if "bad" not in n)
+
+
+def ndjson(*rows: dict) -> bytes:
+    return b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+
+
+async def test_duplicate_rows_in_a_batch_fail(client, seeded):
+    data = await seeded()
+    _, hall_id = data.halls[0]
+    morning = data.start.replace(hour=6).isoformat()
+
+    response = await client.post(
+        "/film/import",
+        files={
+            "file": (
+                "films.ndjson",
+                ndjson(
+                    {"name": "Twice", "runtime": 90},
+                    {"name": "Once"},
+                    {"name": "Twice", "runtime": 100},
+                ),
+            )
+        },
+    )
+    report = response.json()
+    assert (report["created"], report["unchanged"], report["failed"]) == (2, 0, 1)
+    assert report["errors"] == [{"line": 3, "error": "duplicates line 1"}]
+
+    response = await client.post(
+        "/screening/import",
+        files={
+            "file": (
+                "screenings.ndjson",
+                ndjson(
+                    {"date": morning, "hall_id": hall_id, "film": "Twice"},
+                    {"date": morning, "hall_id": hall_id, "film": "Once"},
+                ),
+            )
+        },
+    )
+    report = response.json()
+    assert (report["created"], report["unchanged"], report["failed"]) == (1, 0, 1)
+    assert report["errors"] == [{"line": 2, "error": "duplicates line 1"}]
+    films = (await client.get("/film/", params={"limit": 200})).json()["items"]
+    assert {f["name"]: f["runtime"] for f in films}["Twice"] == 90
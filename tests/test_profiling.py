@@ -0,0 +1,55 @@
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.main import app
+from app.utils.cache import response_cache
+from app.utils.profiling import (
+    Profiler,
+    ProfilingMiddleware,
+    RequestProfile,
+    _profile,
+    profiler,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_cached_responses_count_towards_their_route(database, seeded):
+    data = await seeded()
+    response_cache.maxsize = 16
+    profiler.reset()
+    transport = httpx.ASGITransport(app=ProfilingMiddleware(app))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        url = f"/cinema/{data.cinema_ids[0]}"
+        etag = (await client.get(url)).headers["etag"]
+        assert (await client.get(url)).status_code == 200
+        assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 304
+        assert (await client.get("/nowhere")).status_code == 404
+
+    routes = profiler.stats()["routes"]
+    assert routes["GET /cinema/{cinema_id}"]["count"] == 3
+    assert routes["unmatched"]["count"] == 1
+
+
+def test_slowest_bucket_has_a_quantile():
+    slow = Profiler(1)
+    for elapsed in (0.002, 0.003, 20):
+        slow.record("GET /slow", elapsed, None)
+    stats = slow.stats()["routes"]["GET /slow"]
+    assert (stats["p50_ms"], stats["p99_ms"]) == (5, ">10000")
+
+
+async def test_failed_statements_leave_nothing_on_the_connection(database):
+    token = _profile.set(profile := RequestProfile())
+    try:
+        async with database.connect() as connection:
+            for _ in range(3):
+                with pytest.raises(DBAPIError):
+                    await connection.execute(text("SELECT * FROM missing"))
+            await connection.execute(text("SELECT 1"))
+            assert not any("profile" in key for key in connection.info)
+    finally:
+        _profile.reset(token)
+    assert profile.queries == 1
@@ -0,0 +1,52 @@
+"""Read paths must not issue one statement per row (N+1): the number of
+statements a request runs has to stay the same as the data set grows."""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from tests.conftest import LARGE, SMALL
+
+pytestmark = pytest.mark.anyio
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+async def statement_counts(client, database, data) -> dict[str, int]:
+    cinema_id, hall_id = data.halls[0]
+    screening_id, _ = data.screenings[0]
+    urls = {
+        "list_film": "/film/?limit=200",
+        "get_film": f"/film/{data.film_ids[0]}",
+        "list_hall": f"/cinema/{cinema_id}/hall/",
+        "get_hall[expand=seats]": f"/cinema/{cinema_id}/hall/{hall_id}?expand=seats",
+        "get_screening": f"/screening/{screening_id}",
+    }
+    counts = {}
+    for name, url in urls.items():
+        with count_statements(database) as statements:
+            response = await client.get(url)
+        assert response.status_code == 200, url
+        counts[name] = len(statements)
+    return counts
+
+
+async def test_statement_count_does_not_grow_with_rows(client, database, seeded):
+    small = await statement_counts(client, database, await seeded(SMALL))
+    # The second data set adds to the first, so every list gets longer and
+    # the hall it expands has more seats.
+    large = await statement_counts(client, database, await seeded(LARGE))
+    assert large == small
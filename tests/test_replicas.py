@@ -0,0 +1,65 @@
+import pytest
+
+from app import db
+from app.db import PRIMARY_COOKIE
+from tests.test_queries import count_statements
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def replica(database):
+    """A stand-in replica on the same database file, so only the routing
+    between the two is under test."""
+    engine = db.create_engine(database.url, db.PoolStats())
+    db.use_replicas([engine])
+    yield engine
+    db.use_replicas([])
+    await engine.dispose()
+
+
+async def read_from_replica(client, replica) -> bool:
+    with count_statements(replica) as statements:
+        assert (await client.get("/film/")).status_code == 200
+    return bool(statements)
+
+
+async def test_writes_keep_the_client_on_the_primary(client, seeded, replica):
+    data = await seeded()
+    cinema_id, hall_id = data.halls[0]
+    morning = data.start.replace(hour=6).isoformat()
+    hall = {"name": "Small", "capacity": 10, "is_vip": False}
+    film = {"name": "Pinned", "genres": data.genre_ids[:1]}
+    screening = {"date": morning, "film_id": data.film_ids[0], "hall_id": hall_id}
+    writes = {
+        "create_hall": ("POST", f"/cinema/{cinema_id}/hall/", hall),
+        "update_hall": ("PATCH", f"/cinema/{cinema_id}/hall/{hall_id}", {"name": "Big"}),
+        "create_film": ("POST", "/film/", film),
+        "update_film": ("POST", f"/film/{data.film_ids[0]}", {"name": "Renamed"}),
+        "create_screening": ("POST", "/screening/", screening),
+        "update_screening": (
+            "POST",
+            f"/screening/{data.screenings[0][0]}",
+            {"film_id": data.film_ids[1]},
+        ),
+    }
+
+    assert await read_from_replica(client, replica)
+    for name, (method, url, body) in writes.items():
+        client.cookies.clear()
+        response = await client.request(method, url, json=body)
+        assert response.status_code == 200, name
+        assert PRIMARY_COOKIE in response.cookies, name
+        assert not await read_from_replica(client, replica), name
+
+
+async def test_export_streams_from_the_connection_it_takes_the_watermark_on(
+    client, seeded, database, replica
+):
+    data = await seeded()
+    with count_statements(database) as primary, count_statements(replica) as replicated:
+        response = await client.get("/screening/export")
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == len(data.screenings)
+    assert primary == []
+    assert len(replicated) == 2
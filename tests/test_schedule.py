@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_dates_with_an_offset_are_compared_in_utc(client, seeded):
+    data = await seeded()
+    _, hall_id = data.halls[0]
+    film_id = data.film_ids[0]
+    # The hall's first screening starts at 10:00; its morning is free.
+    morning = data.start.replace(hour=6)
+
+    first = await client.post(
+        "/screening/",
+        json={"date": f"{morning.isoformat()}Z", "film_id": film_id, "hall_id": hall_id},
+    )
+    assert first.status_code == 200
+    assert first.json()["date"] == morning.isoformat()
+
+    # 07:30+01:00 is 06:30 UTC, during the screening just created.
+    clash = {
+        "date": f"{(morning + timedelta(hours=1, minutes=30)).isoformat()}+01:00",
+        "film_id": film_id,
+        "hall_id": hall_id,
+    }
+    response = await client.post("/screening/", json=clash)
+    assert response.status_code == 409
+    assert response.json()["detail"]["screening_ids"] == [first.json()["id"]]
+
+    response = await client.post("/screening/validate", json=[clash])
+    assert response.status_code == 200
+    assert response.json()["conflicts"][0]["screening_id"] == first.json()["id"]
+
+    response = await client.get(
+        "/screening/schedule",
+        params={
+            "date_from": f"{morning.isoformat()}Z",
+            "date_to": f"{(morning + timedelta(hours=1)).isoformat()}Z",
+            "hall_id": hall_id,
+        },
+    )
+    assert [s["id"] for s in response.json()] == [first.json()["id"]]
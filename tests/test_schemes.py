@@ -0,0 +1,89 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app import db
+from app.cinema.models import CinemaHall, SchemeJob, SchemeJobStatus
+from app.cinema.schemes import SCHEMES_PREFIX, scheme_pipeline
+from app.minio import minio_handler
+from tests.test_booking import delete_tickets, upload
+
+pytestmark = pytest.mark.anyio
+
+
+async def stored_scheme(job: dict) -> tuple[str, str]:
+    """The object name and hash of the scheme a job stored."""
+    async with db.new_session() as session:
+        name = (await session.get(SchemeJob, uuid.UUID(job["id"]))).scheme
+    return name, name.removeprefix(SCHEMES_PREFIX).removesuffix(".svg")
+
+
+def age(name: str, seconds: float):
+    stored = minio_handler.client.buckets[minio_handler.bucket][name]
+    stored.last_modified = datetime.now(timezone.utc) - timedelta(seconds=seconds)
+
+
+async def test_replaced_scheme_is_served_until_swept(client, seeded, monkeypatch):
+    data = await seeded()
+    cinema_id, hall_id = data.halls[0]
+    await delete_tickets()
+    old, old_hash = await stored_scheme(await upload(client, cinema_id, hall_id, 2, 2))
+    current, _ = await stored_scheme(await upload(client, cinema_id, hall_id, 3, 3))
+
+    # Clients holding the old immutable URL still get the file.
+    url = f"/cinema/{cinema_id}/hall/{hall_id}/scheme"
+    response = await client.get(f"{url}/{old_hash}")
+    assert response.status_code == 200
+    assert response.headers["cache-control"].endswith("immutable")
+    assert (await client.get(f"{url}/{'0' * 64}")).status_code == 404
+    assert (await client.get(f"{url}/not-a-hash")).status_code == 422
+
+    # Within the grace period nothing goes.
+    monkeypatch.setattr(scheme_pipeline, "grace", 3600)
+    await scheme_pipeline.sweep()
+    assert await minio_handler.exists(old)
+
+    # Past it, only the file no hall or running job uses.
+    for name in (old, current):
+        age(name, 7200)
+    await scheme_pipeline.sweep()
+    assert not await minio_handler.exists(old)
+    assert await minio_handler.exists(current)
+    assert (await client.get(f"{url}/{old_hash}")).status_code == 404
+
+
+async def test_sweep_leaves_a_scheme_a_running_job_named(client, seeded, monkeypatch):
+    data = await seeded()
+    cinema_id, hall_id = data.halls[0]
+    await delete_tickets()
+    name, _ = await stored_scheme(await upload(client, cinema_id, hall_id, 2, 2))
+    async with db.new_session() as session:
+        await session.execute(update(CinemaHall).values(scheme=None))
+        session.add(SchemeJob(hall_id=hall_id, status=SchemeJobStatus.saving, scheme=name))
+        await session.commit()
+    monkeypatch.setattr(scheme_pipeline, "grace", 3600)
+    age(name, 7200)
+
+    await scheme_pipeline.sweep()
+    assert await minio_handler.exists(name)
+
+
+async def test_a_scheme_near_its_sweep_is_stored_again(client, seeded, monkeypatch):
+    data = await seeded()
+    cinema_id, hall_id = data.halls[0]
+    await delete_tickets()
+    monkeypatch.setattr(scheme_pipeline, "grace", 3600)
+    name, _ = await stored_scheme(await upload(client, cinema_id, hall_id, 2, 2))
+
+    # Recently stored: a job for the same plan reuses the file as it is.
+    stored_at = (await minio_handler.stats(name)).last_modified
+    assert (await upload(client, cinema_id, hall_id, 2, 2))["status"] == "done"
+    assert (await minio_handler.stats(name)).last_modified == stored_at
+
+    # Halfway to the sweep, a sweep that looked before the job named the
+    # file could still remove it, so the job stores it again.
+    age(name, 2000)
+    assert (await upload(client, cinema_id, hall_id, 2, 2))["status"] == "done"
+    assert (await minio_handler.stats(name)).last_modified >= stored_at
@@ -0,0 +1,40 @@
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.booking import seatmap
+from app.booking.seatmap import SeatMapChannel
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_resync_keeps_changes_pushed_while_it_reads(client, seeded, monkeypatch):
+    data = await seeded()
+    screening_id, hall_id = data.screenings[0]
+    channel = SeatMapChannel(screening_id, history=16, resync=3600)
+    try:
+        await channel.ready.wait()
+        sold = dict(channel.states)
+
+        seat = data.hall_seats[hall_id][0]
+        response = await client.post(
+            f"/screening/{screening_id}/booking/hold", json={"seat_ids": [str(seat)]}
+        )
+        assert response.status_code == 200
+        # A hold made through another path is pushed while the resync reads.
+        pushed = uuid.uuid4()
+        new_session = seatmap.db.new_session
+
+        @asynccontextmanager
+        async def busy_session():
+            async with new_session() as session:
+                channel.apply({pushed: "held"})
+                yield session
+
+        monkeypatch.setattr(seatmap.db, "new_session", busy_session)
+        await channel.refresh()
+    finally:
+        channel.close()
+
+    assert channel.states == sold | {seat: "held", pushed: "held"}
@@ -0,0 +1,29 @@
+import io
+
+import pytest
+
+from app.utils.exceptions import InvalidSchemeException, SchemeTooLargeException
+from app.utils.svg import SVG_NS, process_scheme
+from benchmarks.seed import scheme_svg
+
+
+def plan(*seat_ids: str) -> io.BytesIO:
+    seats = "".join(f'<rect id="{seat_id}"/>' for seat_id in seat_ids)
+    return io.BytesIO(f'<svg xmlns="{SVG_NS}">{seats}</svg>'.encode())
+
+
+@pytest.mark.parametrize("seat_id", ["²-1", "1-١", "1-", "-1", "1-2-3", "a-1"])
+def test_malformed_seat_ids_are_rejected(seat_id):
+    with pytest.raises(InvalidSchemeException):
+        process_scheme(plan("1-1", seat_id))
+
+
+def test_element_limit_stops_the_parse():
+    process_scheme(io.BytesIO(scheme_svg(3, 3)), max_elements=10)
+    # The limit is hit long before the end of the document, which is not
+    # even well-formed.
+    truncated = io.BytesIO(scheme_svg(30, 30)[:-100])
+    with pytest.raises(SchemeTooLargeException):
+        process_scheme(truncated, max_elements=10)
+    with pytest.raises(InvalidSchemeException):
+        process_scheme(io.BytesIO(scheme_svg(30, 30)[:-100]))